@@ -0,0 +1,77 @@
+import io
+import os
+import random
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+from docx import Document
+
+SKILLS = [
+    "python", "java", "typescript", "react", "fastapi", "django", "docker", "kubernetes", "terraform", "aws",
+    "azure", "postgresql", "redis", "kafka", "spark", "airflow", "machine learning", "ci/cd", "graphql", "node.js",
+]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Deployed", "Maintained"]
+NOUNS = ["payment service", "data pipeline", "REST API", "analytics dashboard", "search cluster", "billing system"]
+
+
+def cv_text(rng: random.Random, lines: int = 40) -> str:
+    """
+    Synthetic CV text: a summary, a skills line and achievement bullets.
+    """
+    skills = rng.sample(SKILLS, 8)
+    body = [f"Software engineer with {rng.randint(2, 15)} years of experience.", "Skills: " + ", ".join(skills)]
+    for _ in range(lines):
+        body.append(
+            f"- {rng.choice(VERBS)} a {rng.choice(NOUNS)} using {rng.choice(skills)} and {rng.choice(skills)}, "
+            f"cutting latency by {rng.randint(10, 80)}% for {rng.randint(1, 50)}k users."
+        )
+    return "\n".join(body)
+
+
+def job_description(rng: random.Random) -> str:
+    skills = rng.sample(SKILLS, 10)
+    return (
+        "We are looking for a senior engineer to join our platform team. "
+        f"Required: {', '.join(skills[:6])}. Nice to have: {', '.join(skills[6:])}. "
+        "You will design, build and operate services used by millions of customers."
+    )
+
+
+def write_pdf(path: str, pages: int, rng: random.Random) -> None:
+    with fitz.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 555, 800), cv_text(rng, lines=30), fontsize=8)
+        doc.save(path)
+
+
+def write_docx(path, paragraphs: int, rng: random.Random) -> None:
+    document = Document()
+    for line in cv_text(rng, lines=paragraphs).split("\n"):
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def docx_bytes(rng: random.Random, paragraphs: int = 40) -> bytes:
+    buffer = io.BytesIO()
+    write_docx(buffer, paragraphs, rng)
+    return buffer.getvalue()
+
+
+def generate(directory: str, seed: int = 42) -> Dict[str, List[str]]:
+    """
+    Writes PDF and DOCX files of several sizes into `directory`. The same seed
+    always produces the same files, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    files: Dict[str, List[str]] = {}
+    for pages in (1, 5, 50):
+        path = os.path.join(directory, f"cv_{pages}p.pdf")
+        write_pdf(path, pages, rng)
+        files[f"pdf_{pages}p"] = [path]
+    for paragraphs in (20, 200, 2000):
+        path = os.path.join(directory, f"cv_{paragraphs}para.docx")
+        write_docx(path, paragraphs, rng)
+        files[f"docx_{paragraphs}para"] = [path]
+    return files
@@ -0,0 +1,74 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def summarize(latencies: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """
+    Throughput and latency percentiles (in milliseconds) for one benchmark.
+    """
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        # Nearest-rank percentile
+        rank = max(1, round(p / 100 * len(ordered)))
+        return round(ordered[min(rank, len(ordered)) - 1] * 1000, 3)
+
+    return {
+        "runs": len(ordered),
+        "ops_per_sec": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """
+    Lists benchmarks whose p50/p95 latency grew, or whose throughput fell, by more than `tolerance`.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if previous.get(metric) and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]}")
+        if previous.get("ops_per_sec") and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: ops_per_sec {previous['ops_per_sec']} -> {current['ops_per_sec']}")
+    return regressions
+
+
+def load_results(path: str) -> Optional[Dict[str, Dict[str, float]]]:
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return None
+
+
+def save_results(path: str, results: Dict[str, Dict[str, float]], meta: Dict[str, Any]) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'benchmark':<40} {'runs':>6} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<40} {r['runs']:>6} {r['ops_per_sec']:>10} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['p99_ms']:>10}")
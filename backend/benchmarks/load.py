@@ -0,0 +1,111 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks import corpus
+from benchmarks.harness import summarize
+from benchmarks.stub_gemini import canned_reply
+
+
+def _configure_environment() -> None:
+    # Keep the app's state in memory so runs do not touch or depend on local files
+    os.environ.setdefault("CV_STORE_BACKEND", "memory")
+    os.environ.setdefault("SEARCH_INDEX_PATH", "")
+    os.environ.setdefault("TFIDF_MODEL_PATH", "")
+    os.environ.setdefault("LLM_CACHE_DB", "")
+
+
+def stub_llm(latency: float, jitter: float, rng: random.Random):
+    """
+    Stub Gemini backend that sleeps like a remote call and returns a canned answer.
+    """
+
+    async def backend(prompt: str, model_name: str, generation_config: Optional[Dict[str, Any]]) -> str:
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        return canned_reply(generation_config)
+
+    return backend
+
+
+async def _timed(client, method: str, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+    return time.perf_counter() - started
+
+
+async def _drive(client, requests: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request: Dict[str, Any]) -> float:
+        async with semaphore:
+            return await _timed(client, **request)
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(r) for r in requests))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def run_load(
+    requests: int,
+    concurrency: int,
+    llm_latency: float,
+    llm_jitter: float,
+    seed: int = 42,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Drives the FastAPI app in-process over ASGI with a stub LLM and returns one
+    summary per endpoint.
+    """
+    _configure_environment()
+    import httpx
+    import main_backend
+    from services import llm_client
+    from services.cache import result_cache
+    from services.rate_limit import client_quota
+
+    rng = random.Random(seed)
+    llm_client.set_backend(stub_llm(llm_latency, llm_jitter, rng))
+    # Every request comes from one client; the per-client quota would reject most of them
+    client_rpm, client_quota.rpm = client_quota.rpm, 0
+    app = main_backend.app
+    results = {}
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                # Every file is distinct so uploads are not answered by deduplication
+                uploads = [
+                    {"method": "POST", "url": "/upload", "files": {"file": (f"cv{i}.docx", corpus.docx_bytes(rng))}}
+                    for i in range(requests)
+                ]
+                results["load_upload"] = await _drive(client, uploads, concurrency)
+
+                listing = (await client.get("/api/cvs", params={"limit": 100, "fields": "id,extracted_text"})).json()
+                cvs = listing["cvs"]
+                jds = [corpus.job_description(rng) for _ in range(20)]
+
+                def body(i: int, **extra) -> Dict[str, Any]:
+                    cv = cvs[i % len(cvs)]
+                    return {"cv_id": cv["id"], "cv_text": cv["extracted_text"], "job_description": jds[i % len(jds)], "bypass_cache": True, **extra}
+
+                results["load_score_keyword"] = await _drive(
+                    client, [{"method": "POST", "url": "/score", "json": body(i)} for i in range(requests)], concurrency
+                )
+                results["load_score_llm"] = await _drive(
+                    client, [{"method": "POST", "url": "/score", "json": body(i, mode="llm")} for i in range(requests)], concurrency
+                )
+                results["load_rewrite"] = await _drive(
+                    client, [{"method": "POST", "url": "/rewrite", "json": body(i)} for i in range(requests)], concurrency
+                )
+                results["load_analyze"] = await _drive(
+                    client, [{"method": "POST", "url": "/analyze", "json": body(i)} for i in range(requests)], concurrency
+                )
+    finally:
+        llm_client.set_backend(None)
+        client_quota.rpm = client_rpm
+        result_cache.clear()
+    return results
@@ -0,0 +1,43 @@
+import random
+from typing import Dict
+
+from benchmarks.harness import measure
+from services.ats_score import _filter_keywords, _simple_match_score
+from utils.keyword_engine import resolve_skills, score_matrix
+from utils.scoring_model import calculate_similarity
+from utils.text_extractor import extract_text_from_docx, extract_text_from_pdf
+
+from benchmarks import corpus
+
+MAX_TEXT_LENGTH = 5000
+
+
+def run_extraction(files: Dict[str, list], repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, (path,) in files.items():
+        extract = extract_text_from_pdf if name.startswith("pdf") else extract_text_from_docx
+        # Budgeted is what /upload does; full shows the cost of the whole document
+        results[f"extract_{name}_budgeted"] = measure(lambda: extract(path, max_chars=MAX_TEXT_LENGTH), repeat)
+        results[f"extract_{name}_full"] = measure(lambda: extract(path), max(1, repeat // 5))
+    return results
+
+
+def run_scoring(repeat: int, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    cvs = [corpus.cv_text(rng)[:MAX_TEXT_LENGTH] for _ in range(200)]
+    jds = [corpus.job_description(rng) for _ in range(10)]
+    keywords = " ".join(cvs[:5]).lower().split()
+    phrases = [*corpus.SKILLS, "postgres", "amazon web services", "kubernets", "scikit learn", "llms"] * 5
+    pairs = [(cvs[i % len(cvs)], jds[i % len(jds)]) for i in range(repeat)]
+    cursor = iter(range(10 ** 9))
+
+    def next_pair():
+        return pairs[next(cursor) % len(pairs)]
+
+    return {
+        "simple_match_score": measure(lambda: _simple_match_score(*next_pair()), repeat),
+        "filter_keywords": measure(lambda: _filter_keywords(keywords), repeat),
+        "calculate_similarity": measure(lambda: calculate_similarity(*next_pair()), repeat),
+        "resolve_skills_batch": measure(lambda: resolve_skills(phrases), repeat),
+        "score_matrix_200x10": measure(lambda: score_matrix(cvs, jds), max(5, repeat // 20)),
+    }
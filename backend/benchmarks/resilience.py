@@ -0,0 +1,117 @@
+"""
+Resilience benchmark: runs LLM-mode /score requests against the stub Gemini
+server (benchmarks/stub_gemini.py) over HTTP, with a slow tail and then an outage.
+
+    python -m benchmarks.resilience --requests 200
+
+- resilience.tail_unhedged / resilience.tail_hedged: 5% of upstream calls take
+  --slow-latency seconds, without and with hedged requests.
+- resilience.outage: every upstream call fails; once the circuit opens, requests
+  are answered by the keyword scorer without waiting on Gemini.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+from benchmarks import corpus
+from benchmarks.harness import print_table
+from benchmarks.load import _configure_environment, _drive
+from benchmarks.stub_gemini import Faults, create_app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(faults: Faults):
+    """
+    Runs the stub server in a background thread; returns its URL and the server.
+    """
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(faults), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+async def run_resilience(requests: int, concurrency: int, slow_latency: float = 3.0, seed: int = 42) -> Dict[str, Any]:
+    _configure_environment()
+    import httpx
+    import main_backend
+    from services import llm_client, llm_router
+    from services.cache import result_cache
+    from services.rate_limit import client_quota
+
+    faults = Faults(latency=0.1, jitter=0.02, slow_rate=0.05, slow_latency=slow_latency, seed=seed)
+    url, server = start_stub(faults)
+    llm_client.set_backend(llm_client.rest_backend(url))
+    client_rpm, client_quota.rpm = client_quota.rpm, 0
+    hedge_percentile = llm_router.HEDGE_PERCENTILE
+    app = main_backend.app
+    results = {}
+    rng = random.Random(seed)
+    jds = [corpus.job_description(rng) for _ in range(20)]
+    cv_text = corpus.cv_text(rng)
+
+    def batch(count: int):
+        return [
+            {"method": "POST", "url": "/score", "json": {
+                "cv_id": f"resilience-{i}", "cv_text": cv_text, "job_description": jds[i % len(jds)],
+                "mode": "llm", "bypass_cache": True,
+            }}
+            for i in range(count)
+        ]
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for name, percentile in (("tail_unhedged", 0.0), ("tail_hedged", hedge_percentile or 0.95)):
+                    llm_router.reset()
+                    llm_router.HEDGE_PERCENTILE = percentile
+                    # Warm up the latency percentiles the hedging delay is taken from
+                    await _drive(client, batch(llm_router.HEDGE_MIN_SAMPLES * 2), concurrency)
+                    results[f"resilience.{name}"] = await _drive(client, batch(requests), concurrency)
+
+                llm_router.reset()
+                faults.update({"error_rate": 1, "slow_rate": 0})
+                calls_before = server.config.app.state.calls
+                results["resilience.outage"] = await _drive(client, batch(requests), concurrency)
+                upstream_calls = server.config.app.state.calls - calls_before
+    finally:
+        llm_router.HEDGE_PERCENTILE = hedge_percentile
+        llm_router.reset()
+        llm_client.set_backend(None)
+        client_quota.rpm = client_rpm
+        result_cache.clear()
+        server.should_exit = True
+    return {"results": results, "outage_upstream_calls": upstream_calls}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LLM routing under a slow tail and an outage")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run = asyncio.run(run_resilience(args.requests, args.concurrency, args.slow_latency, args.seed))
+    print_table(run["results"])
+    print(f"upstream calls during the outage: {run['outage_upstream_calls']} for {args.requests} requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark runner. From the backend directory:
+
+    python -m benchmarks.run                      # all suites, compared to benchmarks/baseline.json
+    python -m benchmarks.run --suite micro --quick
+    python -m benchmarks.run --save-baseline      # record the current numbers as the baseline
+
+Exits with status 1 when a benchmark regressed by more than --tolerance, or when
+the startup suite finds the app over its import-time budget.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import compare, load_results, print_table, save_results
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extraction, scoring and endpoint benchmarks")
+    parser.add_argument("--suite", choices=["all", "extraction", "scoring", "load", "resilience", "storage", "startup"], default="all")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions, for a fast sanity check")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint in the load suite")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--import-budget", type=float, default=None, help="seconds allowed for import plus startup")
+    args = parser.parse_args()
+
+    repeat = 20 if args.quick else 200
+    requests = min(args.requests, 40) if args.quick else args.requests
+    results = {}
+    over_budget = []
+
+    if args.suite in ("all", "extraction"):
+        from benchmarks import corpus
+        from benchmarks.micro import run_extraction
+
+        with tempfile.TemporaryDirectory() as directory:
+            files = corpus.generate(directory, seed=args.seed)
+            results.update(run_extraction(files, max(5, repeat // 10)))
+
+    if args.suite in ("all", "scoring"):
+        from benchmarks.micro import run_scoring
+
+        results.update(run_scoring(repeat, seed=args.seed))
+
+    if args.suite in ("all", "load"):
+        from benchmarks.load import run_load
+
+        results.update(asyncio.run(run_load(requests, args.concurrency, args.llm_latency, args.llm_jitter, seed=args.seed)))
+
+    if args.suite in ("all", "resilience"):
+        from benchmarks.resilience import run_resilience
+
+        results.update(asyncio.run(run_resilience(requests, args.concurrency, seed=args.seed))["results"])
+
+    storage_memory = None
+    if args.suite in ("all", "storage"):
+        from benchmarks.storage import run_storage
+
+        storage = run_storage(2000 if args.quick else 20000, max(5, repeat // 10), seed=args.seed)
+        results.update(storage["results"])
+        storage_memory = storage["bytes_per_cv"]
+
+    if args.suite in ("all", "startup"):
+        from benchmarks.startup import DEFAULT_BUDGET, check_budget, run_cold_start
+
+        cold_start = run_cold_start(3 if args.quick else 10)
+        results.update(cold_start["results"])
+        over_budget = check_budget(cold_start, args.import_budget or DEFAULT_BUDGET)
+
+    print_table(results)
+    if storage_memory:
+        from benchmarks.storage import print_memory
+
+        print_memory(storage_memory)
+    for line in over_budget:
+        print(f"OVER BUDGET {line}")
+    meta = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": vars(args),
+    }
+    if args.output:
+        save_results(args.output, results, meta)
+    if args.save_baseline:
+        save_results(args.baseline, results, meta)
+        print(f"Baseline written to {args.baseline}")
+        return 1 if over_budget else 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print("No baseline found; run with --save-baseline to record one.")
+        return 1 if over_budget else 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Cold-start benchmark and import-time budget. Each run starts a fresh interpreter,
+imports the app, runs its startup hooks and serves the first requests over ASGI.
+
+    python -m benchmarks.startup --budget 1.5     # exits with status 1 over budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.harness import print_table, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds allowed for importing the app and running its startup hooks
+DEFAULT_BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# Runs in the child interpreter; main_backend is imported first so nothing else is in the timing
+_CHILD = """
+import time
+started = time.perf_counter()
+import main_backend
+imported = time.perf_counter()
+
+import asyncio, json, sys
+import httpx
+from utils.lazy_import import HEAVY_MODULES
+
+async def main():
+    app = main_backend.app
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        eager = [name for name in HEAVY_MODULES if name in sys.modules]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            t0 = time.perf_counter()
+            response = await client.post("/score", json={"cv_id": "cold-start", "cv_text": "Python developer", "job_description": "Python"})
+            response.raise_for_status()
+            first = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            response = await client.get("/ready")
+            response.raise_for_status()
+            warmup = time.perf_counter() - t0
+    return {
+        "import": imported - started,
+        "lifespan": ready - imported,
+        "first_score": first,
+        "ready_warmup": warmup,
+        "eager_modules": eager,
+    }
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "CV_STORE_BACKEND": "memory",
+        "SEARCH_INDEX_PATH": "",
+        "TFIDF_MODEL_PATH": "",
+        "LLM_CACHE_DB": "",
+        "WARMUP": "ready",
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+def measure_once() -> Dict[str, Any]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        cwd=BACKEND_DIR,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Cold start failed:\n{completed.stderr[-2000:]}")
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample["process"] = time.perf_counter() - started
+    return sample
+
+
+def run_cold_start(runs: int) -> Dict[str, Any]:
+    """
+    Returns per-phase results for `runs` cold starts, plus the heavy modules
+    that were already imported when startup finished (there should be none).
+    """
+    samples = [measure_once() for _ in range(runs)]
+    results: Dict[str, Any] = {}
+    for phase in ("import", "lifespan", "first_score", "ready_warmup", "process"):
+        latencies = [sample[phase] for sample in samples]
+        results[f"startup.{phase}"] = summarize(latencies, sum(latencies))
+    eager = sorted({name for sample in samples for name in sample["eager_modules"]})
+    return {"results": results, "eager_modules": eager}
+
+
+def check_budget(cold_start: Dict[str, Any], budget: float) -> List[str]:
+    """
+    Lists budget violations: a median import plus startup time over `budget`
+    seconds, or heavy dependencies imported before the first request.
+    """
+    results = cold_start["results"]
+    startup_ms = results["startup.import"]["p50_ms"] + results["startup.lifespan"]["p50_ms"]
+    failures = []
+    if startup_ms > budget * 1000:
+        failures.append(f"import and startup took {startup_ms:.0f} ms, budget is {budget * 1000:.0f} ms")
+    if cold_start["eager_modules"]:
+        failures.append(f"imported at startup: {', '.join(cold_start['eager_modules'])}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark and import-time budget check")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds for import plus startup")
+    args = parser.parse_args()
+
+    cold_start = run_cold_start(args.runs)
+    print_table(cold_start["results"])
+    failures = check_budget(cold_start, args.budget)
+    for line in failures:
+        print(f"OVER BUDGET {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Storage benchmark: memory per stored CV and the cost of one /api/cvs page, for
+the compact in-memory records and the SQLite store.
+
+    python -m benchmarks.storage --cvs 100000
+
+- storage.list_validated_*: the listing as it was built before, with the page
+  validated into CVListResponse and then encoded.
+- storage.list_encoded_*: the listing as it is built now, joined from the
+  records' pre-encoded JSON.
+Memory is the traced allocation per CV of a dict of CV objects and of the
+in-memory store.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks import corpus
+from benchmarks.harness import measure, print_table
+
+PAGE_SIZE = 500
+
+
+def make_cvs(count: int, seed: int = 42) -> List[Any]:
+    from models.response_models import CV
+
+    rng = random.Random(seed)
+    texts = [corpus.cv_text(rng)[:5000] for _ in range(200)]
+    keywords = [word for word in corpus.SKILLS]
+    return [
+        CV(
+            id=f"cv-{i:07d}",
+            filename=f"candidate-{i}.pdf",
+            # Vary the text so records do not share one string object
+            extracted_text=f"{i}\n{texts[i % len(texts)]}",
+            ats_score=round(rng.random() * 100, 2),
+            matched_keywords=rng.sample(keywords, 8),
+            missing_keywords=rng.sample(keywords, 6),
+            uploaded_at=time.time() - rng.random() * 1e7,
+            content_hash=f"{rng.getrandbits(256):064x}",
+            text_hash=f"{rng.getrandbits(256):064x}",
+            simhash=f"{rng.getrandbits(64):016x}",
+        )
+        for i in range(count)
+    ]
+
+
+def _traced_bytes(build: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def run_storage(count: int, repeat: int, seed: int = 42) -> Dict[str, Any]:
+    from fastapi.encoders import jsonable_encoder
+
+    from models.response_models import CVListResponse
+    from services.cv_store import InMemoryCVStore, SQLiteCVStore
+
+    # Each measurement builds its own CVs, so their text is counted too
+    memory = {"cv_objects": _traced_bytes(lambda: {cv.id: cv for cv in make_cvs(count, seed)}) / count}
+
+    def build_memory_store(cvs=None):
+        store = InMemoryCVStore()
+        store.put_many(cvs or make_cvs(count, seed))
+        return store
+
+    memory["memory_store"] = _traced_bytes(build_memory_store) / count
+    cvs = make_cvs(count, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_store = SQLiteCVStore(os.path.join(directory, "cv_store.db"))
+        for start in range(0, count, 1000):
+            sqlite_store.put_many(cvs[start:start + 1000])
+        for name, store in (("memory", build_memory_store(cvs)), ("sqlite", sqlite_store)):
+            total = store.count()
+
+            def validated():
+                rows = store.list(limit=PAGE_SIZE)
+                page = CVListResponse(cvs=rows, total=total, offset=0, limit=PAGE_SIZE)
+                return json.dumps(jsonable_encoder(page, exclude_unset=True)).encode()
+
+            def encoded():
+                rows = store.list_json(limit=PAGE_SIZE)
+                return b'{"cvs":[' + b",".join(rows) + b"]," + json.dumps({"total": total}).encode()[1:]
+
+            results[f"storage.list_validated_{name}"] = measure(validated, repeat)
+            results[f"storage.list_encoded_{name}"] = measure(encoded, repeat)
+    return {"results": results, "bytes_per_cv": memory}
+
+
+def print_memory(memory: Dict[str, float]) -> None:
+    for name, size in memory.items():
+        print(f"memory per CV, {name}: {size / 1024:.1f} KB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CV storage memory and listing cost")
+    parser.add_argument("--cvs", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run = run_storage(args.cvs, args.repeat, args.seed)
+    print_table(run["results"])
+    print_memory(run["bytes_per_cv"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Stub Gemini server for testing the app against a slow or failing upstream. It
+answers the generateContent REST call with canned text after an injected delay,
+and fails a share of the calls:
+
+    python -m benchmarks.stub_gemini --port 8090 --latency 0.5 --slow-rate 0.05 --slow-latency 8 --error-rate 0.1
+    LLM_STUB_URL=http://127.0.0.1:8090 uvicorn main_backend:app
+
+The fault settings can be changed while it runs with POST /_faults (same names as
+the options, as JSON), e.g. {"error_rate": 1} to simulate an outage.
+"""
+import argparse
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+JSON_REPLY = (
+    '{"ats_score": 70, "matched_keywords": ["python"], "missing_keywords": ["go"], '
+    '"rewritten_cv": "stub", "cover_letter": "stub", '
+    '"interview_prep": {"technical_questions": [], "behavioral_questions": [], "tips": []}, '
+    '"technical_questions": [], "behavioral_questions": [], "tips": [], "critical_skills": ["python"]}'
+)
+TEXT_REPLY = "stub completion " * 50
+
+
+def canned_reply(generation_config: Optional[Dict[str, Any]]) -> str:
+    """
+    One answer for every structured request (fields a schema does not ask for are
+    ignored) and filler text for the rest.
+    """
+    config = generation_config or {}
+    mime_type = config.get("response_mime_type") or config.get("responseMimeType")
+    return JSON_REPLY if mime_type == "application/json" else TEXT_REPLY
+
+
+class Faults:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.05,
+        slow_rate: float = 0.0,
+        slow_latency: float = 5.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+
+    def update(self, settings: Dict[str, float]) -> None:
+        for name, value in settings.items():
+            if name == "rng" or not hasattr(self, name):
+                raise ValueError(f"Unknown fault setting: {name}")
+            setattr(self, name, float(value))
+
+    def settings(self) -> Dict[str, float]:
+        return {name: value for name, value in vars(self).items() if name != "rng"}
+
+    def delay(self) -> float:
+        if self.rng.random() < self.slow_rate:
+            return self.slow_latency
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def error_status(self) -> Optional[int]:
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+
+def create_app(faults: Faults) -> FastAPI:
+    app = FastAPI()
+    app.state.faults = faults
+    app.state.calls = 0
+
+    @app.post("/v1beta/models/{target}")
+    async def generate_content(target: str, request: Request):
+        model_name, _, method = target.partition(":")
+        if method != "generateContent":
+            raise HTTPException(status_code=404, detail=f"Unsupported method: {method}")
+        body = await request.json()
+        app.state.calls += 1
+        await asyncio.sleep(faults.delay())
+        status = faults.error_status()
+        if status is not None:
+            raise HTTPException(status_code=status, detail="Injected failure")
+        text = canned_reply(body.get("generationConfig"))
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "modelVersion": model_name,
+        }
+
+    @app.post("/_faults")
+    async def set_faults(settings: Dict[str, float]):
+        try:
+            faults.update(settings)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return faults.settings()
+
+    @app.get("/_faults")
+    async def get_faults():
+        return {**faults.settings(), "calls": app.state.calls}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub Gemini server with injected latency and errors")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of calls that take --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    faults = Faults(args.latency, args.jitter, args.slow_rate, args.slow_latency, args.error_rate, args.throttle_rate, args.seed)
+    uvicorn.run(create_app(faults), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
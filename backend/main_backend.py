@@ -1,38 +1,105 @@
-from typing import Dict
+from typing import AsyncIterator, Callable, List, Optional
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from models.response_models import UploadResponse, ScoreResponse, RewriteResponse, CV, CVListResponse, CoverLetterResponse, InterviewPrepResponse
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from models.response_models import UploadResponse, ScoreResponse, RewriteResponse, CV, CVDetail, CVListResponse, CVSummary, CoverLetterResponse, InterviewPrepResponse, BatchScoreResponse, SearchResponse, JobResponse, AnalyzeResponse, JobDescription, JobDescriptionListResponse, SkillLookupResponse
 from middleware.error_handler import error_handler
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import json
+import logging
+import time
 import uuid
-from utils.text_extractor import extract_text_from_docx, extract_text_from_pdf
-from services.ats_score import calculate_ats_score
-from models.score_model import ScoreRequest
+import threading
+from utils.text_extractor import extract_text_from_docx, extract_text_from_pdf, shutdown_process_pool, UploadTooLargeError, MAX_UPLOAD_BYTES
+from utils.upload_stream import MalformedUploadError, ReceivedFile, receive_files
+from services.ats_score import calculate_ats_score, simple_match_scores, tfidf_match_score
+from services.incremental_score import rescore
+from services.batch_score import score_batch, rank_results, prefilter
+from utils.scoring_model import tfidf_model
+from utils.keyword_engine import resolve_skills, skill_index
+from models.score_model import ScoreRequest, BatchScoreRequest
 from models.rewrite_model import RewriteInput
+from models.analyze_model import AnalyzeRequest
+from models.job_description_model import JobDescriptionInput
+from models.skill_model import SkillLookupRequest
 from services.cv_templates import list_templates, apply_template
 from models.templates import TemplateRequest, TemplateResponse
-import tempfile
-import google.generativeai as genai
-from services.rewrite_cv import rewrite_cv
-from services.cover_letter import generate_cover_letter
+from services.rewrite_cv import rewrite_cv, stream_rewrite_cv
+from services.cover_letter import generate_cover_letter, stream_cover_letter
 from services.interview_prep import generate_interview_questions
+from services.analyze import analyze
+from services.cache import result_cache
+from services import jd_profiles, llm_client, llm_router, metrics
+from services.cv_store import create_cv_store, SUMMARY_FIELDS, SORTABLE_FIELDS
+from services.jd_store import create_jd_store
+from services.search_index import search_index, save_search_index, QuerySyntaxError
+from services.job_queue import job_queue
+from services.rate_limit import client_quota
+from services.dedup import near_duplicates, text_hash, simhash, format_simhash
+from services.index_sync import index_sync, index_cv, unindex_cv
+from services import bulk_upload
+from utils import json_codec, lazy_import
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
-
 app = FastAPI()
 
+@app.on_event("startup")
+async def configure_llm_client():
+    # Configure Gemini once per process; services share the client and its models
+    llm_client.configure()
+
+@app.on_event("startup")
+def load_indexes():
+    index_sync.load(cv_store)
+    jd_profiles.load(jd_store.iter_all())
+    skill_index.load()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await job_queue.start()
+    # Picks up CVs that other worker processes upload or delete
+    index_sync.start(cv_store)
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP == "startup":
+        # Import the heavy dependencies without holding up startup
+        threading.Thread(target=lazy_import.warmup, daemon=True).start()
+
+@app.on_event("shutdown")
+async def drain():
+    # Let queued jobs and in-flight Gemini calls finish before the process exits
+    deadline = time.monotonic() + SHUTDOWN_DRAIN_SECONDS
+    await job_queue.stop(timeout=SHUTDOWN_DRAIN_SECONDS)
+    if not await llm_client.drain(max(0.0, deadline - time.monotonic())):
+        metrics.log_event("shutdown_drain_incomplete", logging.WARNING)
+    await index_sync.stop()
+
+@app.on_event("shutdown")
+def save_indexes():
+    shutdown_process_pool()
+    save_search_index()
+    if tfidf_model.is_fitted:
+        tfidf_model.save()
+
 # Constants
 MAX_TEXT_LENGTH = 5000
+# Room for the multipart boundaries and part headers around the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# When to import the heavy dependencies ahead of the first request:
+# "ready" (on the first /ready probe), "startup" (in the background) or "off"
+WARMUP = os.getenv("WARMUP", "ready").lower()
+# Seconds that background jobs and Gemini calls get to finish on shutdown
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "25"))
 
-# In-memory storage for CVs
-cv_storage: Dict[str, CV] = {}
+# CV storage backend (SQLite by default, see CV_STORE_BACKEND)
+cv_store = create_cv_store()
+# Stored job descriptions and their profiles, in the same backend
+jd_store = create_jd_store()
 
 # CORS configuration (include common localhost variants for dev)
 allowed_origins = os.getenv(
@@ -53,25 +120,71 @@ app.middleware("http")(error_handler)
 
 # Dependency to get a CV by ID
 def get_cv_entry(cv_id: str) -> CV:
-    cv_entry = cv_storage.get(cv_id)
+    cv_entry = cv_store.get(cv_id)
     if not cv_entry:
         raise HTTPException(status_code=404, detail="CV not found.")
     return cv_entry
 
+def _resolve_job_description(data) -> str:
+    # Requests name a stored job description by jd_id or send its text
+    if data.jd_id:
+        jd = jd_store.get(data.jd_id)
+        if not jd:
+            raise HTTPException(status_code=404, detail="Job description not found.")
+        if jd_profiles.lookup(jd.text) is None:
+            # Created by another worker process since this one started
+            jd_profiles.register(jd)
+        return jd.text
+    if not isinstance(data.job_description, str) or not data.job_description.strip():
+        raise HTTPException(status_code=400, detail="Job description is required.")
+    return data.job_description
+
+async def _receive_upload(request: Request, max_bytes: int, directory: Optional[str] = None) -> List[ReceivedFile]:
+    try:
+        with metrics.span("upload_read"):
+            return await receive_files(request, max_bytes + MULTIPART_OVERHEAD_BYTES, directory=directory)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MalformedUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/upload", response_model=UploadResponse)
-def upload_cv(file: UploadFile = File(...)):
-    filename = file.filename.lower()
+async def upload_cv(request: Request):
+    """
+    Stores a CV sent as the multipart `file` field. The file is written to disk as
+    it arrives, and reading stops as soon as the body passes MAX_UPLOAD_BYTES.
+    """
+    received = await _receive_upload(request, MAX_UPLOAD_BYTES)
+    upload = next((f for f in received if f.field == "file"), None)
+    for other in received:
+        if other is not upload:
+            os.remove(other.path)
+    if upload is None:
+        raise HTTPException(status_code=400, detail="No file uploaded.")
+    if upload.size > MAX_UPLOAD_BYTES:
+        os.remove(upload.path)
+        raise HTTPException(status_code=413, detail=f"File is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit.")
+    return await run_in_threadpool(_store_upload, upload)
+
+def _store_upload(upload: ReceivedFile) -> dict:
+    filename = os.path.basename(upload.filename or "").lower()
     extension = os.path.splitext(filename)[1]
+    temp_file_path = upload.path
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_file:
-        temp_file.write(file.file.read())
-        temp_file_path = temp_file.name
+    # Byte-identical re-uploads return the stored record without extracting again
+    content_hash = upload.content_hash
+    existing = cv_store.find_one("content_hash", content_hash)
+    if existing:
+        os.remove(temp_file_path)
+        return _duplicate_upload_response(existing)
 
     try:
         if extension == ".pdf":
-            text = extract_text_from_pdf(temp_file_path)
+            with metrics.span("extraction"):
+                text = extract_text_from_pdf(temp_file_path, max_chars=MAX_TEXT_LENGTH)
         elif extension == ".docx":
-            text = extract_text_from_docx(temp_file_path)
+            with metrics.span("extraction"):
+                text = extract_text_from_docx(temp_file_path, max_chars=MAX_TEXT_LENGTH)
         elif extension == ".doc":
             # .doc is not reliably supported by docx2txt; return a clear 400
             raise HTTPException(status_code=400, detail=".doc files are not supported. Please upload PDF or DOCX.")
@@ -85,19 +198,79 @@ def upload_cv(file: UploadFile = File(...)):
     finally:
         os.remove(temp_file_path)
 
-    cv_id = str(uuid.uuid4())
     truncated_text = text[:MAX_TEXT_LENGTH]
-    new_cv = CV(id=cv_id, filename=filename, extracted_text=truncated_text)
-    cv_storage[cv_id] = new_cv
+    # Same text in a different file (e.g. re-exported PDF) is also an exact duplicate
+    normalized_hash = text_hash(truncated_text)
+    existing = cv_store.find_one("text_hash", normalized_hash)
+    if existing:
+        return _duplicate_upload_response(existing)
+
+    cv_id = str(uuid.uuid4())
+    fingerprint = simhash(truncated_text)
+    related_cv_ids = [key for key, _ in near_duplicates.query(fingerprint)]
+    new_cv = CV(
+        id=cv_id,
+        filename=filename,
+        extracted_text=truncated_text,
+        uploaded_at=time.time(),
+        content_hash=content_hash,
+        text_hash=normalized_hash,
+        simhash=format_simhash(fingerprint),
+        related_cv_ids=related_cv_ids or None,
+    )
+    cv_store.put(new_cv)
+    index_cv(new_cv)
+
+    return {"cv_id": cv_id, "extracted_text": truncated_text, "related_cv_ids": related_cv_ids}
+
+@app.post("/upload/bulk", status_code=202, response_model=JobResponse)
+async def upload_cvs_bulk(request: Request):
+    """
+    Stores many CVs from PDF/DOCX files and ZIP archives of them, sent as multipart
+    `files` fields. The files are received straight into a staging directory;
+    extraction and storage run as a background job that reports per-file progress.
+    """
+    # Refused before any of the body is read
+    bulk_upload.check_capacity(job_queue)
+    staged = bulk_upload.StagedUpload()
+    try:
+        received = await _receive_upload(request, bulk_upload.BULK_UPLOAD_MAX_BYTES, directory=staged.directory)
+    except HTTPException:
+        staged.discard()
+        raise
+    try:
+        for upload in received:
+            await run_in_threadpool(staged.add, upload)
+    except bulk_upload.BulkUploadError as e:
+        staged.discard()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if not staged.files:
+        staged.discard()
+        raise HTTPException(status_code=400, detail="No files to upload.")
 
-    return {"cv_id": cv_id, "extracted_text": truncated_text}
+    job = job_queue.submit(
+        "bulk_upload",
+        staged.payload(MAX_TEXT_LENGTH),
+        client_id=_client_id(request),
+        priority=bulk_upload.BULK_UPLOAD_PRIORITY,
+    )
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"/jobs/{job['id']}"})
+
+def _duplicate_upload_response(existing: CV) -> dict:
+    return {
+        "cv_id": existing.id,
+        "extracted_text": existing.extracted_text,
+        "duplicate_of": existing.id,
+        "related_cv_ids": existing.related_cv_ids or [],
+    }
 
 @app.post("/score", response_model=ScoreResponse)
-def calculate_score(data: ScoreRequest):
+async def calculate_score(data: ScoreRequest, request: Request):
     try:
-        cv_entry = cv_storage.get(data.cv_id)
-        if not isinstance(data.job_description, str) or not data.job_description.strip():
-            raise HTTPException(status_code=400, detail="Job description is required.")
+        if data.mode == "llm":
+            _check_client_quota(request)
+        data.job_description = _resolve_job_description(data)
+        cv_entry = cv_store.get(data.cv_id)
         # Determine text to score: prefer stored CV, else provided cv_text
         if cv_entry and isinstance(cv_entry.extracted_text, str) and cv_entry.extracted_text.strip():
             text_to_score = cv_entry.extracted_text
@@ -106,58 +279,359 @@ def calculate_score(data: ScoreRequest):
         else:
             raise HTTPException(status_code=404, detail="CV not found or text missing.")
 
-        result = calculate_ats_score(text_to_score, data.job_description)
+        tfidf_model.add_job_description(data.job_description)
+        metrics.inc("scoring_requests_total", mode=data.mode)
+        updates = {}
+        if data.edited and cv_entry and data.mode != "tfidf" and isinstance(data.cv_text, str) and data.cv_text.strip():
+            result, updates = await rescore(
+                cv_entry, data.cv_text, data.job_description, data.mode, use_cache=not data.bypass_cache
+            )
+        elif data.mode == "keyword":
+            result = simple_match_scores([text_to_score], data.job_description)[0]
+        elif data.mode == "tfidf":
+            # The first call fits or loads the model, which must not block the event loop
+            await run_in_threadpool(tfidf_model.ensure_ready, cv_store)
+            scored_id = cv_entry.id if cv_entry and text_to_score == cv_entry.extracted_text else None
+            result = tfidf_match_score(text_to_score, data.job_description, cv_id=scored_id)
+        else:
+            result = await calculate_ats_score(text_to_score, data.job_description, use_cache=not data.bypass_cache)
         
         if cv_entry:
-            cv_entry.ats_score = result["ats_score"]
-            cv_entry.matched_keywords = result["matched_keywords"]
-            cv_entry.missing_keywords = result["missing_keywords"]
+            cv_store.update(
+                cv_entry.id,
+                ats_score=result["ats_score"],
+                matched_keywords=result["matched_keywords"],
+                missing_keywords=result["missing_keywords"],
+                **updates,
+            )
         
         return result
     except Exception as e:
-        print(f"Error during score calculation: {e}")
         if isinstance(e, HTTPException):
             raise
+        metrics.log_event("score_failed", logging.ERROR, error=str(e))
         raise HTTPException(status_code=500, detail="Failed to calculate ATS score.")
 
+@app.post("/score/batch", response_model=BatchScoreResponse)
+async def calculate_score_batch(data: BatchScoreRequest, request: Request):
+    data.job_description = _resolve_job_description(data)
+
+    if data.cv_ids == "all":
+        cvs = list(cv_store.iter_all())
+        not_found = []
+    else:
+        cvs = cv_store.get_many(data.cv_ids)
+        found = {cv.id for cv in cvs}
+        not_found = [cv_id for cv_id in data.cv_ids if cv_id not in found]
+
+    tfidf_model.add_job_description(data.job_description)
+    if data.prefilter_top_k:
+        await run_in_threadpool(tfidf_model.ensure_ready, cv_store)
+        cvs = prefilter(cvs, data.job_description, data.prefilter_top_k)
+    if data.use_llm:
+        _check_client_quota(request, cost=len(cvs))
+
+    results = score_batch(cvs, data.job_description, use_llm=data.use_llm, use_cache=not data.bypass_cache)
+    if data.stream:
+        # One JSON object per line, in completion order
+        async def lines():
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return {"results": rank_results([result async for result in results]), "not_found": not_found}
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_route(data: AnalyzeRequest, request: Request):
+    """
+    Score, rewrite, cover letter and interview prep for one CV/JD pair in a single call.
+    """
+    data.job_description = _resolve_job_description(data)
+    cv_entry = cv_store.get(data.cv_id)
+    if cv_entry and cv_entry.extracted_text and cv_entry.extracted_text.strip():
+        cv_text = cv_entry.extracted_text
+    elif data.cv_text and data.cv_text.strip():
+        cv_text = data.cv_text
+    else:
+        raise HTTPException(status_code=404, detail="CV not found or text missing.")
+
+    if data.artifacts:
+        _check_client_quota(request)
+    tfidf_model.add_job_description(data.job_description)
+    outputs = analyze(cv_text, data.job_description, data.artifacts, strategy=data.strategy, use_cache=not data.bypass_cache)
+
+    def save(output: dict):
+        if not cv_entry or "result" not in output:
+            return
+        # Artifact names match the CV fields they are stored in
+        if output["artifact"] == "score":
+            cv_store.update(cv_entry.id, **output["result"])
+        else:
+            cv_store.update(cv_entry.id, **{output["artifact"]: output["result"]})
+
+    if data.stream:
+        # One JSON object per line, in completion order; the local score always comes first
+        async def lines():
+            try:
+                async for output in outputs:
+                    save(output)
+                    yield json.dumps(output) + "\n"
+            except Exception as e:
+                metrics.log_event("analyze_stream_failed", logging.WARNING, error=str(e))
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                yield json.dumps({"artifact": "error", "error": detail}) + "\n"
+            finally:
+                await outputs.aclose()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    response = {"errors": {}}
+    async for output in outputs:
+        save(output)
+        if "error" in output:
+            response["errors"][output["artifact"]] = output["error"]
+        elif output["artifact"] == "score":
+            response.update(output["result"])
+        else:
+            response[output["artifact"]] = output["result"]
+    return response
+
+# LLM tasks shared by the synchronous routes and the background job queue.
+# Each one writes its result back onto the stored CV record.
+async def _rewrite_task(payload: dict) -> dict:
+    rewritten_cv = await rewrite_cv(payload["cv_text"], payload["job_description"], use_cache=payload["use_cache"])
+    cv_store.update(payload["cv_id"], rewritten_cv=rewritten_cv)
+    return {"rewritten_cv": rewritten_cv}
+
+async def _cover_letter_task(payload: dict) -> dict:
+    cover_letter = await generate_cover_letter(payload["cv_text"], payload["job_description"], use_cache=payload["use_cache"])
+    cv_store.update(payload["cv_id"], cover_letter=cover_letter)
+    return {"cover_letter": cover_letter}
+
+async def _interview_questions_task(payload: dict) -> dict:
+    result = await generate_interview_questions(payload["cv_text"], payload["job_description"], use_cache=payload["use_cache"])
+    if result.get("source") != "local":
+        # Template questions would otherwise replace Gemini's for good
+        cv_store.update(payload["cv_id"], interview_prep=result)
+    return result
+
+async def _bulk_upload_task(payload: dict) -> dict:
+    return await bulk_upload.ingest(payload, cv_store, job_queue)
+
+job_queue.register("rewrite", _rewrite_task)
+job_queue.register("cover_letter", _cover_letter_task)
+job_queue.register("interview_questions", _interview_questions_task)
+job_queue.register("bulk_upload", _bulk_upload_task, cleanup=bulk_upload.discard_payload)
+
+def _client_id(request: Request) -> str:
+    return request.headers.get("X-Client-Id") or (request.client.host if request.client else "anonymous")
+
+def _check_client_quota(request: Request, cost: int = 1) -> None:
+    # Raises 429 with Retry-After once the client has used up its LLM quota
+    client_quota.check(_client_id(request), cost)
+
+def _task_payload(data: RewriteInput) -> dict:
+    return {
+        "cv_id": data.cv_id,
+        "cv_text": data.cv_text,
+        "job_description": data.job_description,
+        "use_cache": not data.bypass_cache,
+    }
+
+def _submit_job(kind: str, data: RewriteInput, request: Request) -> JSONResponse:
+    job = job_queue.submit(kind, _task_payload(data), client_id=_client_id(request), priority=data.priority)
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"/jobs/{job['id']}"})
+
 @app.post("/rewrite", response_model=RewriteResponse)
-def rewrite_cv_route(data: RewriteInput):
+async def rewrite_cv_route(data: RewriteInput, request: Request):
     try:
-        cv_entry = cv_storage.get(data.cv_id)
+        cv_entry = cv_store.get(data.cv_id)
         if not cv_entry:
             raise HTTPException(status_code=404, detail="CV not found.")
+        data.job_description = _resolve_job_description(data)
 
-        rewritten_cv = rewrite_cv(data.cv_text, data.job_description)
-        cv_entry.rewritten_cv = rewritten_cv
-        return {"rewritten_cv": rewritten_cv}
+        _check_client_quota(request)
+        if data.background:
+            return _submit_job("rewrite", data, request)
+        return await _rewrite_task(_task_payload(data))
+    except HTTPException:
+        raise
     except Exception as e:
         # The rewrite_cv service will log the specific error
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/cover-letter", response_model=CoverLetterResponse)
-def generate_cover_letter_route(data: RewriteInput):
+async def generate_cover_letter_route(data: RewriteInput, request: Request):
     try:
-        cv_entry = cv_storage.get(data.cv_id)
+        cv_entry = cv_store.get(data.cv_id)
         if not cv_entry:
             raise HTTPException(status_code=404, detail="CV not found.")
+        data.job_description = _resolve_job_description(data)
 
-        cover_letter = generate_cover_letter(data.cv_text, data.job_description)
-        return {"cover_letter": cover_letter}
+        _check_client_quota(request)
+        if data.background:
+            return _submit_job("cover_letter", data, request)
+        return await _cover_letter_task(_task_payload(data))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse_event(payload: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+async def _sse_response(request: Request, chunks: AsyncIterator[str], on_complete: Callable[[str], None]) -> StreamingResponse:
+    # Wait for the first chunk so configuration and upstream errors still surface as HTTP errors
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = ""
+
+    async def events():
+        parts = [first_chunk]
+        try:
+            yield _sse_event({"text": first_chunk})
+            async for chunk in chunks:
+                if await request.is_disconnected():
+                    break
+                parts.append(chunk)
+                yield _sse_event({"text": chunk})
+            else:
+                on_complete("".join(parts).strip())
+                yield _sse_event({}, event="done")
+        except Exception as e:
+            metrics.log_event("generation_stream_failed", logging.WARNING, error=str(e))
+            yield _sse_event({"error": str(e)}, event="error")
+        finally:
+            # Closing the generator cancels the upstream Gemini call on disconnect
+            await chunks.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/rewrite/stream")
+async def rewrite_cv_stream_route(data: RewriteInput, request: Request):
+    cv_entry = get_cv_entry(data.cv_id)
+    data.job_description = _resolve_job_description(data)
+    _check_client_quota(request)
+
+    def save(text: str):
+        cv_store.update(cv_entry.id, rewritten_cv=text)
+
+    chunks = stream_rewrite_cv(data.cv_text, data.job_description, use_cache=not data.bypass_cache)
+    return await _sse_response(request, chunks, save)
+
+@app.post("/cover-letter/stream")
+async def generate_cover_letter_stream_route(data: RewriteInput, request: Request):
+    cv_entry = get_cv_entry(data.cv_id)
+    data.job_description = _resolve_job_description(data)
+    _check_client_quota(request)
+
+    def save(text: str):
+        cv_store.update(cv_entry.id, cover_letter=text)
+
+    chunks = stream_cover_letter(data.cv_text, data.job_description, use_cache=not data.bypass_cache)
+    return await _sse_response(request, chunks, save)
+
 @app.post("/interview-questions", response_model=InterviewPrepResponse)
-def generate_interview_questions_route(data: RewriteInput):
+async def generate_interview_questions_route(data: RewriteInput, request: Request):
     try:
-        cv_entry = cv_storage.get(data.cv_id)
+        cv_entry = cv_store.get(data.cv_id)
         if not cv_entry:
             raise HTTPException(status_code=404, detail="CV not found.")
+        data.job_description = _resolve_job_description(data)
 
-        result = generate_interview_questions(data.cv_text, data.job_description)
-        return result
+        _check_client_quota(request)
+        if data.background:
+            return _submit_job("interview_questions", data, request)
+        return await _interview_questions_task(_task_payload(data))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    # With `wait`, long-poll until the job finishes or the timeout passes
+    job = await job_queue.wait(job_id, wait) if wait else job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def subscribe_job(job_id: str, request: Request):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def events():
+        current = job
+        yield _sse_event(current, event="status")
+        while current["status"] not in ("succeeded", "failed"):
+            if await request.is_disconnected():
+                return
+            current = await job_queue.wait(job_id, 15, updates=True)
+            if current is None:
+                # Dropped from the job history, or from the shared state of another worker
+                yield _sse_event({"id": job_id, "status": "not_found"}, event="done")
+                return
+            # Sent on every state change or progress report, and every 15 seconds while
+            # waiting, which also keeps proxies from timing out
+            yield _sse_event(current, event="status")
+        yield _sse_event({}, event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return result_cache.stats()
+
+def _cache_samples():
+    stats = result_cache.stats()
+    for name in ("hits", "disk_hits", "misses", "evictions", "entries", "bytes"):
+        yield f"llm_cache_{name}", {}, stats[name]
+
+def _job_queue_samples():
+    stats = job_queue.stats()
+    yield "job_queue_depth", {}, stats["queued"]
+    for status, count in stats["jobs"].items():
+        yield "jobs", {"status": status}, count
+
+def _llm_capacity_samples():
+    limiter = llm_client.get_concurrency()
+    if limiter is not None:
+        yield "llm_concurrency_limit", {}, limiter.limit
+        yield "llm_in_flight", {}, limiter.in_flight
+        yield "llm_queue_depth", {}, limiter.queued
+
+metrics.add_collector(_cache_samples)
+metrics.add_collector(_llm_capacity_samples)
+metrics.add_collector(_job_queue_samples)
+metrics.add_collector(llm_router.breaker_samples)
+metrics.add_collector(jd_profiles.profile_samples)
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe. With WARMUP=ready it first imports the heavy dependencies,
+    so the instance only takes traffic once the first request will not pay for them.
+    """
+    if WARMUP != "ready":
+        return {"status": "ready", "loaded": lazy_import.loaded()}
+    timings = lazy_import.warmup()
+    failed = [name for name, seconds in timings.items() if seconds is None]
+    if failed:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "failed": failed})
+    return {"status": "ready", "loaded": lazy_import.loaded(), "warmup_seconds": timings}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/templates")
 def get_templates():
     return {"templates": list_templates()}
@@ -171,17 +645,122 @@ def apply_template_route(data: TemplateRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 # New endpoints for CV management
-@app.get("/api/cvs", response_model=CVListResponse)
-def get_all_cvs():
-    return {"cvs": list(cv_storage.values())}
+@app.get("/api/cvs", response_model=CVListResponse, response_model_exclude_unset=True)
+def get_all_cvs(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    sort: str = "uploaded_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None,
+    filename: Optional[str] = None,
+):
+    # Without `fields`, listings leave out the large text columns
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else SUMMARY_FIELDS
+    unknown = [f for f in selected if f not in CVSummary.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if sort not in SORTABLE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Sort must be one of: {', '.join(sorted(SORTABLE_FIELDS))}")
+    if "id" not in selected:
+        selected = ["id"] + selected
+
+    # Rows come from the store already projected, so the response is encoded
+    # directly instead of being validated into CVListResponse first
+    total = cv_store.count(filename=filename)
+    if not fields:
+        # Default listings are joined from records the store keeps pre-encoded
+        rows = cv_store.list_json(offset=offset, limit=limit, sort=sort, descending=order == "desc", filename=filename)
+        tail = json_codec.dumps({"total": total, "offset": offset, "limit": limit})
+        return Response(content=b'{"cvs":[' + b",".join(rows) + b"]," + tail[1:], media_type="application/json")
+    cvs = cv_store.list(
+        offset=offset,
+        limit=limit,
+        sort=sort,
+        descending=order == "desc",
+        fields=selected,
+        filename=filename,
+    )
+    content = json_codec.dumps({"cvs": cvs, "total": total, "offset": offset, "limit": limit})
+    return Response(content=content, media_type="application/json")
 
-@app.get("/api/cvs/{cv_id}", response_model=CV)
+@app.get("/api/search", response_model=SearchResponse)
+def search_cvs(
+    q: str = Query(..., min_length=1),
+    mode: str = Query("bm25", pattern="^(bm25|boolean)$"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    start = time.perf_counter()
+    try:
+        if mode == "boolean":
+            keys, total = search_index.search_boolean(q, limit=limit)
+            hits = [(key, None) for key in keys]
+        else:
+            hits, total = search_index.search_bm25(q, limit=limit)
+    except QuerySyntaxError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filenames = {cv.id: cv.filename for cv in cv_store.get_many([key for key, _ in hits])}
+    results = [
+        {"cv_id": key, "filename": filenames[key], "score": score}
+        for key, score in hits
+        if key in filenames
+    ]
+    took_ms = round((time.perf_counter() - start) * 1000, 3)
+    return {"results": results, "total": total, "took_ms": took_ms}
+
+@app.get("/api/cvs/{cv_id}", response_model=CVDetail)
 def get_cv_by_id(cv_id: str):
     return get_cv_entry(cv_id)
 
 @app.delete("/api/cvs/{cv_id}")
 def delete_cv_by_id(cv_id: str):
-    if cv_id in cv_storage:
-        del cv_storage[cv_id]
+    if cv_store.delete(cv_id):
+        unindex_cv(cv_id)
         return {"message": f"CV with ID {cv_id} deleted successfully."}
     raise HTTPException(status_code=404, detail="CV not found.")
+
+@app.post("/api/skills/resolve", response_model=SkillLookupResponse)
+def resolve_skill_phrases(data: SkillLookupRequest):
+    """
+    Maps phrases to canonical skills with the local skill index, without calling Gemini.
+    """
+    matches = resolve_skills(data.phrases)
+    return {"matches": [{"phrase": p, "skill": skill, "similarity": similarity} for p, (skill, similarity) in zip(data.phrases, matches)]}
+
+@app.post("/api/job-descriptions", response_model=JobDescription)
+async def create_job_description(data: JobDescriptionInput, request: Request):
+    """
+    Stores a job description with its profile, computed once here so requests that
+    pass its jd_id only do the CV side of the work.
+    """
+    if not data.text.strip():
+        raise HTTPException(status_code=400, detail="Job description is required.")
+    normalized_hash = text_hash(data.text)
+    existing = jd_store.find_by_hash(normalized_hash)
+    if existing:
+        return existing
+    _check_client_quota(request)
+    jd = await jd_profiles.build_profile(data.text, normalized_hash, title=data.title)
+    jd_store.put(jd)
+    jd_profiles.register(jd)
+    return jd
+
+@app.get("/api/job-descriptions", response_model=JobDescriptionListResponse)
+def get_all_job_descriptions(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    jds = jd_store.list(offset=offset, limit=limit)
+    return {"job_descriptions": jds, "total": jd_store.count(), "offset": offset, "limit": limit}
+
+@app.get("/api/job-descriptions/{jd_id}", response_model=JobDescription)
+def get_job_description(jd_id: str):
+    jd = jd_store.get(jd_id)
+    if not jd:
+        raise HTTPException(status_code=404, detail="Job description not found.")
+    return jd
+
+@app.delete("/api/job-descriptions/{jd_id}")
+def delete_job_description(jd_id: str):
+    jd = jd_store.get(jd_id)
+    if not jd or not jd_store.delete(jd_id):
+        raise HTTPException(status_code=404, detail="Job description not found.")
+    jd_profiles.forget(jd)
+    return {"message": f"Job description with ID {jd_id} deleted successfully."}
@@ -1,12 +1,48 @@
+import logging
+import time
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from typing import Union
+from services import metrics
 
 async def error_handler(request: Request, call_next):
+    if not metrics.ENABLED:
+        try:
+            return await call_next(request)
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"error": str(e)}
+            )
+
+    # Stage spans opened while handling this request add their durations here
+    stages = {}
+    token = metrics.request_stages.set(stages)
+    started = time.perf_counter()
+    status = 500
     try:
-        return await call_next(request)
+        response = await call_next(request)
+        status = response.status_code
+        return response
     except Exception as e:
+        metrics.log_event("unhandled_error", logging.ERROR, method=request.method, path=request.url.path, error=repr(e))
         return JSONResponse(
             status_code=500,
             content={"error": str(e)}
-        )
\ No newline at end of file
+        )
+    finally:
+        duration = time.perf_counter() - started
+        # Label by route template rather than raw path to keep label sets bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.inc("http_requests_total", method=request.method, route=path, status=status)
+        metrics.observe("http_request_duration_seconds", duration, method=request.method, route=path)
+        metrics.log_event(
+            "request",
+            method=request.method,
+            route=path,
+            status=status,
+            duration_ms=round(duration * 1000, 3),
+            stages=stages,
+        )
+        metrics.request_stages.reset(token)
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+Artifact = Literal["rewritten_cv", "cover_letter", "interview_prep"]
+
+class AnalyzeRequest(BaseModel):
+    cv_id: str
+    # Either the JD text, or the id of a stored job description (/api/job-descriptions)
+    job_description: Optional[str] = None
+    jd_id: Optional[str] = None
+    cv_text: Optional[str] = None
+    artifacts: List[Artifact] = ["rewritten_cv", "cover_letter", "interview_prep"]
+    # "combined": one Gemini request for all artifacts; "parallel": one concurrent request each
+    strategy: Literal["combined", "parallel"] = "combined"
+    # Stream one NDJSON line per artifact as it completes
+    stream: bool = False
+    bypass_cache: bool = False
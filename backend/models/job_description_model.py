@@ -0,0 +1,6 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class JobDescriptionInput(BaseModel):
+    text: str = Field(..., min_length=1)
+    title: Optional[str] = None
@@ -1,15 +1,34 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 class UploadResponse(BaseModel):
     cv_id: str
     extracted_text: str
     error: Optional[str] = None
+    # Set when the upload matched an existing CV, which is returned instead
+    duplicate_of: Optional[str] = None
+    related_cv_ids: List[str] = []
 
 class ScoreResponse(BaseModel):
     ats_score: float
     matched_keywords: List[str]
     missing_keywords: List[str]
+    # Set when an edited CV was re-scored: sections re-analysed, and whether the
+    # previous Gemini analysis was adjusted instead of calling Gemini again
+    changed_sections: Optional[int] = None
+    llm_reused: Optional[bool] = None
+
+class BatchScoreResult(BaseModel):
+    cv_id: str
+    filename: str
+    ats_score: float
+    matched_keywords: List[str]
+    missing_keywords: List[str]
+    source: str
+
+class BatchScoreResponse(BaseModel):
+    results: List[BatchScoreResult]
+    not_found: List[str] = []
 
 class RewriteResponse(BaseModel):
     rewritten_cv: str
@@ -24,8 +43,11 @@ class InterviewPrepResponse(BaseModel):
     behavioral_questions: List[str]
     tips: List[str]
     error: Optional[str] = None
+    # "local" for template questions built without Gemini
+    source: Optional[str] = None
 
-class CV(BaseModel):
+class CVDetail(BaseModel):
+    # A CV as the API returns it
     id: str
     filename: str
     extracted_text: str
@@ -33,6 +55,110 @@ class CV(BaseModel):
     matched_keywords: Optional[List[str]] = None
     missing_keywords: Optional[List[str]] = None
     rewritten_cv: Optional[str] = None
+    cover_letter: Optional[str] = None
+    interview_prep: Optional[Dict[str, Any]] = None
+    uploaded_at: Optional[float] = None
+    related_cv_ids: Optional[List[str]] = None
+
+class CV(CVDetail):
+    # The stored record: adds the fingerprints used for deduplication and
+    # re-scoring, which are not part of any response
+    content_hash: Optional[str] = None
+    text_hash: Optional[str] = None
+    simhash: Optional[str] = None
+    # Per-section fingerprints and keyword terms, and the last Gemini analysis, kept
+    # so that re-scoring an edited CV only redoes what changed
+    score_sections: Optional[List[Dict[str, Any]]] = None
+    llm_score_basis: Optional[Dict[str, Any]] = None
+
+class CVSummary(BaseModel):
+    # Projection of CV: only the requested fields are set
+    id: str
+    filename: Optional[str] = None
+    extracted_text: Optional[str] = None
+    ats_score: Optional[float] = None
+    matched_keywords: Optional[List[str]] = None
+    missing_keywords: Optional[List[str]] = None
+    rewritten_cv: Optional[str] = None
+    cover_letter: Optional[str] = None
+    interview_prep: Optional[Dict[str, Any]] = None
+    uploaded_at: Optional[float] = None
+    related_cv_ids: Optional[List[str]] = None
+
+class JobDescription(BaseModel):
+    id: str
+    title: Optional[str] = None
+    text: str
+    created_at: Optional[float] = None
+    text_hash: Optional[str] = None
+    # Profile computed once at ingest and reused by every request that passes jd_id
+    normalized_text: Optional[str] = None
+    critical_skills: List[str] = []
+    # "llm" when Gemini extracted the critical skills, "keywords" for the keyword-engine fallback
+    skills_source: Optional[str] = None
+    keywords: List[str] = []
+    compact_text: Optional[str] = None
+
+class CriticalSkillsResponse(BaseModel):
+    critical_skills: List[str]
+
+class SkillMatch(BaseModel):
+    phrase: str
+    # Canonical skill from the ontology, or None when nothing is close enough
+    skill: Optional[str] = None
+    similarity: float
+
+class SkillLookupResponse(BaseModel):
+    matches: List[SkillMatch]
+
+class JobDescriptionSummary(BaseModel):
+    id: str
+    title: Optional[str] = None
+    created_at: Optional[float] = None
+    critical_skills: List[str] = []
+    skills_source: Optional[str] = None
+
+class JobDescriptionListResponse(BaseModel):
+    job_descriptions: List[JobDescriptionSummary]
+    total: int
+    offset: int
+    limit: int
 
 class CVListResponse(BaseModel):
-    cvs: List[CV]
+    cvs: List[CVSummary]
+    total: int
+    offset: int
+    limit: int
+
+class SearchHit(BaseModel):
+    cv_id: str
+    filename: str
+    score: Optional[float] = None
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    total: int
+    took_ms: float
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    created_at: float
+    updated_at: float
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    # Reported by long jobs such as bulk uploads while they run
+    progress: Optional[Dict[str, Any]] = None
+
+class AnalyzeResponse(BaseModel):
+    ats_score: float
+    matched_keywords: List[str]
+    missing_keywords: List[str]
+    rewritten_cv: Optional[str] = None
+    cover_letter: Optional[str] = None
+    interview_prep: Optional[Dict[str, Any]] = None
+    # Artifact name -> error message for artifacts that could not be generated
+    errors: Dict[str, str] = {}
@@ -1,6 +1,14 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field
 
 class RewriteInput(BaseModel):
     cv_id: str
     cv_text: str
-    job_description: str
+    # Either the JD text, or the id of a stored job description (/api/job-descriptions)
+    job_description: Optional[str] = None
+    jd_id: Optional[str] = None
+    bypass_cache: bool = False
+    # Run as a background job: the route returns 202 with a job id to poll at /jobs/{id}
+    background: bool = False
+    # Higher runs first; bulk uploads run at -1 below every client-chosen priority
+    priority: int = Field(0, ge=0, le=2)
@@ -1,7 +1,25 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
 
 class ScoreRequest(BaseModel):
     cv_id: str
-    job_description: str
+    # Either the JD text, or the id of a stored job description (/api/job-descriptions)
+    job_description: Optional[str] = None
+    jd_id: Optional[str] = None
     cv_text: Optional[str] = None
+    # cv_text is an edited version of the stored CV: re-score only the changed sections
+    edited: bool = False
+    bypass_cache: bool = False
+    # "keyword" (local keyword engine), "tfidf", or "llm" (Gemini with keyword fallback, opt-in)
+    mode: Literal["llm", "keyword", "tfidf"] = "keyword"
+
+class BatchScoreRequest(BaseModel):
+    # Either the JD text, or the id of a stored job description (/api/job-descriptions)
+    job_description: Optional[str] = None
+    jd_id: Optional[str] = None
+    cv_ids: Union[List[str], Literal["all"]] = "all"
+    use_llm: bool = False
+    stream: bool = False
+    # Keep only the k CVs most similar to the JD under the TF-IDF model before scoring
+    prefilter_top_k: Optional[int] = Field(None, ge=1)
+    bypass_cache: bool = False
@@ -0,0 +1,6 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+class SkillLookupRequest(BaseModel):
+    # Phrases as written in a CV or job description, looked up in one batch
+    phrases: List[str] = Field(..., min_length=1, max_length=1000)
@@ -0,0 +1,64 @@
+"""
+Production launcher. Runs the API in several worker processes that share CVs,
+the LLM result cache, rate limits and job states through SQLite files:
+
+    python serve.py --workers 4 --port 8000
+
+On SIGINT/SIGTERM the workers stop accepting connections, finish in-flight
+requests, then drain background jobs and Gemini calls before exiting.
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def configure_environment(workers: int) -> None:
+    """
+    Fills in the settings a multi-worker deployment needs, without overriding
+    anything set explicitly. Worker processes inherit the environment.
+    """
+    if workers > 1:
+        if os.getenv("CV_STORE_BACKEND", "sqlite").lower() != "sqlite":
+            raise SystemExit("CV_STORE_BACKEND must be sqlite when running more than one worker.")
+        os.environ.setdefault("SHARED_STATE_DB", "shared_state.db")
+        os.environ.setdefault("LLM_CACHE_DB", "llm_cache.db")
+    cpus = os.cpu_count() or 1
+    # Split the cores and the Gemini concurrency budget between the workers
+    os.environ.setdefault("EXTRACTION_WORKERS", str(max(1, cpus // workers)))
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(max(1, 64 // workers)))
+
+
+def main() -> int:
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    parser = argparse.ArgumentParser(description="Run the CV Analyser API with several worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=float(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        help="seconds in-flight requests get to finish on shutdown",
+    )
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    configure_environment(workers)
+    uvicorn.run(
+        "main_backend:app",
+        app_dir=BACKEND_DIR,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from pydantic import ValidationError
+from models.response_models import InterviewPrepResponse
+from services.ats_score import simple_match_scores
+from services.cache import make_key, result_cache
+from services.rewrite_cv import rewrite_cv
+from services.cover_letter import generate_cover_letter
+from services.interview_prep import generate_interview_questions
+from services import llm_client, llm_router, metrics
+from services.rate_limit import CapacityError
+from services.prompt_compaction import compact_cv, compact_job_description
+from services.structured_output import PartialJSONParser, json_config, response_schema
+
+ARTIFACTS = ("rewritten_cv", "cover_letter", "interview_prep")
+
+# Cache endpoints of the single-artifact services, so /analyze and the
+# individual routes answer from each other's results
+_CACHE_ENDPOINTS = {
+    "rewritten_cv": "rewrite",
+    "cover_letter": "cover_letter",
+    "interview_prep": "interview_questions",
+}
+
+_GENERATORS = {
+    "rewritten_cv": rewrite_cv,
+    "cover_letter": generate_cover_letter,
+    "interview_prep": generate_interview_questions,
+}
+
+_INSTRUCTIONS = {
+    "rewritten_cv": """"rewritten_cv": The full text of the CV rewritten to target a 90%+ ATS match for the Job Description.
+    - Identify the top 10 most critical hard skills, tools, and requirements in the Job Description and the gaps in the CV.
+    - Naturally incorporate the missing critical keywords into bullet points rather than listing them.
+    - Use strong action verbs and keep the tone professional, concise, and impact-driven.
+    - Maintain the truthfulness of the candidate's experience but frame it for this specific job.""",
+    "cover_letter": """"cover_letter": The body of a compelling, personalized cover letter for this job.
+    - Hook the reader in the opening paragraph and articulate why the candidate is a great fit.
+    - Highlight specific achievements from the CV that demonstrate the required skills.
+    - Express genuine enthusiasm with a professional and confident tone.
+    - No placeholders such as "[Your Name]" or "[Date]"; it should paste cleanly into an email.""",
+    "interview_prep": """"interview_prep": An object with
+    - "technical_questions": 5-7 technical questions specific to the role and the candidate's stack.
+    - "behavioral_questions": 3-5 behavioral questions (STAR method style) relevant to the role's level.
+    - "tips": 3-5 specific tips for this interview.""",
+}
+
+
+def _build_combined_prompt(cv_text: str, job_description: str, artifacts: Sequence[str]) -> str:
+    fields = "\n\n".join(f"{number}. {_INSTRUCTIONS[name]}" for number, name in enumerate(artifacts, 1))
+    return f"""
+You are an expert resume writer, career coach, and technical recruiter.
+Using the Job Description and Candidate CV below, produce a single JSON object with these fields:
+
+{fields}
+
+Return ONLY the JSON object, with exactly these fields.
+
+Job Description:
+{compact_job_description(job_description, endpoint="analyze")}
+
+Candidate CV:
+{compact_cv(cv_text, job_description, keep_all="rewritten_cv" in artifacts, endpoint="analyze")}
+"""
+
+
+def _combined_schema(artifacts: Sequence[str]) -> Dict[str, Any]:
+    text = {"type": "STRING"}
+    properties = {name: response_schema(InterviewPrepResponse) if name == "interview_prep" else text for name in artifacts}
+    return {"type": "OBJECT", "properties": properties, "required": list(artifacts)}
+
+
+def _artifact_value(name: str, value: Any) -> Optional[Any]:
+    if name == "interview_prep":
+        try:
+            return InterviewPrepResponse.model_validate(value).model_dump(exclude={"error", "source"})
+        except ValidationError:
+            return None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip()
+
+
+def cached_artifacts(cv_text: str, job_description: str, artifacts: Sequence[str]) -> Dict[str, Any]:
+    found = {}
+    for name in artifacts:
+        cached = result_cache.get(make_key(_CACHE_ENDPOINTS[name], llm_router.model_for(_CACHE_ENDPOINTS[name]), cv_text, job_description))
+        if cached is not None:
+            found[name] = cached
+    return found
+
+
+async def _generate_combined(cv_text: str, job_description: str, artifacts: Sequence[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Generates several artifacts with one streamed Gemini request, yielding each one
+    as soon as its part of the JSON reply is complete. Each one is cached under the
+    same key its own service uses. Artifacts missing or invalid in the reply
+    (for example because it was cut off) are not yielded.
+    """
+    parser = PartialJSONParser()
+    done = set()
+    chunks = llm_router.stream(
+        _build_combined_prompt(cv_text, job_description, artifacts),
+        "analyze",
+        generation_config=json_config(_combined_schema(artifacts)),
+    )
+    try:
+        async for chunk in chunks:
+            with metrics.span("response_parsing"):
+                parser.feed(chunk)
+                members = parser.members()
+            for name in artifacts:
+                if name in done or name not in members:
+                    continue
+                done.add(name)
+                value = _artifact_value(name, members[name])
+                if value is None:
+                    continue
+                result_cache.set(make_key(_CACHE_ENDPOINTS[name], llm_router.model_for(_CACHE_ENDPOINTS[name]), cv_text, job_description), value)
+                yield name, value
+    finally:
+        await chunks.aclose()
+    metrics.inc("structured_output_total", endpoint="analyze", outcome="ok" if parser.complete else "partial")
+
+
+async def analyze(
+    cv_text: str,
+    job_description: str,
+    artifacts: Sequence[str] = ARTIFACTS,
+    strategy: str = "combined",
+    use_cache: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Scores the CV locally, then generates the requested artifacts either with one
+    combined Gemini request ("combined") or with concurrent per-artifact requests
+    ("parallel"). Yields {"artifact", "result"} (or "error") as each one is ready.
+    """
+    yield {"artifact": "score", "result": simple_match_scores([cv_text], job_description)[0]}
+
+    pending: List[str] = [name for name in ARTIFACTS if name in artifacts]
+    if use_cache:
+        for name, value in cached_artifacts(cv_text, job_description, pending).items():
+            pending.remove(name)
+            yield {"artifact": name, "result": value}
+    if not pending:
+        return
+
+    if not llm_client.is_configured():
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
+
+    if strategy == "combined" and len(pending) > 1:
+        try:
+            async for name, value in _generate_combined(cv_text, job_description, tuple(pending)):
+                pending.remove(name)
+                yield {"artifact": name, "result": value}
+        except CapacityError:
+            # Fanning out into more requests would only add to the overload
+            raise
+        except Exception as e:
+            # Fall back to one request per artifact for whatever the combined call missed
+            metrics.log_event("analyze_combined_failed", logging.WARNING, error=str(e))
+
+    async def run(name: str) -> Dict[str, Any]:
+        try:
+            result = await _GENERATORS[name](cv_text, job_description, use_cache=False)
+            return {"artifact": name, "result": result}
+        except Exception as e:
+            return {"artifact": name, "error": e.detail if isinstance(e, HTTPException) else str(e)}
+
+    tasks = [asyncio.create_task(run(name)) for name in pending]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding generations when the consumer goes away
+        for task in tasks:
+            task.cancel()
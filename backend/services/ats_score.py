@@ -1,15 +1,16 @@
-from typing import List, Set, Dict, Any
-import re
-import os
-import json
-import google.generativeai as genai
-
-def _tokenize(text: str) -> List[str]:
-    text = (text or "").lower()
-    return re.findall(r"[a-z0-9]+", text)
+from typing import List, Set, Dict, Any, Optional, Tuple
+import logging
+from services.cache import make_key, result_cache
+from services import jd_profiles, llm_client, llm_router, metrics
+from utils.scoring_model import tfidf_model, calculate_similarity
+from utils.keyword_engine import match_many
+from services.prompt_compaction import compact_cv, compact_job_description
+from services.structured_output import generate_structured
+from models.response_models import ScoreResponse
+from utils.tokenizer import STOP_WORDS
 
 def _stop_words() -> Set[str]:
-    return {"the","and","is","in","at","of","a","to","for","on","with","by","an","as","be"}
+    return STOP_WORDS
 
 GENERIC_EXCLUDE = {
     "years","year","experience","experiences","your","should","must","ability","able","good","excellent",
@@ -43,91 +44,90 @@ def _filter_keywords(keywords: List[str]) -> List[str]:
     return result[:25]
 
 def _simple_match_score(cv_text: str, job_description: str) -> Dict[str, Any]:
-    stop_words = _stop_words()
-    cv_words = _tokenize(cv_text)
-    jd_words = _tokenize(job_description)
-    cv_keywords = {w for w in cv_words if w.isalnum() and w not in stop_words}
-    jd_keywords = {w for w in jd_words if w.isalnum() and w not in stop_words}
-    matched = cv_keywords.intersection(jd_keywords)
-    missing = jd_keywords - cv_keywords
-    matched_f = _filter_keywords(sorted(list(matched)))
-    missing_f = _filter_keywords(sorted(list(missing)))
-    # Recompute score using filtered sets to better reflect relevancy
-    denom = len(_filter_keywords(sorted(list(jd_keywords)))) or 1
-    score = round(len(matched_f) / denom * 100, 2)
-    return {
-        "ats_score": float(score),
-        "matched_keywords": matched_f,
-        "missing_keywords": missing_f,
-    }
+    with metrics.span("tokenization"):
+        return match_many([cv_text], job_description)[0]
+
+def simple_match_scores(cv_texts: List[str], job_description: str) -> List[Dict[str, Any]]:
+    """
+    Keyword-scores many CVs against one job description with the local keyword engine.
+    """
+    with metrics.span("tokenization"):
+        return match_many(cv_texts, job_description)
+
+def tfidf_match_score(cv_text: str, job_description: str, cv_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Deterministic score from the corpus TF-IDF model; keyword lists come from the keyword matcher.
+    """
+    result = _simple_match_score(cv_text, job_description)
+    similarity = tfidf_model.similarity(job_description, [cv_id]).get(cv_id) if cv_id else None
+    if similarity is None:
+        similarity = calculate_similarity(cv_text, job_description)
+    result["ats_score"] = float(similarity)
+    return result
+
+def _job_description_input(job_description: str) -> str:
+    # A stored JD's critical skills were extracted once at ingest; send them instead of the JD
+    profile = jd_profiles.lookup(job_description)
+    if profile and profile.skills_source == "llm" and profile.critical_skills:
+        return "Critical skills required: " + ", ".join(profile.critical_skills)
+    return compact_job_description(job_description, endpoint="ats_score")
 
-def _gemini_analyze(cv_text: str, job_description: str) -> Dict[str, Any]:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+async def _gemini_analyze(cv_text: str, job_description: str, use_cache: bool = True) -> Dict[str, Any]:
+    cache_key = make_key("ats_score", llm_router.model_for("ats_score"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not llm_client.is_configured():
         raise RuntimeError("GEMINI_API_KEY not configured")
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
         prompt = (
             "You are a strict ATS (Applicant Tracking System) expert. Your goal is to evaluate the relevance of a CV against a Job Description.\n"
             "1. Identify the CRITICAL HARD SKILLS, TOOLS, and DOMAIN KNOWLEDGE required in the Job Description. Ignore generic soft skills like 'communication' or 'teamwork' unless they are absolutely central to the role.\n"
             "2. Check if these specific critical keywords exist in the CV.\n"
             "3. Calculate a score from 0 to 100 based strictly on the presence of these critical skills. A score above 90 requires almost a perfect match of all technical requirements.\n"
             "4. Return the result in STRICT JSON format.\n\n"
-            "Job Description:\n" + job_description + "\n\n"
-            "CV:\n" + cv_text + "\n\n"
             "Output JSON structure:\n"
             "{\n"
-            "  \"score\": <integer 0-100>,\n"
+            "  \"ats_score\": <integer 0-100>,\n"
             "  \"matched_keywords\": [<list of specific hard skills found in CV>],\n"
             "  \"missing_keywords\": [<list of specific hard skills missing from CV>]\n"
-            "}"
+            "}\n\n"
+            # Inputs go last so every scoring prompt shares the same instruction prefix
+            "Job Description:\n" + _job_description_input(job_description) + "\n\n"
+            "CV:\n" + compact_cv(cv_text, job_description, endpoint="ats_score")
         )
-        response = model.generate_content(prompt)
-        content = (response.text or "").strip()
-        # Attempt to extract JSON from content
-        json_str = content
-        if '```' in content:
-            # Handle potential fenced code blocks
-            parts = content.split('```')
-            for part in parts:
-                part = part.strip()
-                if part.startswith('{') and part.endswith('}'):
-                    json_str = part
-                    break
-        # Clean up potential json markdown prefix
-        if json_str.startswith('json'):
-            json_str = json_str[4:].strip()
-            
-        data = json.loads(json_str)
-        score_val = data.get("score")
-        matched = data.get("matched_keywords", [])
-        missing = data.get("missing_keywords", [])
-        # Normalize
-        if isinstance(score_val, str):
-            score_val = re.sub(r"[^0-9]", "", score_val)
-            score_val = int(score_val) if score_val else 0
-        if not isinstance(score_val, int):
-            score_val = int(round(float(score_val))) if score_val is not None else 0
-        matched = [str(x).strip() for x in matched if str(x).strip()]
-        missing = [str(x).strip() for x in missing if str(x).strip()]
-        score_val = max(0, min(100, score_val))
-        
-        # We trust Gemini's filtering more now, but still apply a light cleanup
-        matched_f = _filter_keywords(matched)
-        missing_f = _filter_keywords(missing)
-        
-        return {
-            "ats_score": float(score_val),
-            "matched_keywords": matched_f,
-            "missing_keywords": missing_f,
-        }
+        analysis = await generate_structured(prompt, ScoreResponse, endpoint="ats_score")
     except Exception as e:
         raise RuntimeError(f"Gemini analysis failed: {e}")
 
-def calculate_ats_score(cv_text: str, job_description: str) -> Dict[str, Any]:
+    # We trust Gemini's filtering more now, but still apply a light cleanup
+    result = {
+        "ats_score": float(max(0, min(100, round(analysis.ats_score)))),
+        "matched_keywords": _filter_keywords([k.strip() for k in analysis.matched_keywords if k.strip()]),
+        "missing_keywords": _filter_keywords([k.strip() for k in analysis.missing_keywords if k.strip()]),
+    }
+    result_cache.set(cache_key, result)
+    return result
+
+async def calculate_ats_score(cv_text: str, job_description: str, use_cache: bool = True) -> Dict[str, Any]:
+    result, _ = await score_with_llm(cv_text, job_description, use_cache=use_cache)
+    return result
+
+async def score_with_llm(cv_text: str, job_description: str, use_cache: bool = True) -> Tuple[Dict[str, Any], bool]:
+    """
+    Same as calculate_ats_score, and also says whether Gemini answered (False when
+    the keyword fallback did).
+    """
+    if llm_router.is_local("ats_score"):
+        # Routed to the local scorer outright
+        return _simple_match_score(cv_text, job_description), False
     # Try Gemini first; if it fails, use simple fallback
     try:
-        return _gemini_analyze(cv_text, job_description)
-    except Exception:
-        return _simple_match_score(cv_text, job_description)
+        return await _gemini_analyze(cv_text, job_description, use_cache=use_cache), True
+    except Exception as e:
+        metrics.inc("scoring_fallbacks_total", reason=type(e.__cause__ or e.__context__ or e).__name__)
+        metrics.log_event("scoring_fallback", logging.WARNING, error=str(e))
+        with metrics.span("fallback"):
+            return _simple_match_score(cv_text, job_description), False
@@ -0,0 +1,64 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from models.response_models import CV
+from services.ats_score import score_with_llm, simple_match_scores
+from utils.scoring_model import tfidf_model
+
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+def _result(cv: CV, score: Dict[str, Any], source: str) -> Dict[str, Any]:
+    return {
+        "cv_id": cv.id,
+        "filename": cv.filename,
+        "ats_score": score["ats_score"],
+        "matched_keywords": score["matched_keywords"],
+        "missing_keywords": score["missing_keywords"],
+        "source": source,
+    }
+
+def prefilter(cvs: List[CV], job_description: str, top_k: int) -> List[CV]:
+    """
+    Keeps the `top_k` CVs most similar to the JD in a single TF-IDF matrix-vector product.
+    """
+    similarities = tfidf_model.similarity(job_description, [cv.id for cv in cvs])
+    ranked = sorted(cvs, key=lambda cv: similarities.get(cv.id, 0.0), reverse=True)
+    return ranked[:top_k]
+
+def rank_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(results, key=lambda r: (-r["ats_score"], r["filename"], r["cv_id"]))
+
+async def score_batch(
+    cvs: List[CV],
+    job_description: str,
+    use_llm: bool = False,
+    use_cache: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Scores many CVs against one job description and yields each result as soon as it is ready.
+    The keyword pass runs first over the whole batch; with `use_llm` the Gemini calls then fan
+    out with at most BATCH_LLM_CONCURRENCY in flight, falling back to the keyword score per CV.
+    """
+    keyword_scores = simple_match_scores([cv.extracted_text for cv in cvs], job_description)
+    if not use_llm:
+        for cv, score in zip(cvs, keyword_scores):
+            yield _result(cv, score, "keyword")
+        return
+
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+    async def score_one(cv: CV, keyword_score: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            # Routes to the local scorer and falls back to keywords like a single /score
+            score, answered = await score_with_llm(cv.extracted_text, job_description, use_cache=use_cache)
+            return _result(cv, score, "llm") if answered else _result(cv, keyword_score, "keyword")
+
+    tasks = [asyncio.ensure_future(score_one(cv, score)) for cv, score in zip(cvs, keyword_scores)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Stop outstanding LLM calls if the consumer goes away early
+        for task in tasks:
+            task.cancel()
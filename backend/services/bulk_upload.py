@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from models.response_models import CV
+from services import metrics
+from services.cv_store import CVStore
+from services.dedup import format_simhash, near_duplicates, simhash, text_hash
+from services.index_sync import index_cv
+from services.job_queue import JobQueue
+from services.rate_limit import CapacityError
+from utils.text_extractor import (
+    EXTRACTION_WORKERS,
+    MAX_UPLOAD_BYTES,
+    UploadTooLargeError,
+    extract_file,
+    get_process_pool,
+    save_upload,
+)
+from utils.upload_stream import ReceivedFile
+
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "1000"))
+# Limit on the files of one bulk upload together, after ZIPs are expanded
+BULK_UPLOAD_MAX_BYTES = int(os.getenv("BULK_UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+# Files of one bulk upload being extracted at once; by default one pool worker
+# stays free for /upload
+BULK_EXTRACTION_CONCURRENCY = int(os.getenv("BULK_EXTRACTION_CONCURRENCY", str(max(1, EXTRACTION_WORKERS - 1))))
+# CVs written to the store per transaction
+BULK_STORE_BATCH = int(os.getenv("BULK_STORE_BATCH", "50"))
+# Extraction pauses while more background jobs than this wait for a worker,
+# and new bulk uploads are refused with 503 past the second limit
+BULK_PAUSE_QUEUE_DEPTH = int(os.getenv("BULK_PAUSE_QUEUE_DEPTH", "8"))
+BULK_REJECT_QUEUE_DEPTH = int(os.getenv("BULK_REJECT_QUEUE_DEPTH", "100"))
+# Bulk uploads queue behind interactive background jobs
+BULK_UPLOAD_PRIORITY = -1
+PROGRESS_INTERVAL_SECONDS = 0.5
+BACKPRESSURE_POLL_SECONDS = 0.25
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+
+class BulkUploadError(ValueError):
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def check_capacity(queue: JobQueue) -> None:
+    if queue.depth() >= BULK_REJECT_QUEUE_DEPTH:
+        metrics.inc("bulk_upload_rejections_total")
+        raise CapacityError("Too many background jobs are waiting; try the bulk upload again shortly.", 30)
+
+
+class StagedUpload:
+    """
+    Files of one bulk upload, received into a temporary directory as they arrive.
+    ZIP archives are expanded; unsupported entries are kept as failed files so
+    they show up in the job's report.
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="bulk-upload-")
+        self.files: List[Dict[str, Any]] = []
+        self.bytes = 0
+
+    def add(self, upload: ReceivedFile) -> None:
+        """
+        Stages a file received into this upload's directory.
+        """
+        filename = os.path.basename(upload.filename or "").lower()
+        if filename.endswith(".zip"):
+            try:
+                self._add_zip(filename, upload.path)
+            finally:
+                os.remove(upload.path)
+            return
+        if len(self.files) >= BULK_UPLOAD_MAX_FILES:
+            raise BulkUploadError(f"A bulk upload takes at most {BULK_UPLOAD_MAX_FILES} files.", 413)
+        error = None
+        if os.path.splitext(filename)[1] not in SUPPORTED_EXTENSIONS:
+            error = "Unsupported file type. Upload PDF or DOCX."
+        elif upload.size > MAX_UPLOAD_BYTES:
+            error = "File is too large."
+        if error:
+            os.remove(upload.path)
+            self.files.append({"filename": filename, "error": error})
+            return
+        self.bytes += upload.size
+        if self.bytes > BULK_UPLOAD_MAX_BYTES:
+            raise BulkUploadError(f"The files add up to more than {BULK_UPLOAD_MAX_BYTES // (1024 * 1024)} MB.", 413)
+        self.files.append({"filename": filename, "path": upload.path, "content_hash": upload.content_hash})
+
+    def _add_file(self, filename: str, source: BinaryIO, size_hint: int = 0) -> None:
+        if len(self.files) >= BULK_UPLOAD_MAX_FILES:
+            raise BulkUploadError(f"A bulk upload takes at most {BULK_UPLOAD_MAX_FILES} files.", 413)
+        extension = os.path.splitext(filename)[1]
+        if extension not in SUPPORTED_EXTENSIONS:
+            self.files.append({"filename": filename, "error": "Unsupported file type. Upload PDF or DOCX."})
+            return
+        if size_hint > MAX_UPLOAD_BYTES:
+            self.files.append({"filename": filename, "error": "File is too large."})
+            return
+        path = os.path.join(self.directory, f"{len(self.files)}{extension}")
+        hasher = hashlib.sha256()
+        try:
+            with open(path, "wb") as destination:
+                written = save_upload(source, destination, max_bytes=MAX_UPLOAD_BYTES, hasher=hasher)
+        except UploadTooLargeError as e:
+            os.remove(path)
+            self.files.append({"filename": filename, "error": str(e)})
+            return
+        self.bytes += written
+        if self.bytes > BULK_UPLOAD_MAX_BYTES:
+            raise BulkUploadError(f"The files add up to more than {BULK_UPLOAD_MAX_BYTES // (1024 * 1024)} MB.", 413)
+        self.files.append({"filename": filename, "path": path, "content_hash": hasher.hexdigest()})
+
+    def _add_zip(self, filename: str, archive_path: str) -> None:
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not name or name.startswith(".") or member.filename.startswith("__MACOSX/"):
+                        continue
+                    # The declared size can lie; save_upload enforces the limit while copying
+                    with archive.open(member) as entry:
+                        self._add_file(name.lower(), entry, size_hint=member.file_size)
+        except UploadTooLargeError as e:
+            raise BulkUploadError(str(e), 413)
+        except zipfile.BadZipFile:
+            raise BulkUploadError(f"{filename} is not a valid ZIP archive.")
+
+    def discard(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def payload(self, max_chars: int) -> Dict[str, Any]:
+        return {"directory": self.directory, "files": self.files, "max_chars": max_chars}
+
+
+async def _wait_for_capacity(queue: JobQueue) -> None:
+    # Interactive background jobs go first; extraction resumes once they drain.
+    # A paused job keeps its worker, so it only pauses while another worker is
+    # still running a job and can take the queued ones afterwards.
+    if queue.depth() <= BULK_PAUSE_QUEUE_DEPTH or queue.active() <= 1:
+        return
+    metrics.inc("bulk_upload_pauses_total")
+    with queue.yielding():
+        while queue.depth() > BULK_PAUSE_QUEUE_DEPTH and queue.active() > 0:
+            await asyncio.sleep(BACKPRESSURE_POLL_SECONDS)
+
+
+class _Ingestion:
+    def __init__(self, cv_store: CVStore, queue: JobQueue, total: int):
+        self.cv_store = cv_store
+        self.queue = queue
+        self.counts = {"total": total, "processed": 0, "stored": 0, "duplicates": 0, "failed": 0}
+        self.files: List[Dict[str, Any]] = []
+        # (staged entry, CV) waiting for the next batch write; reported once stored
+        self.pending: List[Tuple[Dict[str, Any], CV]] = []
+        # id of a pending CV -> later files with the same text, settled with its batch
+        self.waiting: Dict[str, List[Dict[str, Any]]] = {}
+        # Text hashes of CVs earlier in this upload, which are not all in the store yet
+        self.text_hashes: Dict[str, str] = {}
+        # content hash -> later files with the same bytes, settled with the first one
+        self.copies: Dict[str, List[str]] = {}
+        self._reported_at = 0.0
+
+    def finish(self, filename: str, outcome: str, **fields: Any) -> None:
+        key = {"stored": "stored", "duplicate": "duplicates", "failed": "failed"}[outcome]
+        self.counts[key] += 1
+        self.counts["processed"] += 1
+        self.files.append({"filename": filename, "status": outcome, **fields})
+        metrics.inc("bulk_upload_files_total", outcome=outcome)
+        self.report()
+
+    def settle(self, entry: Dict[str, Any], outcome: str, **fields: Any) -> None:
+        """
+        Finishes a staged file and any byte-identical copies of it.
+        """
+        self.finish(entry["filename"], outcome, **fields)
+        cv_id = fields.get("cv_id")
+        for filename in self.copies.pop(entry.get("content_hash"), []):
+            if cv_id:
+                self.finish(filename, "duplicate", cv_id=cv_id, duplicate_of=cv_id)
+            else:
+                self.finish(filename, "failed", error=fields.get("error"))
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self._reported_at >= PROGRESS_INTERVAL_SECONDS:
+            self._reported_at = now
+            self.queue.report({**self.counts, "files": list(self.files)})
+
+    def duplicate_of(self, field: str, value: str) -> Optional[str]:
+        if field == "text_hash" and value in self.text_hashes:
+            return self.text_hashes[value]
+        existing = self.cv_store.find_one(field, value)
+        return existing.id if existing else None
+
+    def add(self, entry: Dict[str, Any], text: str) -> None:
+        normalized_hash = text_hash(text)
+        existing_id = self.duplicate_of("text_hash", normalized_hash)
+        if existing_id in self.waiting:
+            self.waiting[existing_id].append(entry)
+            return
+        if existing_id:
+            self.settle(entry, "duplicate", cv_id=existing_id, duplicate_of=existing_id)
+            return
+        fingerprint = simhash(text)
+        related_cv_ids = [key for key, _ in near_duplicates.query(fingerprint)]
+        cv = CV(
+            id=str(uuid.uuid4()),
+            filename=entry["filename"],
+            extracted_text=text,
+            uploaded_at=time.time(),
+            content_hash=entry["content_hash"],
+            text_hash=normalized_hash,
+            simhash=format_simhash(fingerprint),
+            related_cv_ids=related_cv_ids or None,
+        )
+        self.text_hashes[normalized_hash] = cv.id
+        self.pending.append((entry, cv))
+        self.waiting[cv.id] = []
+        if len(self.pending) >= BULK_STORE_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the pending CVs in one batch; only then are their files reported
+        stored. A failed write fails the whole batch.
+        """
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            with metrics.span("bulk_store"):
+                self.cv_store.put_many([cv for _, cv in batch])
+        except Exception as e:
+            error = f"Could not store the CV: {e}"
+            for entry, cv in batch:
+                # Later files with the same text are not duplicates of a CV that was never stored
+                self.text_hashes.pop(cv.text_hash, None)
+                self.settle(entry, "failed", error=error)
+                for duplicate in self.waiting.pop(cv.id):
+                    self.settle(duplicate, "failed", error=error)
+            return
+        for entry, cv in batch:
+            index_cv(cv)
+            self.settle(entry, "stored", cv_id=cv.id, related_cv_ids=cv.related_cv_ids or [])
+            for duplicate in self.waiting.pop(cv.id):
+                self.settle(duplicate, "duplicate", cv_id=cv.id, duplicate_of=cv.id)
+
+
+async def ingest(payload: Dict[str, Any], cv_store: CVStore, queue: JobQueue) -> Dict[str, Any]:
+    """
+    Extracts the staged files across the process pool, a few at a time, and stores
+    the CVs in batches. Exact duplicates, of stored CVs or of earlier files in the
+    same upload, are reported instead of stored. Progress is reported on the job.
+    The staged files are left in place for retries; see discard_payload.
+    """
+    files = payload["files"]
+    ingestion = _Ingestion(cv_store, queue, len(files))
+    window = asyncio.Semaphore(BULK_EXTRACTION_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def extract(entry: Dict[str, Any]):
+        async with window:
+            await _wait_for_capacity(queue)
+            try:
+                with metrics.span("extraction"):
+                    text = await loop.run_in_executor(get_process_pool(), extract_file, entry["path"], payload["max_chars"])
+                return entry, text, None
+            except Exception as e:
+                return entry, None, e
+
+    extractions = []
+    for entry in files:
+        if "error" in entry:
+            ingestion.finish(entry["filename"], "failed", error=entry["error"])
+            continue
+        if entry["content_hash"] in ingestion.copies:
+            # Same bytes as an earlier file of this upload; extracted once
+            ingestion.copies[entry["content_hash"]].append(entry["filename"])
+            continue
+        # On a retry, files an earlier attempt stored are found here
+        existing_id = ingestion.duplicate_of("content_hash", entry["content_hash"])
+        if existing_id:
+            ingestion.finish(entry["filename"], "duplicate", cv_id=existing_id, duplicate_of=existing_id)
+            continue
+        ingestion.copies[entry["content_hash"]] = []
+        extractions.append(asyncio.create_task(extract(entry)))
+
+    try:
+        for done in asyncio.as_completed(extractions):
+            entry, text, error = await done
+            if error is not None:
+                ingestion.settle(entry, "failed", error=f"Failed to extract text from file: {error}")
+            elif not text or not text.strip():
+                ingestion.settle(entry, "failed", error="No text could be extracted from the file.")
+            else:
+                ingestion.add(entry, text[:payload["max_chars"]])
+    finally:
+        for task in extractions:
+            task.cancel()
+    ingestion.flush()
+    ingestion.report(force=True)
+    return {**ingestion.counts, "files": ingestion.files}
+
+
+def discard_payload(payload: Dict[str, Any]) -> None:
+    """
+    Removes a bulk upload's staged files, once its job succeeded or failed for good.
+    """
+    shutil.rmtree(payload["directory"], ignore_errors=True)
@@ -1,19 +1,14 @@
-import os
-import google.generativeai as genai
+import logging
+from typing import AsyncIterator
 from fastapi import HTTPException
+from services.cache import make_key, result_cache
+from services import llm_client, llm_router, metrics
+from services.prompt_compaction import compact_cv, compact_job_description
 
-def generate_cover_letter(cv_text: str, job_description: str) -> str:
-    """
-    Generates a personalized cover letter based on CV and Job Description using Gemini.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
-
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        prompt = f"""
+def _build_prompt(cv_text: str, job_description: str) -> str:
+    cv_text = compact_cv(cv_text, job_description, endpoint="cover_letter")
+    job_description = compact_job_description(job_description, endpoint="cover_letter")
+    return f"""
 You are an expert career coach and professional writer.
 Your task is to write a compelling, personalized cover letter for a candidate applying to a specific job.
 
@@ -37,8 +32,48 @@ Candidate CV:
 
 Cover Letter:
 """
-        response = model.generate_content(prompt)
-        return response.text.strip()
+
+async def generate_cover_letter(cv_text: str, job_description: str, use_cache: bool = True) -> str:
+    """
+    Generates a personalized cover letter based on CV and Job Description using Gemini.
+    """
+    cache_key = make_key("cover_letter", llm_router.model_for("cover_letter"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not llm_client.is_configured():
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
+
+    try:
+        prompt = _build_prompt(cv_text, job_description)
+        cover_letter = (await llm_router.generate(prompt, "cover_letter")).strip()
+        result_cache.set(cache_key, cover_letter)
+        return cover_letter
+    except HTTPException:
+        # Capacity errors keep their 429/503 status and Retry-After header
+        raise
     except Exception as e:
-        print(f"Error during cover letter generation: {e}")
+        metrics.log_event("cover_letter_failed", logging.ERROR, error=str(e))
         raise HTTPException(status_code=500, detail=f"An error occurred during cover letter generation: {e}")
+
+async def stream_cover_letter(cv_text: str, job_description: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Streams the cover letter as Gemini generates it. The full text is cached once the stream completes.
+    """
+    cache_key = make_key("cover_letter", llm_router.model_for("cover_letter"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    if not llm_client.is_configured():
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
+
+    chunks = []
+    async for chunk in llm_router.stream(_build_prompt(cv_text, job_description), "cover_letter"):
+        chunks.append(chunk)
+        yield chunk
+    result_cache.set(cache_key, "".join(chunks).strip())
@@ -0,0 +1,566 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from models.response_models import CV
+from utils import json_codec
+
+# Columns kept outside the JSON blob so they can be indexed, sorted and filtered on
+INDEXED_FIELDS = {
+    "filename": "TEXT",
+    "uploaded_at": "REAL",
+    "ats_score": "REAL",
+    "content_hash": "TEXT",
+    "text_hash": "TEXT",
+}
+SORTABLE_FIELDS = {"filename", "uploaded_at", "ats_score"}
+# Large text fields that list endpoints leave out unless asked for
+TEXT_FIELDS = {"extracted_text", "rewritten_cv", "cover_letter"}
+# Fields the per-worker search, near-duplicate and TF-IDF indexes are built from
+SEARCH_FIELDS = ("extracted_text", "simhash")
+DETAIL_FIELDS = {"interview_prep", "content_hash", "text_hash", "simhash", "score_sections", "llm_score_basis"}
+SUMMARY_FIELDS = [name for name in CV.model_fields if name not in TEXT_FIELDS | DETAIL_FIELDS]
+# Text shorter than this is kept as is; compressing it saves little
+COMPRESS_MIN_CHARS = 256
+
+# (sequence number, cv id, "put" or "delete", id of the process that made the change)
+Change = Tuple[int, str, str, int]
+
+
+class CVStore:
+    """
+    Storage interface for CV records. Implementations must be safe to share
+    across threads; the SQLite one is also safe to share across processes.
+    """
+
+    def get(self, cv_id: str) -> Optional[CV]:
+        raise NotImplementedError
+
+    def get_many(self, cv_ids: Sequence[str]) -> List[CV]:
+        raise NotImplementedError
+
+    def put(self, cv: CV) -> None:
+        raise NotImplementedError
+
+    def put_many(self, cvs: Sequence[CV]) -> None:
+        for cv in cvs:
+            self.put(cv)
+
+    def update(self, cv_id: str, **fields: Any) -> Optional[CV]:
+        raise NotImplementedError
+
+    def delete(self, cv_id: str) -> bool:
+        raise NotImplementedError
+
+    def find_one(self, field: str, value: Any) -> Optional[CV]:
+        """
+        Returns any record whose indexed `field` equals `value`.
+        """
+        raise NotImplementedError
+
+    def count(self, filename: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def iter_all(self) -> Iterator[CV]:
+        raise NotImplementedError
+
+    def all_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def last_change(self) -> int:
+        """
+        Sequence number of the latest put or delete. Stores that are only visible to
+        one process keep no change log and always return 0.
+        """
+        return 0
+
+    def changes_since(self, sequence: int, limit: int = 1000) -> List[Change]:
+        """
+        Puts, updates and deletes after `sequence`, oldest first, so other processes can
+        update their in-memory indexes.
+        """
+        return []
+
+    def prune_changes(self, before: float) -> None:
+        pass
+
+    def list(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort: str = "uploaded_at",
+        descending: bool = True,
+        fields: Optional[Sequence[str]] = None,
+        filename: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns one page of records as dicts holding only `fields` (default: SUMMARY_FIELDS).
+        """
+        raise NotImplementedError
+
+    def list_json(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort: str = "uploaded_at",
+        descending: bool = True,
+        filename: Optional[str] = None,
+    ) -> List[bytes]:
+        """
+        Same page as `list` with the default fields, each record already encoded as JSON.
+        """
+        rows = self.list(offset=offset, limit=limit, sort=sort, descending=descending, filename=filename)
+        return [json_codec.dumps(row) for row in rows]
+
+
+def _project(data: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {name: data.get(name) for name in fields}
+
+
+class KeywordTable:
+    """
+    Interns keywords as small integer ids shared by every record in the process,
+    so the same JD keywords on thousands of CVs are stored once. Entries are
+    reference counted by the records using them, and freed ids are reused.
+    """
+
+    def __init__(self):
+        # Reentrant: a record may be garbage collected, and release its ids, mid-call
+        self._lock = threading.RLock()
+        self._ids: Dict[str, int] = {}
+        self._keywords: List[Optional[str]] = []
+        self._refs: List[int] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self, keywords: Sequence[str]) -> array:
+        with self._lock:
+            return array("I", [self._acquire(k) for k in keywords])
+
+    def _acquire(self, keyword: str) -> int:
+        keyword_id = self._ids.get(keyword)
+        if keyword_id is None:
+            if self._free:
+                keyword_id = self._free.pop()
+                self._keywords[keyword_id] = keyword
+            else:
+                keyword_id = len(self._keywords)
+                self._keywords.append(keyword)
+                self._refs.append(0)
+            self._ids[keyword] = keyword_id
+        self._refs[keyword_id] += 1
+        return keyword_id
+
+    def release(self, ids: array) -> None:
+        with self._lock:
+            for keyword_id in ids:
+                self._refs[keyword_id] -= 1
+                if not self._refs[keyword_id]:
+                    del self._ids[self._keywords[keyword_id]]
+                    self._keywords[keyword_id] = None
+                    self._free.append(keyword_id)
+
+    def keywords(self, ids: array) -> List[str]:
+        return [self._keywords[i] for i in ids]
+
+
+keyword_table = KeywordTable()
+
+# How CVRecord keeps each CV field; fields not listed here go in its compressed extras
+_SCALAR_FIELDS = ("id", "filename", "uploaded_at", "ats_score", "content_hash", "text_hash", "simhash")
+_KEYWORD_FIELDS = ("matched_keywords", "missing_keywords")
+_TEXT_FIELDS = tuple(sorted(TEXT_FIELDS))
+
+
+def _compress(text: Optional[str]):
+    if text is None or len(text) < COMPRESS_MIN_CHARS:
+        return text
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _decompress(value) -> Optional[str]:
+    return zlib.decompress(value).decode("utf-8") if isinstance(value, bytes) else value
+
+
+class CVRecord:
+    """
+    Compact in-memory form of a CV. Keyword lists are arrays of interned ids, large
+    text is zlib-compressed and only expanded when read, the rarely read fields are
+    one compressed JSON blob, and the default list projection is kept pre-encoded.
+    """
+
+    __slots__ = _SCALAR_FIELDS + ("keywords", "texts", "extras", "summary_json")
+
+    def __init__(self, cv: CV):
+        data = cv.model_dump()
+        for name in _SCALAR_FIELDS:
+            setattr(self, name, data.pop(name))
+        keywords = [data.pop(name) for name in _KEYWORD_FIELDS]
+        self.keywords = tuple(None if k is None else keyword_table.ids(k) for k in keywords)
+        self.texts = tuple(_compress(data.pop(name)) for name in _TEXT_FIELDS)
+        extras = {name: value for name, value in data.items() if value is not None}
+        self.extras = zlib.compress(json_codec.dumps(extras)) if extras else None
+        self.summary_json = json_codec.dumps({name: self.get(name) for name in SUMMARY_FIELDS})
+
+    def __del__(self):
+        # Released only once no reader still holds the record, so its ids are never
+        # reused while they can be decoded
+        for ids in getattr(self, "keywords", ()):
+            if ids is not None:
+                keyword_table.release(ids)
+
+    def _extras(self) -> Dict[str, Any]:
+        return json_codec.loads(zlib.decompress(self.extras)) if self.extras is not None else {}
+
+    def get(self, name: str) -> Any:
+        if name in _SCALAR_FIELDS:
+            return getattr(self, name)
+        if name in _KEYWORD_FIELDS:
+            ids = self.keywords[_KEYWORD_FIELDS.index(name)]
+            return None if ids is None else keyword_table.keywords(ids)
+        if name in _TEXT_FIELDS:
+            return _decompress(self.texts[_TEXT_FIELDS.index(name)])
+        return self._extras().get(name)
+
+    def project(self, fields: Sequence[str]) -> Dict[str, Any]:
+        extras = self._extras() if any(name in _EXTRA_FIELDS for name in fields) else {}
+        return {name: extras.get(name) if name in _EXTRA_FIELDS else self.get(name) for name in fields}
+
+    def to_cv(self) -> CV:
+        # Every value is freshly decoded, so the CV shares nothing with the record;
+        # it was validated when stored, so it is not validated again
+        return CV.model_construct(**self.project(list(CV.model_fields)))
+
+
+_EXTRA_FIELDS = frozenset(CV.model_fields) - set(_SCALAR_FIELDS + _KEYWORD_FIELDS + _TEXT_FIELDS)
+
+
+class InMemoryCVStore(CVStore):
+    """
+    Process-local store, mainly for tests and single-worker development. Records
+    are kept as CVRecord and turned back into CV objects when read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cvs: Dict[str, CVRecord] = {}
+        # Records in ascending order per sort field, dropped on every change
+        self._orders: Dict[str, List[CVRecord]] = {}
+
+    def get(self, cv_id: str) -> Optional[CV]:
+        with self._lock:
+            record = self._cvs.get(cv_id)
+        return record.to_cv() if record else None
+
+    def get_many(self, cv_ids: Sequence[str]) -> List[CV]:
+        with self._lock:
+            records = [self._cvs[i] for i in cv_ids if i in self._cvs]
+        return [record.to_cv() for record in records]
+
+    def put(self, cv: CV) -> None:
+        record = CVRecord(cv)
+        with self._lock:
+            self._cvs[cv.id] = record
+            self._orders.clear()
+
+    def put_many(self, cvs: Sequence[CV]) -> None:
+        records = [CVRecord(cv) for cv in cvs]
+        with self._lock:
+            self._cvs.update((record.id, record) for record in records)
+            self._orders.clear()
+
+    def update(self, cv_id: str, **fields: Any) -> Optional[CV]:
+        with self._lock:
+            record = self._cvs.get(cv_id)
+            if record is None:
+                return None
+            cv = record.to_cv().model_copy(update=fields)
+            self._cvs[cv_id] = CVRecord(cv)
+            self._orders.clear()
+        return cv
+
+    def delete(self, cv_id: str) -> bool:
+        with self._lock:
+            self._orders.clear()
+            return self._cvs.pop(cv_id, None) is not None
+
+    def find_one(self, field: str, value: Any) -> Optional[CV]:
+        with self._lock:
+            for record in self._cvs.values():
+                if record.get(field) == value:
+                    return record.to_cv()
+        return None
+
+    def count(self, filename: Optional[str] = None) -> int:
+        with self._lock:
+            if filename is None:
+                return len(self._cvs)
+            return sum(1 for record in self._cvs.values() if record.filename == filename)
+
+    def iter_all(self) -> Iterator[CV]:
+        with self._lock:
+            records = list(self._cvs.values())
+        for record in records:
+            yield record.to_cv()
+
+    def all_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._cvs)
+
+    def _page(self, offset, limit, sort, descending, filename) -> List[CVRecord]:
+        if sort not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+
+        # None sorts before any value, as it does in SQLite
+        def sort_key(record: CVRecord):
+            value = getattr(record, sort)
+            return ((True, value) if value is not None else (False,), record.id)
+
+        with self._lock:
+            order = self._orders.get(sort)
+            if order is None:
+                order = self._orders[sort] = sorted(self._cvs.values(), key=sort_key)
+        if filename is None:
+            if not descending:
+                return order[offset:offset + limit]
+            end = max(0, len(order) - offset)
+            return order[max(0, end - limit):end][::-1]
+        matches = (r for r in (reversed(order) if descending else order) if r.filename == filename)
+        return list(islice(matches, offset, offset + limit))
+
+    def list(self, offset=0, limit=50, sort="uploaded_at", descending=True, fields=None, filename=None):
+        fields = fields or SUMMARY_FIELDS
+        return [record.project(fields) for record in self._page(offset, limit, sort, descending, filename)]
+
+    def list_json(self, offset=0, limit=50, sort="uploaded_at", descending=True, filename=None):
+        return [record.summary_json for record in self._page(offset, limit, sort, descending, filename)]
+
+
+class SQLiteCVStore(CVStore):
+    """
+    Embedded store backed by one SQLite file in WAL mode. Indexed fields live in
+    their own columns, large text in its own columns, everything else in a JSON blob.
+    The default list projection is also kept pre-encoded in `summary_json`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = ", ".join(f"{name} {kind}" for name, kind in INDEXED_FIELDS.items())
+        texts = ", ".join(f"{name} TEXT" for name in sorted(TEXT_FIELDS))
+        with self._lock, self._db:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS cvs (id TEXT PRIMARY KEY, {columns}, {texts}, data TEXT NOT NULL)"
+            )
+            existing = {row["name"] for row in self._db.execute("PRAGMA table_info(cvs)")}
+            for name, kind in list(INDEXED_FIELDS.items()) + [(t, "TEXT") for t in TEXT_FIELDS] + [("summary_json", "BLOB")]:
+                if name not in existing:
+                    self._db.execute(f"ALTER TABLE cvs ADD COLUMN {name} {kind}")
+            for name in INDEXED_FIELDS:
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_cvs_{name} ON cvs ({name}, id)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cv_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "cv_id TEXT NOT NULL, op TEXT NOT NULL, pid INTEGER NOT NULL, changed_at REAL NOT NULL)"
+            )
+        self._backfill_summaries()
+
+    def _backfill_summaries(self) -> None:
+        # Rows written before summary_json existed get it once, in batches
+        while True:
+            with self._lock:
+                rows = self._db.execute("SELECT * FROM cvs WHERE summary_json IS NULL LIMIT 500").fetchall()
+            if not rows:
+                return
+            updates = [(json_codec.dumps(_project(self._from_row(row), SUMMARY_FIELDS)), row["id"]) for row in rows]
+            with self._lock, self._db:
+                self._db.executemany("UPDATE cvs SET summary_json = ? WHERE id = ?", updates)
+
+    def _log_change(self, cv_id: str, op: str) -> None:
+        self._db.execute(
+            "INSERT INTO cv_changes (cv_id, op, pid, changed_at) VALUES (?, ?, ?, ?)",
+            (cv_id, op, os.getpid(), time.time()),
+        )
+
+    @staticmethod
+    def _to_row(cv: CV) -> Dict[str, Any]:
+        data = cv.model_dump()
+        row = {"id": data["id"], "summary_json": json_codec.dumps(_project(data, SUMMARY_FIELDS))}
+        del data["id"]
+        for name in list(INDEXED_FIELDS) + sorted(TEXT_FIELDS):
+            row[name] = data.pop(name, None)
+        row["data"] = json_codec.dumps(data)
+        return row
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        keys = row.keys()
+        data = json_codec.loads(row["data"]) if "data" in keys else {}
+        for name in keys:
+            if name not in ("data", "summary_json"):
+                data[name] = row[name]
+        return data
+
+    def get(self, cv_id: str) -> Optional[CV]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM cvs WHERE id = ?", (cv_id,)).fetchone()
+        return CV(**self._from_row(row)) if row else None
+
+    def get_many(self, cv_ids: Sequence[str]) -> List[CV]:
+        found: Dict[str, CV] = {}
+        ids = list(cv_ids)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._db.execute(f"SELECT * FROM cvs WHERE id IN ({placeholders})", chunk).fetchall()
+            for row in rows:
+                found[row["id"]] = CV(**self._from_row(row))
+        return [found[i] for i in ids if i in found]
+
+    def put(self, cv: CV) -> None:
+        row = self._to_row(cv)
+        names = ", ".join(row)
+        placeholders = ", ".join(f":{name}" for name in row)
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO cvs ({names}) VALUES ({placeholders})", row)
+            self._log_change(cv.id, "put")
+
+    def put_many(self, cvs: Sequence[CV]) -> None:
+        # One transaction for the whole batch instead of one commit per CV
+        rows = [self._to_row(cv) for cv in cvs]
+        if not rows:
+            return
+        names = ", ".join(rows[0])
+        placeholders = ", ".join(f":{name}" for name in rows[0])
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO cvs ({names}) VALUES ({placeholders})", rows)
+            self._db.executemany(
+                "INSERT INTO cv_changes (cv_id, op, pid, changed_at) VALUES (?, 'put', ?, ?)",
+                [(cv.id, os.getpid(), now) for cv in cvs],
+            )
+
+    def update(self, cv_id: str, **fields: Any) -> Optional[CV]:
+        with self._lock, self._db:
+            # BEGIN IMMEDIATE keeps the read-modify-write atomic across processes
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute("SELECT * FROM cvs WHERE id = ?", (cv_id,)).fetchone()
+            if row is None:
+                return None
+            current = self._from_row(row)
+            cv = CV(**{**current, **fields})
+            values = self._to_row(cv)
+            assignments = ", ".join(f"{name} = :{name}" for name in values if name != "id")
+            self._db.execute(f"UPDATE cvs SET {assignments} WHERE id = :id", values)
+            # Other workers only re-index when the text changed, not on score or artifact updates
+            if any(getattr(cv, name) != current.get(name) for name in SEARCH_FIELDS):
+                self._log_change(cv_id, "update")
+        return cv
+
+    def delete(self, cv_id: str) -> bool:
+        with self._lock, self._db:
+            if self._db.execute("DELETE FROM cvs WHERE id = ?", (cv_id,)).rowcount == 0:
+                return False
+            self._log_change(cv_id, "delete")
+            return True
+
+    def find_one(self, field: str, value: Any) -> Optional[CV]:
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"{field} is not an indexed field")
+        with self._lock:
+            row = self._db.execute(f"SELECT * FROM cvs WHERE {field} = ? LIMIT 1", (value,)).fetchone()
+        return CV(**self._from_row(row)) if row else None
+
+    def count(self, filename: Optional[str] = None) -> int:
+        with self._lock:
+            if filename is None:
+                return self._db.execute("SELECT COUNT(*) FROM cvs").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM cvs WHERE filename = ?", (filename,)).fetchone()[0]
+
+    def iter_all(self) -> Iterator[CV]:
+        # Page through by primary key so the whole table never sits in memory at once
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT * FROM cvs WHERE id > ? ORDER BY id LIMIT 500", (last_id,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield CV(**self._from_row(row))
+            last_id = rows[-1]["id"]
+
+    def all_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM cvs")]
+
+    def last_change(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM cv_changes").fetchone()[0]
+
+    def changes_since(self, sequence: int, limit: int = 1000) -> List[Change]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, cv_id, op, pid FROM cv_changes WHERE seq > ? ORDER BY seq LIMIT ?", (sequence, limit)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def prune_changes(self, before: float) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cv_changes WHERE changed_at < ?", (before,))
+
+    def list(self, offset=0, limit=50, sort="uploaded_at", descending=True, fields=None, filename=None):
+        if sort not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        fields = list(fields or SUMMARY_FIELDS)
+        # Only read the JSON blob and text columns when the projection needs them
+        columns = {"id"} | ({"data"} if any(f not in INDEXED_FIELDS and f not in TEXT_FIELDS and f != "id" for f in fields) else set())
+        columns |= {f for f in fields if f in INDEXED_FIELDS or f in TEXT_FIELDS}
+        direction = "DESC" if descending else "ASC"
+        where, params = ("WHERE filename = ?", [filename]) if filename is not None else ("", [])
+        query = (
+            f"SELECT {', '.join(sorted(columns))} FROM cvs {where} "
+            f"ORDER BY {sort} {direction}, id {direction} LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._db.execute(query, params + [limit, offset]).fetchall()
+        return [_project(self._from_row(row), fields) for row in rows]
+
+
+    def list_json(self, offset=0, limit=50, sort="uploaded_at", descending=True, filename=None):
+        if sort not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        direction = "DESC" if descending else "ASC"
+        where, params = ("WHERE filename = ?", [filename]) if filename is not None else ("", [])
+        query = f"SELECT summary_json FROM cvs {where} ORDER BY {sort} {direction}, id {direction} LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(query, params + [limit, offset]).fetchall()
+        return [bytes(row[0]) for row in rows]
+
+
+def create_cv_store() -> CVStore:
+    """
+    Builds the store selected by CV_STORE_BACKEND ("sqlite" or "memory").
+    """
+    backend = os.getenv("CV_STORE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryCVStore()
+    if backend == "sqlite":
+        return SQLiteCVStore(os.getenv("CV_STORE_PATH", "cv_store.db"))
+    raise ValueError(f"Unknown CV_STORE_BACKEND: {backend}")
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Set, Tuple
+
+from utils.tokenizer import tokenize
+
+# Near-duplicates differ in at most this many of the 64 SimHash bits
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "3"))
+SHINGLE_SIZE = 3
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over word shingles: small edits flip only a few bits.
+    Stored on CV records as 16 hex digits (see `format_simhash`).
+    """
+    tokens = tokenize(text)
+    shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def format_simhash(value: int) -> str:
+    # Hex keeps the full 64 bits intact for JSON clients that read numbers as doubles
+    return f"{value:016x}"
+
+
+class NearDuplicateIndex:
+    """
+    Finds SimHashes within SIMHASH_MAX_DISTANCE bits. Each hash is split into four
+    16-bit bands; with at most 3 differing bits, at least one band matches exactly,
+    so only hashes sharing a band need a full Hamming distance check.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, int] = {}
+        self._bands: List[Dict[int, Set[str]]] = [{} for _ in range(_BANDS)]
+
+    @staticmethod
+    def _band_values(value: int) -> List[int]:
+        mask = (1 << _BAND_BITS) - 1
+        return [(value >> (band * _BAND_BITS)) & mask for band in range(_BANDS)]
+
+    def add(self, key: str, value: int) -> None:
+        with self._lock:
+            self._remove_locked(key)
+            self._hashes[key] = value
+            for band, band_value in enumerate(self._band_values(value)):
+                self._bands[band].setdefault(band_value, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: str) -> None:
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for band, band_value in enumerate(self._band_values(value)):
+            bucket = self._bands[band].get(band_value)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[band][band_value]
+
+    def query(self, value: int) -> List[Tuple[str, int]]:
+        """
+        Returns (key, distance) pairs for near-duplicates, closest first.
+        """
+        with self._lock:
+            candidates: Set[str] = set()
+            for band, band_value in enumerate(self._band_values(value)):
+                candidates |= self._bands[band].get(band_value, set())
+            matches = []
+            for key in candidates:
+                distance = bin(self._hashes[key] ^ value).count("1")
+                if distance <= self.max_distance:
+                    matches.append((key, distance))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def keys(self) -> Set[str]:
+        with self._lock:
+            return set(self._hashes)
+
+
+near_duplicates = NearDuplicateIndex()
+
+
+def load_near_duplicates(cv_store) -> None:
+    """
+    Rebuilds the in-memory SimHash index from the fingerprints stored on each CV.
+    """
+    offset = 0
+    while True:
+        page = cv_store.list(offset=offset, limit=1000, sort="uploaded_at", descending=False, fields=["id", "simhash"])
+        for cv in page:
+            if cv.get("simhash"):
+                near_duplicates.add(cv["id"], int(cv["simhash"], 16))
+        if len(page) < 1000:
+            return
+        offset += len(page)
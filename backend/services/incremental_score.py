@@ -0,0 +1,126 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.response_models import CV
+from services import metrics
+from services.ats_score import score_with_llm
+from services.dedup import text_hash
+from services.prompt_compaction import CV_HEADINGS, JD_HEADINGS, split_sections
+from utils.keyword_engine import analyze, canonical_terms, match_terms, vocabulary
+
+# Share of the CV or JD text that may change since the last Gemini analysis before
+# mode=llm calls Gemini again; smaller edits adjust the previous result locally
+RESCORE_LLM_THRESHOLD = float(os.getenv("RESCORE_LLM_THRESHOLD", "0.2"))
+
+
+def score_sections(cv_text: str, previous: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Splits a CV into sections with a fingerprint and keyword terms each. Terms of
+    sections whose fingerprint is in `previous` are reused instead of re-analysed.
+    Returns the sections and how many of them had to be analysed.
+    """
+    known = {section["hash"]: section["terms"] for section in previous or []}
+    sections = []
+    analysed = 0
+    for _, body in split_sections(cv_text, CV_HEADINGS):
+        fingerprint = text_hash(body)
+        terms = known.get(fingerprint)
+        if terms is None:
+            terms = list(analyze(body).terms.values())
+            analysed += 1
+        sections.append({"hash": fingerprint, "length": len(body), "terms": terms})
+    return sections, analysed
+
+
+def _fingerprints(text: str, headings) -> List[Dict[str, Any]]:
+    return [{"hash": text_hash(body), "length": len(body)} for _, body in split_sections(text, headings)]
+
+
+def _term_ids(sections: List[Dict[str, Any]]) -> np.ndarray:
+    # Sections saved before a synonym was added to the ontology still hold the old term
+    return vocabulary.ids(canonical_terms([term for section in sections for term in section["terms"]]))
+
+
+def changed_share(sections: List[Dict[str, Any]], basis: List[Dict[str, Any]]) -> float:
+    """
+    Share of the text, by length, in sections that were added, edited or removed.
+    """
+    current = {section["hash"]: section["length"] for section in sections}
+    before = {section["hash"]: section["length"] for section in basis}
+    changed = sum(length for h, length in current.items() if h not in before)
+    changed += sum(length for h, length in before.items() if h not in current)
+    total = max(sum(current.values()), sum(before.values()), 1)
+    return min(1.0, changed / total)
+
+
+def _has_keyword(keyword: str, cv_ids: np.ndarray) -> Optional[bool]:
+    ids = analyze(keyword).ids
+    if not len(ids):
+        return None
+    return bool(np.isin(ids, cv_ids, assume_unique=True).all())
+
+
+def _adjust(basis: Dict[str, Any], keyword_result: Dict[str, Any], cv_ids: np.ndarray) -> Dict[str, Any]:
+    """
+    Carries a previous Gemini result over to the edited text: the score moves by
+    as much as the keyword score did, and keywords the edit added or removed
+    switch lists.
+    """
+    result = basis["result"]
+    score = result["ats_score"] + keyword_result["ats_score"] - basis["keyword_score"]
+    matched, missing = [], []
+    for keyword in result["matched_keywords"]:
+        (missing if _has_keyword(keyword, cv_ids) is False else matched).append(keyword)
+    for keyword in result["missing_keywords"]:
+        (matched if _has_keyword(keyword, cv_ids) else missing).append(keyword)
+    return {
+        "ats_score": round(min(100.0, max(0.0, score)), 2),
+        "matched_keywords": matched,
+        "missing_keywords": missing,
+    }
+
+
+async def rescore(
+    cv: CV,
+    cv_text: str,
+    job_description: str,
+    mode: str,
+    use_cache: bool = True,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Scores `cv_text`, an edited version of a stored CV, against a possibly edited
+    JD, reusing the section state saved on the record by earlier scores. Returns the result and the fields to
+    save back onto the CV.
+    """
+    with metrics.span("tokenization"):
+        sections, analysed = score_sections(cv_text, cv.score_sections)
+        cv_ids = _term_ids(sections)
+        keyword_result = match_terms(cv_ids, job_description)
+    updates: Dict[str, Any] = {"score_sections": sections}
+    result = dict(keyword_result)
+    reused = None
+    if mode == "llm":
+        basis = cv.llm_score_basis
+        jd_sections = _fingerprints(job_description, JD_HEADINGS)
+        reused = bool(
+            use_cache
+            and basis
+            and changed_share(sections, basis["sections"]) <= RESCORE_LLM_THRESHOLD
+            and changed_share(jd_sections, basis["jd_sections"]) <= RESCORE_LLM_THRESHOLD
+        )
+        if reused:
+            result = _adjust(basis, keyword_result, cv_ids)
+        else:
+            result, answered = await score_with_llm(cv_text, job_description, use_cache=use_cache)
+            if answered:
+                updates["llm_score_basis"] = {
+                    "sections": [{"hash": s["hash"], "length": s["length"]} for s in sections],
+                    "jd_sections": jd_sections,
+                    "keyword_score": keyword_result["ats_score"],
+                    "result": result,
+                }
+        metrics.inc("incremental_rescores_total", llm="reused" if reused else "called")
+    result.update(changed_sections=analysed, llm_reused=reused)
+    return result, updates
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from models.response_models import CV
+from services import metrics
+from services.dedup import load_near_duplicates, near_duplicates
+from services.search_index import load_search_index, search_index
+from utils.scoring_model import tfidf_model
+
+# How often each worker applies CV uploads, updates and deletes made by other workers to
+# its in-memory indexes; 0 turns the sync off
+INDEX_SYNC_SECONDS = float(os.getenv("INDEX_SYNC_SECONDS", "1"))
+# Change log entries older than this are deleted; a restarted worker rebuilds from the store
+CHANGE_LOG_RETENTION_SECONDS = 3600
+
+
+def index_cv(cv: CV) -> None:
+    """
+    Adds a stored CV to this process's search, near-duplicate and TF-IDF indexes.
+    """
+    if cv.simhash:
+        near_duplicates.add(cv.id, int(cv.simhash, 16))
+    search_index.add(cv.id, cv.extracted_text)
+    tfidf_model.add_document(cv.id, cv.extracted_text)
+
+
+def unindex_cv(cv_id: str) -> None:
+    search_index.remove(cv_id)
+    near_duplicates.remove(cv_id)
+    tfidf_model.remove_document(cv_id)
+
+
+class IndexSync:
+    """
+    Keeps the in-memory indexes of one worker process in step with a CV store
+    that other processes also write to, by following the store's change log.
+    """
+
+    def __init__(self, interval: float = INDEX_SYNC_SECONDS):
+        self.interval = interval
+        self.cursor = 0
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    def load(self, cv_store) -> None:
+        # Read the cursor first so changes made while loading are replayed rather than missed
+        self.cursor = cv_store.last_change()
+        load_search_index(cv_store)
+        load_near_duplicates(cv_store)
+
+    def apply(self, cv_store) -> int:
+        """
+        Applies the changes other processes made since the last call and returns
+        how many CVs were re-indexed or dropped.
+        """
+        own_pid = os.getpid()
+        applied = 0
+        while True:
+            changes = cv_store.changes_since(self.cursor)
+            if not changes:
+                break
+            # Only the last change to each CV matters
+            latest: Dict[str, str] = {}
+            for _, cv_id, op, pid in changes:
+                if pid != own_pid:
+                    latest[cv_id] = op
+            # Puts and updates re-index the stored CV; deletes drop it
+            put_ids = [cv_id for cv_id, op in latest.items() if op != "delete"]
+            stored = {cv.id: cv for cv in cv_store.get_many(put_ids)}
+            for cv_id in latest:
+                if cv_id in stored:
+                    index_cv(stored[cv_id])
+                else:
+                    unindex_cv(cv_id)
+            applied += len(latest)
+            self.cursor = changes[-1][0]
+        now = time.time()
+        if now - self._pruned_at > CHANGE_LOG_RETENTION_SECONDS / 10:
+            cv_store.prune_changes(now - CHANGE_LOG_RETENTION_SECONDS)
+            self._pruned_at = now
+        return applied
+
+    def start(self, cv_store) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(cv_store))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, cv_store) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.apply, cv_store)
+            except Exception as e:
+                metrics.log_event("index_sync_failed", logging.WARNING, error=str(e))
+
+
+index_sync = IndexSync()
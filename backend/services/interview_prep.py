@@ -1,20 +1,56 @@
-import os
-import google.generativeai as genai
-import json
+import logging
 from fastapi import HTTPException
 from typing import Dict, Any
+from models.response_models import InterviewPrepResponse
+from services.cache import make_key, result_cache
+from services import llm_client, llm_router, metrics
+from services.llm_router import DeadlineExceeded, UpstreamUnavailable
+from services.prompt_compaction import compact_cv, compact_job_description
+from services.structured_output import generate_structured
+from utils.keyword_engine import match_many
 
-def generate_interview_questions(cv_text: str, job_description: str) -> Dict[str, Any]:
+def local_interview_questions(cv_text: str, job_description: str) -> Dict[str, Any]:
+    """
+    Template questions built from the keyword match, for when Gemini is unavailable.
+    Marked with source "local" and neither cached nor stored on the CV, so the
+    next request tries Gemini again.
+    """
+    match = match_many([cv_text], job_description)[0]
+    matched, missing = match["matched_keywords"], match["missing_keywords"]
+    technical = [f"Walk me through a project where you used {keyword}. What trade-offs did you make?" for keyword in matched[:4]]
+    technical += [f"The role uses {keyword}. What related experience do you have, and how would you ramp up?" for keyword in missing[:3]]
+    tips = ["Answer behavioral questions with the STAR method: situation, task, action, result."]
+    if matched:
+        tips.append(f"Prepare a concrete, measurable example for {', '.join(matched[:3])}.")
+    if missing:
+        tips.append(f"Expect questions on {', '.join(missing[:3])}: the job asks for them and your CV does not mention them.")
+    return {
+        "technical_questions": technical,
+        "behavioral_questions": [
+            "Tell me about a time you delivered under a tight deadline.",
+            "Describe a disagreement with a teammate and how you resolved it.",
+            "Tell me about a mistake you made and what you changed afterwards.",
+        ],
+        "tips": tips,
+        "source": "local",
+    }
+
+async def generate_interview_questions(cv_text: str, job_description: str, use_cache: bool = True) -> Dict[str, Any]:
     """
     Generates interview questions and tips based on CV and Job Description using Gemini.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    cache_key = make_key("interview_questions", llm_router.model_for("interview_questions"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if llm_router.is_local("interview_questions"):
+        return local_interview_questions(cv_text, job_description)
+    if not llm_client.is_configured():
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
         prompt = f"""
 You are an expert technical recruiter and interview coach.
 Your goal is to prepare a candidate for an interview by generating likely questions based on their CV and the Job Description.
@@ -37,23 +73,21 @@ Output JSON structure:
 Return ONLY the JSON.
 
 Job Description:
-{job_description}
+{compact_job_description(job_description, endpoint="interview_questions")}
 
 Candidate CV:
-{cv_text}
+{compact_cv(cv_text, job_description, endpoint="interview_questions")}
 """
-        response = model.generate_content(prompt)
-        content = response.text.strip()
-        
-        # Clean up potential markdown code blocks
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-            
-        return json.loads(content.strip())
+        prep = await generate_structured(prompt, InterviewPrepResponse, endpoint="interview_questions")
+        result = prep.model_dump(exclude={"error", "source"})
+        result_cache.set(cache_key, result)
+        return result
+    except (UpstreamUnavailable, DeadlineExceeded) as e:
+        metrics.inc("llm_local_fallbacks_total", endpoint="interview_questions", reason=type(e).__name__)
+        return local_interview_questions(cv_text, job_description)
+    except HTTPException:
+        # Capacity errors keep their 429/503 status and Retry-After header
+        raise
     except Exception as e:
-        print(f"Error during interview prep generation: {e}")
+        metrics.log_event("interview_prep_failed", logging.ERROR, error=str(e))
         raise HTTPException(status_code=500, detail=f"An error occurred during interview prep generation: {e}")
@@ -0,0 +1,96 @@
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from models.response_models import CriticalSkillsResponse, JobDescription
+from services import llm_client, llm_router, metrics
+from services.prompt_compaction import clean_text, compact_job_description, forget as forget_compacted, remember
+from services.structured_output import generate_structured
+from utils.keyword_engine import analyze_job, pin, unpin, vocabulary
+
+MAX_CRITICAL_SKILLS = 20
+
+# Profiles of stored job descriptions, keyed by their exact text, so requests that
+# pass jd_id (or the same text again) reuse them instead of re-deriving them
+_profiles: Dict[str, JobDescription] = {}
+
+
+def _keyword_skills(job_description: str) -> List[str]:
+    # Terms from the keyword engine's skill lexicon, in order of first appearance
+    document = analyze_job(job_description)
+    return [document.surfaces[i] for i in document.ids if i < vocabulary.skill_count][:MAX_CRITICAL_SKILLS]
+
+
+async def _extract_critical_skills(compact_text: str) -> List[str]:
+    prompt = (
+        "List the critical hard skills, tools and domain knowledge a candidate needs for this job. "
+        "Leave out generic soft skills like 'communication' or 'teamwork' unless they are central to the role. "
+        f"Use short names (\"python\", \"kubernetes\", \"financial modelling\"), at most {MAX_CRITICAL_SKILLS}, most important first.\n"
+        "Return STRICT JSON: {\"critical_skills\": [<skill>, ...]}\n\n"
+        "Job Description:\n" + compact_text
+    )
+    extracted = await generate_structured(prompt, CriticalSkillsResponse, endpoint="jd_profile")
+    skills = dict.fromkeys(s.strip().lower() for s in extracted.critical_skills if s.strip())
+    return list(skills)[:MAX_CRITICAL_SKILLS]
+
+
+async def build_profile(text: str, content_hash: str, title: Optional[str] = None) -> JobDescription:
+    """
+    Computes everything that depends on the job description alone: normalized text,
+    keywords, the compacted prompt form and the critical skills. Gemini extracts
+    the skills once; without it they come from the keyword engine's skill lexicon.
+    """
+    compact_text = compact_job_description(text, endpoint="jd_profile")
+    document = analyze_job(text)
+    skills, source = None, "keywords"
+    if llm_client.is_configured() and not llm_router.is_local("jd_profile"):
+        try:
+            skills, source = await _extract_critical_skills(compact_text), "llm"
+        except Exception as e:
+            metrics.log_event("jd_profile_fallback", logging.WARNING, error=str(e))
+    if not skills:
+        skills, source = _keyword_skills(text), "keywords"
+    metrics.inc("jd_profiles_built_total", skills_source=source)
+    return JobDescription(
+        id=str(uuid.uuid4()),
+        title=title,
+        text=text,
+        created_at=time.time(),
+        text_hash=content_hash,
+        normalized_text=clean_text(text, strip_contact=True),
+        critical_skills=skills,
+        skills_source=source,
+        keywords=[document.surfaces[i] for i in document.ids],
+        compact_text=compact_text,
+    )
+
+
+def register(jd: JobDescription) -> None:
+    """
+    Makes a stored profile visible to the scoring and generation services, and
+    pins the JD's keyword analysis and compacted form.
+    """
+    _profiles[jd.text] = jd
+    pin(jd.text)
+    if jd.compact_text is not None:
+        remember(jd.text, jd.compact_text)
+
+
+def forget(jd: JobDescription) -> None:
+    if _profiles.pop(jd.text, None) is not None:
+        unpin(jd.text)
+        forget_compacted(jd.text)
+
+
+def load(jds: Iterable[JobDescription]) -> None:
+    for jd in jds:
+        register(jd)
+
+
+def lookup(job_description: str) -> Optional[JobDescription]:
+    return _profiles.get(job_description)
+
+
+def profile_samples():
+    yield "jd_profiles_cached", {}, len(_profiles)
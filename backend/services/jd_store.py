@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from models.response_models import JobDescription, JobDescriptionSummary
+
+SUMMARY_FIELDS = list(JobDescriptionSummary.model_fields)
+
+
+class JDStore:
+    """
+    Storage interface for job descriptions and their precomputed profiles.
+    Implementations must be safe to share across threads.
+    """
+
+    def get(self, jd_id: str) -> Optional[JobDescription]:
+        raise NotImplementedError
+
+    def put(self, jd: JobDescription) -> None:
+        raise NotImplementedError
+
+    def delete(self, jd_id: str) -> bool:
+        raise NotImplementedError
+
+    def find_by_hash(self, text_hash: str) -> Optional[JobDescription]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def iter_all(self) -> Iterator[JobDescription]:
+        raise NotImplementedError
+
+    def list(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Returns one page of summaries, newest first.
+        """
+        raise NotImplementedError
+
+
+class InMemoryJDStore(JDStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jds: Dict[str, JobDescription] = {}
+
+    def get(self, jd_id: str) -> Optional[JobDescription]:
+        with self._lock:
+            jd = self._jds.get(jd_id)
+            return jd.model_copy(deep=True) if jd else None
+
+    def put(self, jd: JobDescription) -> None:
+        with self._lock:
+            self._jds[jd.id] = jd.model_copy(deep=True)
+
+    def delete(self, jd_id: str) -> bool:
+        with self._lock:
+            return self._jds.pop(jd_id, None) is not None
+
+    def find_by_hash(self, text_hash: str) -> Optional[JobDescription]:
+        with self._lock:
+            for jd in self._jds.values():
+                if jd.text_hash == text_hash:
+                    return jd.model_copy(deep=True)
+        return None
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._jds)
+
+    def iter_all(self) -> Iterator[JobDescription]:
+        with self._lock:
+            jds = list(self._jds.values())
+        for jd in jds:
+            yield jd.model_copy(deep=True)
+
+    def list(self, offset=0, limit=50):
+        with self._lock:
+            jds = sorted(self._jds.values(), key=lambda jd: (jd.created_at or 0, jd.id), reverse=True)
+        return [{name: getattr(jd, name) for name in SUMMARY_FIELDS} for jd in jds[offset:offset + limit]]
+
+
+class SQLiteJDStore(JDStore):
+    """
+    Job descriptions in their own table of the CV store's SQLite file, so every
+    worker process sees the same ones.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS job_descriptions "
+                "(id TEXT PRIMARY KEY, text_hash TEXT, created_at REAL, data TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jds_text_hash ON job_descriptions (text_hash)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jds_created_at ON job_descriptions (created_at, id)")
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> JobDescription:
+        return JobDescription(**json.loads(row["data"]))
+
+    def get(self, jd_id: str) -> Optional[JobDescription]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM job_descriptions WHERE id = ?", (jd_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def put(self, jd: JobDescription) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_descriptions (id, text_hash, created_at, data) VALUES (?, ?, ?, ?)",
+                (jd.id, jd.text_hash, jd.created_at, jd.model_dump_json()),
+            )
+
+    def delete(self, jd_id: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM job_descriptions WHERE id = ?", (jd_id,)).rowcount > 0
+
+    def find_by_hash(self, text_hash: str) -> Optional[JobDescription]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM job_descriptions WHERE text_hash = ? LIMIT 1", (text_hash,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM job_descriptions").fetchone()[0]
+
+    def iter_all(self) -> Iterator[JobDescription]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM job_descriptions ORDER BY id").fetchall()
+        for row in rows:
+            yield self._from_row(row)
+
+    def list(self, offset=0, limit=50):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM job_descriptions ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [{name: getattr(jd, name) for name in SUMMARY_FIELDS} for jd in map(self._from_row, rows)]
+
+
+def create_jd_store() -> JDStore:
+    """
+    Builds the store matching CV_STORE_BACKEND; SQLite shares the CV store's file.
+    """
+    backend = os.getenv("CV_STORE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryJDStore()
+    if backend == "sqlite":
+        return SQLiteJDStore(os.getenv("CV_STORE_PATH", "cv_store.db"))
+    raise ValueError(f"Unknown CV_STORE_BACKEND: {backend}")
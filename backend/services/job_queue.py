@@ -0,0 +1,352 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from services import metrics
+from services.shared_state import SHARED_STATE_DB, SharedJobs
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "2"))
+# Finished jobs kept for polling before the oldest are dropped
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "10000"))
+# How often a worker checks the shared state for a job another worker is running
+JOB_POLL_SECONDS = 0.5
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+Cleanup = Callable[[Dict[str, Any]], None]
+
+# Id of the job whose handler is running, for progress reports
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_job", default=None)
+
+_TRANSIENT_NAMES = {
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TooManyRequests",
+    "TimeoutError",
+    "ConnectionError",
+}
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for upstream errors worth retrying (quota, 5xx, timeouts). Services wrap
+    Gemini errors in HTTPException, so the cause/context chain is checked too.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if any(cls.__name__ in _TRANSIENT_NAMES for cls in type(error).__mro__):
+            return True
+        if isinstance(error, HTTPException) and error.status_code in (429, 503):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class JobQueue:
+    """
+    In-process priority queue served by a pool of asyncio workers. Within one
+    priority level, clients are served round-robin so one client's burst cannot
+    starve the others. Transient failures are retried with exponential backoff.
+    Jobs run in the process that accepted them; with `shared` job states, other
+    worker processes can still report on them.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        backoff: float = JOB_BACKOFF_SECONDS,
+        shared: Optional[SharedJobs] = None,
+    ):
+        self.worker_count = workers
+        self.shared = shared
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._handlers: Dict[str, Handler] = {}
+        self._cleanups: Dict[str, Cleanup] = {}
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # priority -> client id -> job ids, plus the round-robin order of clients
+        self._queues: Dict[int, Dict[str, Deque[str]]] = {}
+        self._rotation: Dict[int, Deque[str]] = {}
+        self._queued = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._done_events: Dict[str, asyncio.Event] = {}
+        # Set, then dropped, on the job's next state change or progress report
+        self._update_events: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        # Workers running a job, and the running jobs paused to let queued ones through
+        self._running = 0
+        self._yielding: Dict[Optional[str], int] = {}
+        self._timers: set = set()
+        self._stopping = False
+
+    def register(self, kind: str, handler: Handler, cleanup: Optional[Cleanup] = None) -> None:
+        """
+        `cleanup` gets the payload once the job succeeded or failed for good, not
+        between retries, so it can release what every attempt needs.
+        """
+        self._handlers[kind] = handler
+        if cleanup is not None:
+            self._cleanups[kind] = cleanup
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self, timeout: float = 0) -> None:
+        """
+        Stops the workers. With a `timeout`, they first get that long to finish the
+        queued and running jobs; jobs still unfinished after it are marked failed.
+        """
+        self._stopping = True
+        if self._wakeup is not None:
+            # Idle workers exit once the queue is empty
+            self._wakeup.set()
+        if timeout > 0 and self._workers:
+            await asyncio.wait(self._workers, timeout=timeout)
+        for task in self._workers + list(self._timers):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._timers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if job["status"] not in ("succeeded", "failed"):
+                job["status"] = "failed"
+                job["error"] = "The server shut down before the job finished."
+                job["updated_at"] = time.time()
+                self._publish(job)
+                self._finish(job)
+
+    def submit(self, kind: str, payload: Dict[str, Any], client_id: str = "anonymous", priority: int = 0) -> Dict[str, Any]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "priority": priority,
+            "client_id": client_id,
+            "attempts": 0,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "result": None,
+            "error": None,
+            "progress": None,
+            "payload": payload,
+        }
+        self._jobs[job_id] = job
+        self._done_events[job_id] = asyncio.Event()
+        self._enqueue(job)
+        self._publish(job)
+        self._trim_history()
+        return self.public_view(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return self.public_view(job)
+        # Submitted to another worker process
+        return self.shared.get(job_id) if self.shared is not None else None
+
+    async def wait(self, job_id: str, timeout: float, updates: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Waits up to `timeout` seconds for the job to finish and returns its latest state.
+        With `updates`, also returns on the job's next state change or progress report.
+        """
+        event = self._done_events.get(job_id)
+        if event is not None and updates:
+            event = self._update_events.setdefault(job_id, asyncio.Event())
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        elif job_id not in self._jobs and self.shared is not None:
+            deadline = time.monotonic() + timeout
+            seen = None
+            while time.monotonic() < deadline:
+                job = self.shared.get(job_id)
+                if job is None or job["status"] in ("succeeded", "failed"):
+                    return job
+                if updates and seen is not None and job["updated_at"] != seen:
+                    return job
+                seen = job["updated_at"]
+                await asyncio.sleep(min(JOB_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+        return self.get(job_id)
+
+    def report(self, progress: Dict[str, Any]) -> None:
+        """
+        Records progress of the job whose handler is calling; a no-op outside a handler.
+        """
+        job = self._jobs.get(_current_job.get() or "")
+        if job is None:
+            return
+        job["progress"] = progress
+        job["updated_at"] = time.time()
+        self._publish(job)
+
+    def depth(self) -> int:
+        """
+        Number of jobs waiting for a worker.
+        """
+        return self._queued
+
+    def active(self) -> int:
+        """
+        Workers running a job that is not paused in `yielding`; only these can
+        free up to take queued jobs.
+        """
+        return self._running - len(self._yielding)
+
+    @contextmanager
+    def yielding(self):
+        """
+        Marks the calling job as paused until the queue drains, so other jobs do
+        not pause too when no other worker is left to drain it.
+        """
+        job_id = _current_job.get()
+        self._yielding[job_id] = self._yielding.get(job_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._yielding[job_id] -= 1
+            if not self._yielding[job_id]:
+                del self._yielding[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"queued": self._queued, "workers": len(self._workers), "jobs": counts}
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if k not in ("payload", "client_id")}
+
+    def _enqueue(self, job: Dict[str, Any]) -> None:
+        priority, client = job["priority"], job["client_id"]
+        clients = self._queues.setdefault(priority, {})
+        rotation = self._rotation.setdefault(priority, deque())
+        if client not in clients:
+            clients[client] = deque()
+            rotation.append(client)
+        clients[client].append(job["id"])
+        self._queued += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _dequeue(self) -> Optional[Dict[str, Any]]:
+        for priority in sorted(self._queues, reverse=True):
+            clients, rotation = self._queues[priority], self._rotation[priority]
+            while rotation:
+                client = rotation.popleft()
+                pending = clients[client]
+                job_id = pending.popleft()
+                if pending:
+                    rotation.append(client)
+                else:
+                    del clients[client]
+                self._queued -= 1
+                if job_id in self._jobs:
+                    return self._jobs[job_id]
+            del self._queues[priority]
+            del self._rotation[priority]
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            job = self._dequeue()
+            if job is None:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job["status"] = "running"
+        job["attempts"] += 1
+        job["updated_at"] = time.time()
+        self._publish(job)
+        token = _current_job.set(job["id"])
+        self._running += 1
+        try:
+            job["result"] = await self._handlers[job["kind"]](job["payload"])
+            job["status"] = "succeeded"
+            job["error"] = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+            if is_transient(e) and job["attempts"] < self.max_attempts:
+                job["status"] = "retrying"
+                delay = self.backoff * 2 ** (job["attempts"] - 1) * (0.5 + random.random())
+                # Capacity errors say when capacity is expected back
+                delay = max(delay, getattr(e, "retry_after", 0))
+                self._schedule_retry(job, delay)
+            else:
+                job["status"] = "failed"
+        finally:
+            self._running -= 1
+            _current_job.reset(token)
+        job["updated_at"] = time.time()
+        self._publish(job)
+        if job["status"] in ("succeeded", "failed"):
+            self._finish(job)
+            self._done_events.pop(job["id"]).set()
+
+    def _finish(self, job: Dict[str, Any]) -> None:
+        payload, job["payload"] = job["payload"], None
+        cleanup = self._cleanups.get(job["kind"])
+        if cleanup is not None and payload is not None:
+            try:
+                cleanup(payload)
+            except Exception as e:
+                metrics.log_event("job_cleanup_failed", logging.WARNING, job_id=job["id"], error=str(e))
+
+    def _schedule_retry(self, job: Dict[str, Any], delay: float) -> None:
+        async def requeue():
+            await asyncio.sleep(delay)
+            job["status"] = "queued"
+            self._enqueue(job)
+            self._publish(job)
+
+        timer = asyncio.create_task(requeue())
+        self._timers.add(timer)
+        timer.add_done_callback(self._timers.discard)
+
+    def _publish(self, job: Dict[str, Any]) -> None:
+        event = self._update_events.pop(job["id"], None)
+        if event is not None:
+            event.set()
+        if self.shared is not None:
+            try:
+                self.shared.publish(self.public_view(job))
+            except Exception as e:
+                # The job itself carries on; only other workers lose sight of it
+                metrics.log_event("job_publish_failed", logging.WARNING, job_id=job["id"], error=str(e))
+
+    def _trim_history(self) -> None:
+        while len(self._jobs) > JOB_HISTORY:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest["status"] not in ("succeeded", "failed"):
+                break
+            del self._jobs[oldest_id]
+
+
+job_queue = JobQueue(shared=SharedJobs(SHARED_STATE_DB, JOB_HISTORY) if SHARED_STATE_DB else None)
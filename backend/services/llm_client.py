@@ -0,0 +1,270 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from services import metrics
+from services.rate_limit import AdaptiveConcurrency, is_upstream_overload, upstream_quota, CapacityError
+from utils.lazy_import import load
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Smaller, faster model for cheap tasks such as keyword scoring
+FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.0-flash-lite")
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+
+# A backend receives (prompt, model_name, generation_config) and returns the completion text
+Backend = Callable[[str, str, Optional[Dict[str, Any]]], Awaitable[str]]
+# A stream backend takes the same arguments and yields text chunks
+StreamBackend = Callable[[str, str, Optional[Dict[str, Any]]], AsyncIterator[str]]
+
+
+class LLMNotConfiguredError(RuntimeError):
+    pass
+
+
+_configured = False
+# Arguments for genai.configure; the SDK itself is imported on the first real call
+_credentials: Optional[Dict[str, Any]] = None
+_genai: Any = None
+_models: Dict[str, Any] = {}
+_concurrency: Optional[AdaptiveConcurrency] = None
+_max_concurrency = MAX_CONCURRENCY
+_backend: Optional[Backend] = None
+_stream_backend: Optional[StreamBackend] = None
+
+
+def configure(
+    api_key: Optional[str] = None,
+    api_endpoint: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+) -> bool:
+    """
+    Configures the Gemini SDK once for the whole process. Call at startup.
+    Returns True when an API key (or a stub backend) is available.
+    """
+    global _configured, _credentials, _genai, _max_concurrency, _concurrency, DEFAULT_MODEL, FAST_MODEL
+    # Re-read the environment here: .env is loaded after this module is imported
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    api_endpoint = api_endpoint or os.getenv("GEMINI_API_ENDPOINT")
+    DEFAULT_MODEL = os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
+    FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", FAST_MODEL)
+    _max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", str(MAX_CONCURRENCY)))
+    _concurrency = None
+
+    stub_url = os.getenv("LLM_STUB_URL")
+    if stub_url:
+        set_backend(rest_backend(stub_url))
+    if api_key:
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        _credentials = {"api_key": api_key, "client_options": client_options}
+        # Models hold a reference to the client they were built with
+        _genai = None
+        _models.clear()
+        _configured = True
+    return is_configured()
+
+
+def is_configured() -> bool:
+    return _configured or _backend is not None
+
+
+def set_backend(backend: Optional[Backend], stream_backend: Optional[StreamBackend] = None) -> None:
+    """
+    Routes every call to `backend` instead of Gemini. Used to run the app
+    against a local stub; pass None to restore the real client. Without a
+    `stream_backend`, streamed calls yield the whole `backend` result at once.
+    """
+    global _backend, _stream_backend
+    _backend = backend
+    _stream_backend = stream_backend
+
+
+def rest_backend(base_url: str) -> Backend:
+    """
+    Backend that calls a server speaking Gemini's generateContent REST API, such as
+    the stub in benchmarks/stub_gemini.py. Error statuses raise the same
+    google.api_core exceptions the SDK does.
+    """
+    import httpx
+
+    client = httpx.AsyncClient(base_url=base_url.rstrip("/"), timeout=None)
+
+    async def backend(prompt: str, model_name: str, generation_config: Optional[Dict[str, Any]]) -> str:
+        body: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if generation_config:
+            body["generationConfig"] = generation_config
+        response = await client.post(f"/v1beta/models/{model_name}:generateContent", json=body)
+        if response.status_code >= 400:
+            from google.api_core import exceptions
+
+            raise exceptions.from_http_status(response.status_code, response.text)
+        parts = response.json()["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
+
+    return backend
+
+
+def _sdk() -> Any:
+    # google.generativeai is slow to import, so it is loaded and configured on first use
+    global _genai
+    if _genai is None:
+        genai = load("google.generativeai")
+        if _credentials is not None:
+            genai.configure(**_credentials)
+        _genai = genai
+    return _genai
+
+
+def get_model(model_name: Optional[str] = None) -> Any:
+    model_name = model_name or DEFAULT_MODEL
+    model = _models.get(model_name)
+    if model is None:
+        model = _sdk().GenerativeModel(model_name)
+        _models[model_name] = model
+    return model
+
+
+def get_concurrency() -> Optional[AdaptiveConcurrency]:
+    return _concurrency
+
+
+async def drain(timeout: float) -> bool:
+    """
+    Waits up to `timeout` seconds for in-flight calls to finish. Returns False if
+    some were still running. Used on shutdown.
+    """
+    deadline = time.monotonic() + timeout
+    while _concurrency is not None and _concurrency.in_flight > 0:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def _get_concurrency() -> AdaptiveConcurrency:
+    global _concurrency
+    if _concurrency is None:
+        _concurrency = AdaptiveConcurrency(_max_concurrency)
+    return _concurrency
+
+
+async def _admit(prompt: str) -> AdaptiveConcurrency:
+    """
+    Waits briefly for quota and a concurrency slot, or raises CapacityError so the
+    caller can answer 429/503 instead of queueing without bound.
+    """
+    wait = upstream_quota.reserve(metrics.estimate_tokens(prompt))
+    if wait:
+        await asyncio.sleep(wait)
+    limiter = _get_concurrency()
+    await limiter.acquire()
+    return limiter
+
+
+def _overloaded(model_name: str, error: Exception) -> CapacityError:
+    metrics.inc("llm_rejections_total", reason="upstream")
+    return CapacityError(f"Gemini is throttling requests for {model_name}, try again later.", retry_after=5)
+
+
+async def generate(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Runs one completion with the shared client. Waits briefly for quota and for a
+    slot under the adaptive concurrency limit (at most LLM_MAX_CONCURRENCY), and
+    raises CapacityError when neither comes soon enough.
+    """
+    if not is_configured():
+        raise LLMNotConfiguredError("GEMINI_API_KEY not configured")
+    model_name = model_name or DEFAULT_MODEL
+
+    limiter = await _admit(prompt)
+    started = time.perf_counter()
+    latency, overloaded = None, False
+    try:
+        with metrics.span("llm_call"):
+            if _backend is not None:
+                text = await _backend(prompt, model_name, generation_config)
+                usage = None
+            else:
+                response = await get_model(model_name).generate_content_async(
+                    prompt, generation_config=generation_config
+                )
+                text = response.text or ""
+                usage = getattr(response, "usage_metadata", None)
+        latency = time.perf_counter() - started
+    except Exception as e:
+        metrics.inc("llm_requests_total", model=model_name, outcome="error")
+        if is_upstream_overload(e):
+            overloaded = True
+            raise _overloaded(model_name, e) from e
+        raise
+    finally:
+        limiter.release(latency, overloaded)
+    _record_usage(model_name, prompt, text, usage)
+    return text
+
+
+async def stream(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streams a completion chunk by chunk. Closing or cancelling the iterator
+    cancels the upstream call and frees its concurrency slot.
+    """
+    if not is_configured():
+        raise LLMNotConfiguredError("GEMINI_API_KEY not configured")
+    model_name = model_name or DEFAULT_MODEL
+
+    limiter = await _admit(prompt)
+    chunks = []
+    usage = None
+    completed, overloaded = False, False
+    try:
+        with metrics.span("llm_call"):
+            if _backend is not None:
+                if _stream_backend is None:
+                    chunks.append(await _backend(prompt, model_name, generation_config))
+                    yield chunks[-1]
+                else:
+                    async for chunk in _stream_backend(prompt, model_name, generation_config):
+                        chunks.append(chunk)
+                        yield chunk
+            else:
+                response = await get_model(model_name).generate_content_async(
+                    prompt, generation_config=generation_config, stream=True
+                )
+                async for chunk in response:
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    # Chunks without candidates (e.g. trailing metadata) have no text
+                    if chunk.candidates and chunk.parts:
+                        chunks.append(chunk.text)
+                        yield chunks[-1]
+        completed = True
+    except Exception as e:
+        if is_upstream_overload(e):
+            overloaded = True
+            raise _overloaded(model_name, e) from e
+        raise
+    finally:
+        # Stream length depends on the output, so only errors steer the concurrency limit
+        limiter.release(None, overloaded)
+        if completed:
+            _record_usage(model_name, prompt, "".join(chunks), usage)
+        else:
+            # Errors, and streams the client abandoned part way
+            metrics.inc("llm_requests_total", model=model_name, outcome="incomplete")
+
+
+def _record_usage(model_name: str, prompt: str, text: str, usage: Any) -> None:
+    # Prefer the token counts Gemini reports; estimate for stubs and responses without them
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or metrics.estimate_tokens(prompt)
+    response_tokens = getattr(usage, "candidates_token_count", None) or metrics.estimate_tokens(text)
+    upstream_quota.charge(response_tokens)
+    metrics.inc("llm_requests_total", model=model_name, outcome="ok")
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens, model=model_name)
+    metrics.inc("llm_response_tokens_total", response_tokens, model=model_name)
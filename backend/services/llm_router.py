@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from services import llm_client, metrics
+from services.rate_limit import CapacityError
+
+# Send a duplicate request once a call has taken longer than this percentile of
+# recent latencies for its endpoint and model, and keep whichever answers first; 0 turns hedging off
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+# Latencies needed before an endpoint is hedged, and how many recent ones are kept
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+# Consecutive upstream failures (errors, throttling, missed deadlines) that open a
+# model's circuit, and how long it stays open before one trial call is let through
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Model tier and deadline in seconds per endpoint. Tiers: "default" (GEMINI_MODEL,
+# then GEMINI_FAST_MODEL), "fast" (the reverse) or "local" (no LLM call).
+# Override with LLM_TIER_<ENDPOINT> and LLM_DEADLINE_<ENDPOINT>, e.g. LLM_TIER_ATS_SCORE=local.
+ROUTES: Dict[str, Tuple[str, float]] = {
+    "ats_score": ("fast", 15),
+    "jd_profile": ("fast", 20),
+    "interview_questions": ("default", 30),
+    "cover_letter": ("default", 45),
+    "rewrite": ("default", 60),
+    "analyze": ("default", 90),
+}
+TIERS = ("default", "fast", "local")
+
+
+class UpstreamUnavailable(CapacityError):
+    """
+    No model may be called for the endpoint: its tier is local, or every model's
+    circuit is open. Callers with a local fallback use it; for the rest it is a 503.
+    """
+
+    def __init__(self, detail: str, retry_after: float = 1):
+        super().__init__(detail, retry_after, status_code=503)
+
+
+class DeadlineExceeded(CapacityError):
+    def __init__(self, endpoint: str, deadline: float):
+        super().__init__(f"The model did not answer within {deadline:g}s for {endpoint}.", 1, status_code=504)
+
+
+class LatencyTracker:
+    """
+    Recent latencies of one endpoint and model, to pick the hedging delay.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive upstream failures. While open, calls are
+    refused; after `cooldown` seconds one trial call is let through, and its
+    outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def release(self) -> None:
+        # The call failed for a local reason; let another trial through
+        self._trial = False
+
+    def record(self, ok: bool) -> bool:
+        """
+        Records a call's outcome. Returns True when this failure opened the circuit.
+        """
+        self._trial = False
+        if ok:
+            self.consecutive = 0
+            self.opened_at = None
+            return False
+        self.consecutive += 1
+        was_closed = self.opened_at is None
+        if self.consecutive >= self.failures or not was_closed:
+            self.opened_at = time.monotonic()
+            return was_closed
+        return False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+
+
+def breaker(model_name: str) -> CircuitBreaker:
+    if model_name not in _breakers:
+        _breakers[model_name] = CircuitBreaker()
+    return _breakers[model_name]
+
+
+def reset() -> None:
+    _breakers.clear()
+    _latencies.clear()
+
+
+def tier(endpoint: str) -> str:
+    default_tier = ROUTES.get(endpoint, ("default", 60))[0]
+    value = os.getenv(f"LLM_TIER_{endpoint.upper()}", default_tier).lower()
+    return value if value in TIERS else default_tier
+
+
+def deadline(endpoint: str) -> float:
+    return float(os.getenv(f"LLM_DEADLINE_{endpoint.upper()}", ROUTES.get(endpoint, ("default", 60))[1]))
+
+
+def models_for(endpoint: str) -> List[str]:
+    """
+    Models the endpoint may use, in order of preference; empty for the local tier.
+    """
+    chosen = tier(endpoint)
+    if chosen == "local":
+        return []
+    order = [llm_client.DEFAULT_MODEL, llm_client.FAST_MODEL]
+    if chosen == "fast":
+        order.reverse()
+    return list(dict.fromkeys(order))
+
+
+def model_for(endpoint: str) -> str:
+    """
+    Preferred model of the endpoint; results are cached under it.
+    """
+    models = models_for(endpoint)
+    return models[0] if models else "local"
+
+
+def is_local(endpoint: str) -> bool:
+    return tier(endpoint) == "local"
+
+
+def _pick_model(endpoint: str) -> str:
+    models = models_for(endpoint)
+    if not models:
+        raise UpstreamUnavailable(f"{endpoint} is routed to the local fallback.")
+    for model_name in models:
+        if breaker(model_name).allow():
+            if model_name != models[0]:
+                metrics.inc("llm_reroutes_total", endpoint=endpoint, model=model_name)
+            return model_name
+    retry_after = min(breaker(model_name).retry_after() for model_name in models)
+    metrics.inc("llm_rejections_total", reason="circuit_open")
+    raise UpstreamUnavailable("Gemini is failing; try again shortly.", retry_after)
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    # Local admission limits and missing configuration say nothing about upstream health
+    if isinstance(error, llm_client.LLMNotConfiguredError):
+        return False
+    if isinstance(error, CapacityError) and not isinstance(error, DeadlineExceeded):
+        return error.__cause__ is not None
+    return True
+
+
+def _record(endpoint: str, model_name: str, ok: bool) -> None:
+    if breaker(model_name).record(ok):
+        metrics.inc("llm_breaker_trips_total", model=model_name)
+        metrics.log_event("llm_breaker_open", logging.WARNING, model=model_name, endpoint=endpoint)
+
+
+def _record_error(endpoint: str, model_name: str, error: BaseException) -> None:
+    if _is_upstream_failure(error):
+        _record(endpoint, model_name, ok=False)
+    else:
+        breaker(model_name).release()
+
+
+def _failover_model(endpoint: str, tried: List[str]) -> Optional[str]:
+    for model_name in models_for(endpoint):
+        if model_name not in tried and breaker(model_name).allow():
+            return model_name
+    return None
+
+
+async def generate(prompt: str, endpoint: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Runs one completion for `endpoint` on the first model of its tier whose circuit
+    is closed, within the endpoint's deadline. A call slower than the hedging
+    percentile gets a duplicate request, and the first answer wins. When the model
+    fails upstream and time is left, the call moves on to the tier's other model.
+    """
+    limit = deadline(endpoint)
+    started = time.monotonic()
+    model_name = _pick_model(endpoint)
+    tried = [model_name]
+    while True:
+        try:
+            return await _generate_on(prompt, endpoint, model_name, generation_config, started, limit)
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded) or not _is_upstream_failure(e) or time.monotonic() - started >= limit:
+                raise
+            model_name = _failover_model(endpoint, tried)
+            if model_name is None:
+                raise
+            tried.append(model_name)
+            metrics.inc("llm_failovers_total", endpoint=endpoint, model=model_name)
+
+
+async def _generate_on(
+    prompt: str,
+    endpoint: str,
+    model_name: str,
+    generation_config: Optional[Dict[str, Any]],
+    started: float,
+    limit: float,
+) -> str:
+    """
+    One attempt on `model_name`, hedged, until `limit` seconds after `started`.
+    """
+    tracker = _latencies.setdefault((endpoint, model_name), LatencyTracker())
+    hedge_after = tracker.percentile(HEDGE_PERCENTILE) if HEDGE_PERCENTILE > 0 else None
+
+    attempt_started = time.monotonic()
+    primary = asyncio.create_task(llm_client.generate(prompt, model_name, generation_config))
+    tasks = [primary]
+    errors: List[BaseException] = []
+    timed_out = False
+    try:
+        while tasks:
+            now = time.monotonic()
+            if now - started >= limit:
+                timed_out = True
+                break
+            timeout = limit - (now - started)
+            hedging = hedge_after is not None and not errors
+            if hedging:
+                timeout = min(timeout, max(0.0, hedge_after - (now - attempt_started)))
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if hedging:
+                    metrics.inc("llm_hedges_total", endpoint=endpoint)
+                    tasks.append(asyncio.create_task(llm_client.generate(prompt, model_name, generation_config)))
+                    hedge_after = None
+                continue
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    tracker.observe(time.monotonic() - attempt_started)
+                    _record(endpoint, model_name, ok=True)
+                    if task is not primary:
+                        metrics.inc("llm_hedge_wins_total", endpoint=endpoint)
+                    return task.result()
+                errors.append(task.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+    if timed_out:
+        metrics.inc("llm_deadline_exceeded_total", endpoint=endpoint)
+        _record(endpoint, model_name, ok=False)
+        raise DeadlineExceeded(endpoint, limit)
+    # Every request failed; report an upstream failure over a hedge refused by our own limits
+    error = next((e for e in errors if _is_upstream_failure(e)), errors[0])
+    _record_error(endpoint, model_name, error)
+    raise error
+
+
+async def stream(prompt: str, endpoint: str, generation_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """
+    Streams a completion for `endpoint` on the first model of its tier whose circuit
+    is closed. Each chunk, the first included, must arrive within the endpoint's
+    deadline. Streams are not hedged.
+    """
+    model_name = _pick_model(endpoint)
+    limit = deadline(endpoint)
+    chunks = llm_client.stream(prompt, model_name, generation_config)
+    received = False
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=limit)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                metrics.inc("llm_deadline_exceeded_total", endpoint=endpoint)
+                _record(endpoint, model_name, ok=False)
+                raise DeadlineExceeded(endpoint, limit)
+            except Exception as e:
+                _record_error(endpoint, model_name, e)
+                raise
+            if not received:
+                received = True
+                _record(endpoint, model_name, ok=True)
+            yield chunk
+    finally:
+        if not received:
+            breaker(model_name).release()
+        await chunks.aclose()
+
+
+def breaker_samples():
+    for model_name, model_breaker in _breakers.items():
+        yield "llm_breaker_open", {"model": model_name}, 0 if model_breaker.state == "closed" else 1
@@ -0,0 +1,205 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# With metrics off, spans and counters return immediately and /metrics is empty
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns (name, labels, value) gauge samples when /metrics is scraped
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]
+
+_HELP = {
+    "http_requests_total": "HTTP requests by route, method and status.",
+    "http_request_duration_seconds": "Time until the response headers were ready.",
+    "stage_duration_seconds": "Time spent in each processing stage.",
+    "llm_requests_total": "LLM calls by model and outcome.",
+    "llm_prompt_tokens_total": "Prompt tokens sent to the LLM.",
+    "llm_response_tokens_total": "Response tokens received from the LLM.",
+    "scoring_requests_total": "ATS scoring requests by mode.",
+    "scoring_fallbacks_total": "LLM scoring requests answered by the keyword scorer instead.",
+    "prompt_tokens_saved_total": "Estimated prompt tokens removed by prompt compaction.",
+    "llm_hedges_total": "Duplicate LLM requests sent because the first was slower than the hedging percentile.",
+    "llm_hedge_wins_total": "Hedged LLM requests that answered before the original.",
+    "llm_deadline_exceeded_total": "LLM calls abandoned at their endpoint's deadline.",
+    "llm_reroutes_total": "LLM calls sent to a model other than the endpoint's preferred one because its circuit was open.",
+    "llm_failovers_total": "LLM calls retried on the tier's other model after the first one failed upstream.",
+    "llm_breaker_trips_total": "Times a model's circuit breaker opened.",
+    "llm_breaker_open": "1 while a model's circuit breaker is open or half-open.",
+    "llm_local_fallbacks_total": "Requests answered locally because Gemini was unavailable or too slow.",
+    "structured_output_total": "JSON replies from Gemini by endpoint and outcome: ok, repaired, partial or failed.",
+    "jd_profiles_built_total": "Job description profiles computed at ingest, by where the critical skills came from.",
+    "jd_profiles_cached": "Job description profiles held by this process.",
+    "bulk_upload_files_total": "Files processed by bulk uploads, by outcome: stored, duplicate or failed.",
+    "bulk_upload_pauses_total": "Times bulk extraction paused because the background job queue was deep.",
+    "bulk_upload_rejections_total": "Bulk uploads refused because the background job queue was full.",
+    "incremental_rescores_total": "LLM-mode re-scores of edited CVs, by whether Gemini was called or its last result reused.",
+}
+
+# Stage durations of the request being handled, for its log line
+request_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_stages", default=None)
+
+logger = logging.getLogger("cv_analyser")
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(_JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """
+    Writes one JSON log line: {"ts", "level", "event", **fields}.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [bucket counts..., +Inf count], sum
+        self._histograms: Dict[Tuple[str, Labels], Tuple[List[int], List[float]]] = {}
+        self._collectors: List[Collector] = []
+
+    def inc(self, name: str, value: float, labels: Labels) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = ([0] * (len(BUCKETS) + 1), [0.0])
+            histogram[0][bisect_left(BUCKETS, value)] += 1
+            histogram[1][0] += value
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._histograms.items())
+        lines: List[str] = []
+        declared = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in declared:
+                declared.add(name)
+                if name in _HELP:
+                    lines.append(f"# HELP {name} {_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (counts, total) in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                log_event("metrics_collector_failed", logging.WARNING, error=str(e))
+                continue
+            for name, labels, value in samples:
+                declare(name, "gauge")
+                lines.append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = ",".join(f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + escaped + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = _Registry()
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    if ENABLED:
+        registry.inc(name, value, _labels(labels))
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if ENABLED:
+        registry.observe(name, value, _labels(labels))
+
+
+def add_collector(collector: Collector) -> None:
+    registry.add_collector(collector)
+
+
+@contextmanager
+def _span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("stage_duration_seconds", elapsed, (("stage", stage),))
+        stages = request_stages.get()
+        if stages is not None:
+            stages[stage] = round(stages.get(stage, 0.0) + elapsed * 1000, 3)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(stage: str):
+    """
+    Times a block as one processing stage: `with metrics.span("extraction"): ...`.
+    """
+    return _span(stage) if ENABLED else _NO_SPAN
+
+
+def render() -> str:
+    return registry.render() if ENABLED else ""
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; used when the API reports no usage
+    return (len(text) + 3) // 4 if text else 0
@@ -0,0 +1,216 @@
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from services import metrics
+from utils.keyword_engine import analyze, analyze_job, vocabulary
+from utils.text_extractor import PAGE_BREAK
+
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "true").lower() not in ("0", "false", "no")
+# Approximate token budgets for the CV and JD parts of a prompt
+CV_TOKEN_BUDGET = int(os.getenv("PROMPT_CV_TOKEN_BUDGET", "1200"))
+JD_TOKEN_BUDGET = int(os.getenv("PROMPT_JD_TOKEN_BUDGET", "600"))
+
+CV_HEADINGS = {
+    "summary", "professional summary", "profile", "about me", "objective", "career objective",
+    "experience", "work experience", "professional experience", "employment", "employment history", "work history",
+    "education", "skills", "technical skills", "core competencies", "key skills", "projects", "personal projects",
+    "certifications", "certificates", "awards", "achievements", "publications", "languages", "courses", "training",
+    "volunteering", "volunteer experience", "interests", "hobbies", "references",
+}
+JD_HEADINGS = {
+    "about us", "about the company", "who we are", "our mission", "benefits", "perks", "what we offer",
+    "why join us", "compensation", "salary", "equal opportunity", "how to apply", "responsibilities",
+    "requirements", "qualifications", "what you will do", "what you'll do", "about the role", "the role",
+    "nice to have", "preferred qualifications", "about you", "skills",
+}
+# Sections that never help the model judge or write for a job
+_CV_NOISE_SECTIONS = {"references", "hobbies", "interests"}
+_JD_NOISE_SECTIONS = {
+    "about us", "about the company", "who we are", "our mission", "benefits", "perks", "what we offer",
+    "why join us", "compensation", "salary", "equal opportunity", "how to apply",
+}
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_URL = re.compile(r"(?:https?://|www\.)\S+|\b(?:linkedin|github|gitlab)\.com/\S*", re.IGNORECASE)
+_PHONE = re.compile(r"(?<![\w-])\+?\(?\d[\d\s().-]{7,}\d(?![\w-])")
+# Only the explicit "Page N" form: a bare number on its own line may be a figure from the CV
+_PAGE_MARKER = re.compile(r"^page\s+\d+(?:\s*(?:/|of)\s*\d+)?$", re.IGNORECASE)
+_INLINE_SPACE = re.compile(r"[ \t\u00a0\u200b]+")
+_PUNCTUATION_ONLY = re.compile(r"^[\W_]*$")
+
+
+def _is_phone(match: "re.Match") -> bool:
+    digits = sum(ch.isdigit() for ch in match.group(0))
+    # Date ranges such as "2019 - 2021" have 8 digits; phone numbers have 9 to 15
+    return 9 <= digits <= 15
+
+
+# Lines this close to the top or bottom of a page may be running headers or footers
+_PAGE_EDGE_LINES = 2
+
+
+def _edge_lines(page: List[str]) -> set:
+    content = [i for i, line in enumerate(page) if line and not _PAGE_MARKER.match(line)]
+    return set(content[:_PAGE_EDGE_LINES] + content[-_PAGE_EDGE_LINES:])
+
+
+def clean_text(text: str, strip_contact: bool = True, strip_headers: bool = True) -> str:
+    """
+    Collapses whitespace and drops page numbers, (with `strip_headers`) headers and
+    footers repeated across pages, and (with `strip_contact`) emails, phone numbers
+    and profile URLs.
+    """
+    pages = [
+        [_INLINE_SPACE.sub(" ", line).strip() for line in page.splitlines()]
+        for page in (text or "").split(PAGE_BREAK)
+    ]
+    edges = [_edge_lines(page) for page in pages]
+    # Short lines at the edge of three or more pages are running headers or footers; only
+    # extracted page breaks count, so sub-headings repeated in the body are kept
+    counts: Counter = Counter()
+    if strip_headers and len(pages) >= 3:
+        for page, edge in zip(pages, edges):
+            counts.update({page[i] for i in edge if len(page[i]) < 80})
+    seen = set()
+    cleaned: List[str] = []
+    for page, edge in zip(pages, edges):
+        for i, line in enumerate(page):
+            if _PAGE_MARKER.match(line):
+                continue
+            if i in edge and counts.get(line, 0) >= 3:
+                if line in seen:
+                    continue
+                seen.add(line)
+            if strip_contact and line:
+                line = _EMAIL.sub("", line)
+                line = _URL.sub("", line)
+                line = _PHONE.sub(lambda m: "" if _is_phone(m) else m.group(0), line)
+                line = _INLINE_SPACE.sub(" ", line).strip(" |,;•·-")
+                if _PUNCTUATION_ONLY.match(line):
+                    line = ""
+            if line or (cleaned and cleaned[-1]):
+                cleaned.append(line)
+    return "\n".join(cleaned).strip()
+
+
+def _heading(line: str, headings: set) -> str:
+    # Known headings only: short all-caps lines are as often job titles or employers
+    candidate = line.strip().rstrip(":").strip().lower()
+    return candidate if candidate in headings else ""
+
+
+def split_sections(text: str, headings: set) -> List[Tuple[str, str]]:
+    """
+    Splits text at heading lines into (heading, text) pairs; text before the
+    first heading comes back with an empty heading.
+    """
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    for line in text.splitlines():
+        name = _heading(line, headings) if line else ""
+        if name:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(body).strip()) for name, body in sections if "\n".join(body).strip()]
+
+
+def _relevance(section: str, job_description: str) -> float:
+    jd = analyze_job(job_description)
+    if not len(jd.ids):
+        return 0.0
+    found = np.isin(jd.ids, analyze(section).sorted_ids, assume_unique=True)
+    return float(vocabulary.weights(jd.ids[found]).sum())
+
+
+def _truncate(text: str, budget: int) -> str:
+    # Cut at a line boundary so bullets are not split mid-sentence
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = metrics.estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not kept:
+                # One long line: keep as many whole words as fit
+                kept.append(line[: budget * 4].rsplit(" ", 1)[0])
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def _select(sections: List[Tuple[str, str]], job_description: str, budget: int) -> str:
+    """
+    Keeps the sections sharing the most JD keywords until the budget is spent,
+    then restores document order.
+    """
+    ranked = sorted(
+        range(len(sections)),
+        key=lambda i: (sections[i][0] != "", -_relevance(sections[i][1], job_description), i),
+    )
+    chosen = {}
+    remaining = budget
+    for i in ranked:
+        cost = metrics.estimate_tokens(sections[i][1])
+        if cost <= remaining:
+            chosen[i] = sections[i][1]
+            remaining -= cost
+        elif remaining > 50:
+            chosen[i] = _truncate(sections[i][1], remaining)
+            remaining = 0
+    return "\n\n".join(chosen[i] for i in sorted(chosen) if chosen[i])
+
+
+def compact_cv(cv_text: str, job_description: str, budget: int = CV_TOKEN_BUDGET, keep_all: bool = False, endpoint: str = "") -> str:
+    """
+    Prepares CV text for a prompt: cleaned of noise, and (unless `keep_all`, which
+    rewrites need) cut to the sections most relevant to the JD within `budget` tokens.
+    """
+    if not PROMPT_COMPACTION:
+        return cv_text
+    cleaned = clean_text(cv_text, strip_contact=not keep_all, strip_headers=not keep_all)
+    if not keep_all:
+        sections = [(name, body) for name, body in split_sections(cleaned, CV_HEADINGS) if name not in _CV_NOISE_SECTIONS]
+        if metrics.estimate_tokens(cleaned) > budget:
+            cleaned = _select(sections, job_description, budget)
+        else:
+            cleaned = "\n\n".join(body for _, body in sections)
+    metrics.inc("prompt_tokens_saved_total", metrics.estimate_tokens(cv_text) - metrics.estimate_tokens(cleaned), part="cv", endpoint=endpoint)
+    return cleaned
+
+
+# Compacted forms of stored job descriptions (at the default budget), computed once at ingest
+_precompacted: Dict[str, str] = {}
+
+
+def remember(job_description: str, compacted: str) -> None:
+    _precompacted[job_description] = compacted
+
+
+def forget(job_description: str) -> None:
+    _precompacted.pop(job_description, None)
+
+
+def compact_job_description(job_description: str, budget: int = JD_TOKEN_BUDGET, endpoint: str = "") -> str:
+    """
+    Drops company boilerplate (benefits, about us, EEO statements) from a JD and
+    truncates it to `budget` tokens.
+    """
+    if not PROMPT_COMPACTION:
+        return job_description
+    compacted = _precompacted.get(job_description) if budget == JD_TOKEN_BUDGET else None
+    if compacted is None:
+        cleaned = clean_text(job_description, strip_contact=True)
+        sections = [body for name, body in split_sections(cleaned, JD_HEADINGS) if name not in _JD_NOISE_SECTIONS]
+        compacted = "\n\n".join(sections)
+        if metrics.estimate_tokens(compacted) > budget:
+            compacted = _truncate(compacted, budget)
+    metrics.inc(
+        "prompt_tokens_saved_total",
+        metrics.estimate_tokens(job_description) - metrics.estimate_tokens(compacted),
+        part="job_description",
+        endpoint=endpoint,
+    )
+    return compacted
@@ -0,0 +1,271 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+from fastapi import HTTPException
+
+from services import metrics
+from services.shared_state import SharedBuckets, shared_buckets
+
+# Provider quota; 0 leaves that dimension unlimited
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "0"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "0"))
+# A call may wait this long for quota before it is rejected instead
+LLM_MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "2"))
+# Calls waiting for a concurrency slot beyond this many are rejected
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# Calls slower than this count as congestion and shrink the concurrency limit
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "20"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "2"))
+# Per-client quota on LLM-backed routes
+CLIENT_LLM_RPM = float(os.getenv("CLIENT_LLM_RPM", "60"))
+CLIENT_LLM_BURST = float(os.getenv("CLIENT_LLM_BURST", "20"))
+MAX_TRACKED_CLIENTS = 10000
+
+
+class CapacityError(HTTPException):
+    """
+    Raised instead of queueing when there is no capacity for an LLM call. It is an
+    HTTPException, so it reaches the client as 429/503 with a Retry-After header.
+    """
+
+    def __init__(self, detail: str, retry_after: float, status_code: int = 503):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(self.retry_after)})
+
+
+class TokenBucket:
+    """
+    Refills `rate` tokens per second up to `capacity`. Reservations may take the
+    balance negative; later callers then wait for the debt to be refilled.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+class UpstreamQuota:
+    """
+    Requests-per-minute and tokens-per-minute buckets shared by every Gemini call in
+    the process, or by every worker process when `shared` buckets are given.
+    """
+
+    def __init__(
+        self,
+        rpm: float = GEMINI_RPM,
+        tpm: float = GEMINI_TPM,
+        max_wait: float = LLM_MAX_WAIT_SECONDS,
+        shared: Optional[SharedBuckets] = None,
+    ):
+        self._lock = threading.Lock()
+        self.max_wait = max_wait
+        self._shared = shared
+        self._requests = TokenBucket(rpm / 60, max(1.0, rpm / 60 * 10)) if rpm else None
+        self._tokens = TokenBucket(tpm / 60, tpm / 6) if tpm else None
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserves quota for one call and returns how long to wait before making it.
+        Raises CapacityError when the wait would exceed `max_wait`.
+        """
+        if self._requests is None and self._tokens is None:
+            return 0.0
+        if self._shared is not None:
+            return self._reserve_shared(tokens)
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens is not None:
+                # A prompt larger than the bucket could never fit; let it through on a full bucket
+                wait = max(wait, self._tokens.wait_time(min(tokens, self._tokens.capacity), now))
+            if wait > self.max_wait:
+                metrics.inc("llm_rejections_total", reason="quota")
+                raise CapacityError("Gemini quota is exhausted, try again later.", wait)
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(tokens)
+            return wait
+
+    def _reserve_shared(self, tokens: int) -> float:
+        requests = []
+        if self._requests is not None:
+            requests.append(("gemini:requests", self._requests.rate, self._requests.capacity, 1, 1))
+        if self._tokens is not None:
+            bucket = self._tokens
+            requests.append(("gemini:tokens", bucket.rate, bucket.capacity, min(tokens, bucket.capacity), tokens))
+        wait = self._shared.reserve(requests, self.max_wait)
+        if wait > self.max_wait:
+            metrics.inc("llm_rejections_total", reason="quota")
+            raise CapacityError("Gemini quota is exhausted, try again later.", wait)
+        return wait
+
+    def charge(self, tokens: int) -> None:
+        # Response tokens are only known afterwards
+        if self._tokens is not None and tokens:
+            if self._shared is not None:
+                self._shared.charge("gemini:tokens", self._tokens.rate, self._tokens.capacity, tokens)
+                return
+            with self._lock:
+                self._tokens.take(tokens)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit tuned by AIMD: each call that finishes within the latency target
+    raises the limit by 1/limit (about +1 per round of calls), and upstream throttling
+    or a slow call halves it, at most once per cooldown so one burst of errors does not
+    collapse it. Callers over the limit wait in a bounded FIFO queue.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = LLM_MIN_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        latency_target: float = LLM_LATENCY_TARGET,
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._avg_latency = 1.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> float:
+        # Time for the queue ahead to drain at the current limit
+        return (len(self._waiters) + 1) * self._avg_latency / max(1.0, self.limit)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            metrics.inc("llm_rejections_total", reason="queue_full")
+            raise CapacityError("Too many Gemini requests in flight, try again later.", self._retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("llm_rejections_total", reason="queue_timeout")
+            raise CapacityError("Timed out waiting for Gemini capacity, try again later.", self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        now = time.monotonic()
+        if latency is not None:
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency
+        congested = overloaded or (latency is not None and latency > self.latency_target)
+        if congested:
+            if now - self._last_decrease >= min(self._avg_latency, self.latency_target):
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self._last_decrease = now
+        elif latency is not None:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class ClientQuota:
+    """
+    Token bucket per client id; the least recently seen clients are forgotten past
+    MAX_TRACKED_CLIENTS. With `shared` buckets the quota holds across worker processes.
+    """
+
+    def __init__(self, rpm: float = CLIENT_LLM_RPM, burst: float = CLIENT_LLM_BURST, shared: Optional[SharedBuckets] = None):
+        self.rpm = rpm
+        self.burst = burst
+        self._shared = shared
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, client_id: str, cost: float = 1) -> None:
+        """
+        Charges `cost` to the client, or raises a 429 CapacityError when it is over quota.
+        A cost above the burst size could never be charged, so it is refused outright.
+        """
+        if not self.rpm:
+            return
+        if cost > self.burst:
+            metrics.inc("llm_rejections_total", reason="client_quota")
+            raise HTTPException(
+                status_code=429,
+                detail=f"This request needs {cost:g} LLM calls but the per-client limit is {self.burst:g}; send fewer at a time.",
+            )
+        if self._shared is not None:
+            wait = self._shared.reserve([(f"client:{client_id}", self.rpm / 60, self.burst, cost, cost)], max_wait=0)
+            if wait > 0:
+                metrics.inc("llm_rejections_total", reason="client_quota")
+                raise CapacityError("Rate limit exceeded for this client.", wait, status_code=429)
+            return
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = TokenBucket(self.rpm / 60, self.burst)
+                if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_id)
+            wait = bucket.wait_time(cost, time.monotonic())
+            if wait > 0:
+                metrics.inc("llm_rejections_total", reason="client_quota")
+                raise CapacityError("Rate limit exceeded for this client.", wait, status_code=429)
+            bucket.take(cost)
+
+
+def is_upstream_overload(error: BaseException) -> bool:
+    """
+    True for provider-side throttling (HTTP 429/503 from Gemini).
+    """
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable"})
+
+
+upstream_quota = UpstreamQuota(shared=shared_buckets)
+client_quota = ClientQuota(shared=shared_buckets)
+
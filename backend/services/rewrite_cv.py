@@ -1,19 +1,15 @@
-import os
-import google.generativeai as genai
+import logging
+from typing import AsyncIterator
 from fastapi import HTTPException
+from services.cache import make_key, result_cache
+from services import llm_client, llm_router, metrics
+from services.prompt_compaction import compact_cv, compact_job_description
 
-def rewrite_cv(cv_text: str, job_description: str) -> str:
-    """
-    Rewrites a CV based on a job description using the Gemini API.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
-
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        prompt = f"""
+def _build_prompt(cv_text: str, job_description: str) -> str:
+    # The rewrite has to cover the whole CV, so it is only cleaned, not cut down
+    cv_text = compact_cv(cv_text, job_description, keep_all=True, endpoint="rewrite")
+    job_description = compact_job_description(job_description, endpoint="rewrite")
+    return f"""
 You are an expert professional resume writer and ATS optimization specialist.
 Your goal is to rewrite the provided CV to target a 90%+ match score for the given Job Description.
 
@@ -35,8 +31,48 @@ Original CV:
 
 Rewritten CV:
 """
-        response = model.generate_content(prompt)
-        return response.text.strip()
+
+async def rewrite_cv(cv_text: str, job_description: str, use_cache: bool = True) -> str:
+    """
+    Rewrites a CV based on a job description using the Gemini API.
+    """
+    cache_key = make_key("rewrite", llm_router.model_for("rewrite"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not llm_client.is_configured():
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
+
+    try:
+        prompt = _build_prompt(cv_text, job_description)
+        rewritten = (await llm_router.generate(prompt, "rewrite")).strip()
+        result_cache.set(cache_key, rewritten)
+        return rewritten
+    except HTTPException:
+        # Capacity errors keep their 429/503 status and Retry-After header
+        raise
     except Exception as e:
-        print(f"Error during CV rewrite: {e}")
+        metrics.log_event("rewrite_failed", logging.ERROR, error=str(e))
         raise HTTPException(status_code=500, detail=f"An error occurred during the CV rewrite process: {e}")
+
+async def stream_rewrite_cv(cv_text: str, job_description: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Streams the rewritten CV chunk by chunk; the joined text goes into the result cache at the end.
+    """
+    cache_key = make_key("rewrite", llm_router.model_for("rewrite"), cv_text, job_description)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    if not llm_client.is_configured():
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment variables.")
+
+    chunks = []
+    async for chunk in llm_router.stream(_build_prompt(cv_text, job_description), "rewrite"):
+        chunks.append(chunk)
+        yield chunk
+    result_cache.set(cache_key, "".join(chunks).strip())
@@ -0,0 +1,334 @@
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services import metrics
+from utils.tokenizer import STOP_WORDS, tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Rewrite postings once this fraction of indexed documents has been deleted
+COMPACT_RATIO = 0.25
+INDEX_FORMAT_VERSION = 1
+
+_QUERY_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+class InvertedIndex:
+    """
+    Incremental inverted index over CV text. Each term maps to a sorted array of
+    integer document ids with a parallel array of term frequencies; documents get
+    increasing ids, so adding a CV only ever appends to postings.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, array] = {}
+        self._freqs: Dict[str, array] = {}
+        self._doc_keys: List[Optional[str]] = []
+        self._doc_ids: Dict[str, int] = {}
+        self._doc_lengths = array("I")
+        self._total_length = 0
+        self._deleted = 0
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._doc_ids
+
+    def keys(self) -> Set[str]:
+        with self._lock:
+            return set(self._doc_ids)
+
+    @staticmethod
+    def analyze(text: str) -> List[str]:
+        return [t for t in tokenize(text) if t not in STOP_WORDS]
+
+    def add(self, key: str, text: str) -> None:
+        terms = Counter(self.analyze(text))
+        with self._lock:
+            if key in self._doc_ids:
+                self._remove_locked(key)
+                if self._deleted > COMPACT_RATIO * len(self._doc_keys):
+                    self._compact()
+            doc = len(self._doc_keys)
+            self._doc_keys.append(key)
+            self._doc_ids[key] = doc
+            length = sum(terms.values())
+            self._doc_lengths.append(length)
+            self._total_length += length
+            for term, freq in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = array("I")
+                    self._freqs[term] = array("H")
+                self._postings[term].append(doc)
+                self._freqs[term].append(min(freq, 65535))
+            self.dirty = True
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._doc_ids:
+                return False
+            self._remove_locked(key)
+            if self._deleted > COMPACT_RATIO * len(self._doc_keys):
+                self._compact()
+            self.dirty = True
+            return True
+
+    def _remove_locked(self, key: str) -> None:
+        # Leave a tombstone; postings are filtered lazily and rewritten on compaction
+        doc = self._doc_ids.pop(key)
+        self._doc_keys[doc] = None
+        self._total_length -= self._doc_lengths[doc]
+        self._deleted += 1
+
+    def _compact(self) -> None:
+        remap = array("I", [0] * len(self._doc_keys))
+        keys: List[Optional[str]] = []
+        lengths = array("I")
+        for doc, key in enumerate(self._doc_keys):
+            if key is not None:
+                remap[doc] = len(keys)
+                self._doc_ids[key] = len(keys)
+                keys.append(key)
+                lengths.append(self._doc_lengths[doc])
+        for term in list(self._postings):
+            docs, freqs = array("I"), array("H")
+            for doc, freq in zip(self._postings[term], self._freqs[term]):
+                if self._doc_keys[doc] is not None:
+                    docs.append(remap[doc])
+                    freqs.append(freq)
+            if docs:
+                self._postings[term], self._freqs[term] = docs, freqs
+            else:
+                del self._postings[term]
+                del self._freqs[term]
+        self._doc_keys = keys
+        self._doc_lengths = lengths
+        self._deleted = 0
+
+    def _live(self, docs: Iterable[int]) -> List[int]:
+        return [d for d in docs if self._doc_keys[d] is not None]
+
+    def _term_docs(self, word: str) -> List[int]:
+        # A query word can tokenize to several terms ("ci/cd"); all of them must match
+        terms = self.analyze(word)
+        if not terms:
+            return []
+        result = None
+        for term in terms:
+            docs = self._postings.get(term, array("I"))
+            result = list(docs) if result is None else _intersect(result, docs)
+        return result
+
+    def search_boolean(self, query: str, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """
+        Evaluates a query with AND, OR, NOT and parentheses; adjacent words are ANDed.
+        Returns (keys in index order, total matches).
+        """
+        tokens = _QUERY_TOKEN.findall(query)
+        if not tokens:
+            return [], 0
+        with self._lock:
+            parser = _BooleanParser(tokens, self)
+            docs = parser.parse()
+            live = self._live(docs)
+            page = live if limit is None else live[:limit]
+            return [self._doc_keys[d] for d in page], len(live)
+
+    def search_bm25(self, query: str, limit: int = 20) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Ranks documents containing any query term by BM25. Returns ((key, score) pairs, total matches).
+        """
+        terms = set(self.analyze(query))
+        with self._lock:
+            live_docs = len(self._doc_ids)
+            if not live_docs or not terms:
+                return [], 0
+            avg_length = self._total_length / live_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                live = self._live(docs)
+                if not live:
+                    continue
+                idf = math.log(1 + (live_docs - len(live) + 0.5) / (len(live) + 0.5))
+                freqs = self._freqs[term]
+                for doc, freq in zip(docs, freqs):
+                    if self._doc_keys[doc] is None:
+                        continue
+                    norm = K1 * (1 - B + B * self._doc_lengths[doc] / avg_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * freq * (K1 + 1) / (freq + norm)
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [(self._doc_keys[doc], round(score, 4)) for doc, score in top], len(scores)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            state = {
+                "version": INDEX_FORMAT_VERSION,
+                "postings": {t: a.tobytes() for t, a in self._postings.items()},
+                "freqs": {t: a.tobytes() for t, a in self._freqs.items()},
+                "doc_keys": self._doc_keys,
+                "doc_lengths": self._doc_lengths.tobytes(),
+                "total_length": self._total_length,
+                "deleted": self._deleted,
+            }
+            self.dirty = False
+        # Per-process temp file: every worker saves its copy of the index on shutdown
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """
+        Replaces the contents of this index with the one saved at `path`.
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError("Unsupported search index format")
+        postings, freqs = {}, {}
+        for term, raw in state["postings"].items():
+            postings[term] = array("I")
+            postings[term].frombytes(raw)
+            freqs[term] = array("H")
+            freqs[term].frombytes(state["freqs"][term])
+        lengths = array("I")
+        lengths.frombytes(state["doc_lengths"])
+        with self._lock:
+            self._postings, self._freqs = postings, freqs
+            self._doc_keys = state["doc_keys"]
+            self._doc_ids = {key: doc for doc, key in enumerate(self._doc_keys) if key is not None}
+            self._doc_lengths = lengths
+            self._total_length = state["total_length"]
+            self._deleted = state["deleted"]
+            self.dirty = False
+
+
+def _intersect(left: List[int], right: array) -> List[int]:
+    # Probe the longer list with binary search from the shorter one
+    if len(left) > len(right):
+        left, right = list(right), left
+    result = []
+    lo = 0
+    for doc in left:
+        lo = bisect_left(right, doc, lo)
+        if lo == len(right):
+            break
+        if right[lo] == doc:
+            result.append(doc)
+    return result
+
+
+def _union(left: List[int], right: List[int]) -> List[int]:
+    return sorted(set(left).union(right))
+
+
+class _BooleanParser:
+    """
+    Recursive-descent parser: or_expr := and_expr (OR and_expr)*,
+    and_expr := not_expr ([AND] not_expr)*, not_expr := NOT not_expr | atom.
+    """
+
+    def __init__(self, tokens: List[str], index: InvertedIndex):
+        self.tokens = tokens
+        self.pos = 0
+        self.index = index
+
+    def parse(self) -> List[int]:
+        result = self._or()
+        if self.pos != len(self.tokens):
+            raise QuerySyntaxError(f"Unexpected '{self.tokens[self.pos]}' in query")
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _or(self) -> List[int]:
+        result = self._and()
+        while self._peek() == "OR":
+            self.pos += 1
+            result = _union(result, self._and())
+        return result
+
+    def _and(self) -> List[int]:
+        result = self._not()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self.pos += 1
+            result = _intersect(result, array("I", self._not()))
+        return result
+
+    def _not(self) -> List[int]:
+        if self._peek() == "NOT":
+            self.pos += 1
+            excluded = set(self._not())
+            return [d for d in range(len(self.index._doc_keys)) if d not in excluded]
+        return self._atom()
+
+    def _atom(self) -> List[int]:
+        token = self._peek()
+        if token is None:
+            raise QuerySyntaxError("Query ended unexpectedly")
+        self.pos += 1
+        if token == "(":
+            result = self._or()
+            if self._peek() != ")":
+                raise QuerySyntaxError("Missing closing parenthesis")
+            self.pos += 1
+            return result
+        if token in ("AND", "OR", ")"):
+            raise QuerySyntaxError(f"Unexpected '{token}' in query")
+        return self.index._term_docs(token)
+
+
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.bin")
+
+search_index = InvertedIndex()
+
+
+def load_search_index(cv_store) -> None:
+    """
+    Loads the persisted index (if any) and reconciles it with the CV store, indexing
+    CVs it has not seen and dropping ones that were deleted elsewhere.
+    """
+    if SEARCH_INDEX_PATH and os.path.exists(SEARCH_INDEX_PATH):
+        try:
+            search_index.load(SEARCH_INDEX_PATH)
+        except Exception as e:
+            metrics.log_event("search_index_load_failed", logging.WARNING, path=SEARCH_INDEX_PATH, error=str(e))
+    sync_search_index(cv_store)
+
+
+def sync_search_index(cv_store) -> None:
+    stored = set(cv_store.all_ids())
+    indexed = search_index.keys()
+    for key in indexed - stored:
+        search_index.remove(key)
+    missing = list(stored - indexed)
+    for start in range(0, len(missing), 500):
+        for cv in cv_store.get_many(missing[start:start + 500]):
+            search_index.add(cv.id, cv.extracted_text)
+
+
+def save_search_index() -> None:
+    if SEARCH_INDEX_PATH and search_index.dirty:
+        search_index.save(SEARCH_INDEX_PATH)
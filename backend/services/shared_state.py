@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# SQLite file through which worker processes share rate limits and job states;
+# empty keeps them in each process (enough for a single worker)
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "")
+# Rows untouched for this long are dropped; every bucket is full again by then
+BUCKET_IDLE_SECONDS = 3600
+PRUNE_EVERY = 1000
+
+# (key, refill rate per second, capacity, tokens needed now, tokens to take)
+BucketRequest = Tuple[str, float, float, float, float]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Opens a connection for a database shared by several processes: WAL journal,
+    relaxed fsync, and a long busy timeout instead of immediate lock errors.
+    Transactions are explicit (autocommit mode).
+    """
+    db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class SharedBuckets:
+    """
+    Token buckets stored in SQLite, so every worker process draws on the same
+    balances. Each reservation is one BEGIN IMMEDIATE transaction.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._calls = 0
+
+    def reserve(self, requests: Sequence[BucketRequest], max_wait: float) -> float:
+        """
+        Returns how long the caller must wait until every bucket holds the tokens it
+        needs. Unless that is over `max_wait`, the tokens are taken from all buckets
+        at once (balances may go negative); otherwise nothing is taken.
+        """
+        with self._lock:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                balances = []
+                wait = 0.0
+                for key, rate, capacity, needed, _ in requests:
+                    row = self._db.execute("SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                    balances.append(tokens)
+                    if tokens < needed:
+                        wait = max(wait, (needed - tokens) / rate)
+                if wait <= max_wait:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                        [(request[0], tokens - request[4], now) for request, tokens in zip(requests, balances)],
+                    )
+                self._calls += 1
+                if self._calls % PRUNE_EVERY == 0:
+                    self._db.execute("DELETE FROM token_buckets WHERE updated_at < ?", (now - BUCKET_IDLE_SECONDS,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def charge(self, key: str, rate: float, capacity: float, amount: float) -> None:
+        self.reserve([(key, rate, capacity, 0.0, amount)], max_wait=float("inf"))
+
+
+class SharedJobs:
+    """
+    Latest public state of each background job, written by the worker running it
+    so that /jobs/{id} answers from any worker.
+    """
+
+    def __init__(self, path: str, history: int):
+        self.history = history
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)")
+        self._writes = 0
+
+    def publish(self, job: Dict[str, Any]) -> None:
+        encoded = json.dumps(job, default=str)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, updated_at) VALUES (?, ?, ?)",
+                (job["id"], encoded, job["updated_at"]),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._db.execute(
+                    "DELETE FROM jobs WHERE updated_at < ("
+                    "SELECT updated_at FROM jobs ORDER BY updated_at DESC LIMIT 1 OFFSET ?)",
+                    (self.history,),
+                )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+shared_buckets = SharedBuckets(SHARED_STATE_DB) if SHARED_STATE_DB else None
@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import typing
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from services import llm_router, metrics
+
+# Send Gemini a response schema with JSON requests (constrained decoding); turn
+# off for models that reject `response_schema`
+STRUCTURED_OUTPUT_SCHEMA = os.getenv("STRUCTURED_OUTPUT_SCHEMA", "true").lower() not in ("0", "false", "no")
+# Keeps the repair prompt small when the broken reply is long
+MAX_REPAIR_ERRORS = 5
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_SCHEMA_TYPES = {str: "STRING", float: "NUMBER", int: "INTEGER", bool: "BOOLEAN"}
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+class PartialJSONParser:
+    """
+    Tolerant JSON parser that takes text as it arrives. It skips prose and
+    markdown fences around the first object or array, drops trailing commas, and
+    at any point can return what has been received so far as valid JSON: open
+    containers are closed, and a member or item that is still incomplete
+    (such as a string cut off mid-way) is left out.
+
+    Each chunk is scanned once; state carries over between chunks.
+    """
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._size = 0
+        # Open containers: [bracket, expecting a key] for objects, [bracket, False] for arrays
+        self._stack: List[List[Any]] = []
+        self._root = ""
+        self.complete = False
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._in_scalar = False
+        self._pending_comma = False
+        # Output lengths at which the text so far, with closers added, is valid JSON
+        self._safe = 0
+        self._safe_members = 0
+        self._cache: Dict[str, Any] = {}
+
+    def _emit(self, text: str) -> None:
+        self._out.append(text)
+        self._size += len(text)
+
+    def _value_done(self) -> None:
+        self._safe = self._size
+        if len(self._stack) == 1:
+            self._safe_members = self._size
+
+    def _end_scalar(self) -> None:
+        self._in_scalar = False
+        self._value_done()
+
+    def feed(self, chunk: str) -> None:
+        for char in chunk:
+            if self.complete:
+                return
+            if self._in_string:
+                self._emit(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if not self._string_is_key:
+                        self._value_done()
+                continue
+            if not self._root:
+                if char not in "{[":
+                    continue
+                self._root = char
+            if self._in_scalar:
+                if char in ",}]: \t\r\n":
+                    self._end_scalar()
+                else:
+                    self._emit(char)
+                    continue
+            if char in " \t\r\n":
+                continue
+            if char == ",":
+                self._pending_comma = True
+                continue
+            if char in "}]":
+                # A comma before a closing bracket is dropped
+                self._pending_comma = False
+                self._emit(char)
+                self._stack.pop()
+                if not self._stack:
+                    self.complete = True
+                    self._safe = self._safe_members = self._size
+                    return
+                self._value_done()
+                continue
+            if self._pending_comma:
+                self._pending_comma = False
+                self._emit(",")
+                if self._stack[-1][0] == "{":
+                    self._stack[-1][1] = True
+            self._emit(char)
+            if char in "{[":
+                self._stack.append([char, char == "{"])
+                self._safe = self._size
+                if len(self._stack) == 1:
+                    self._safe_members = self._size
+            elif char == '"':
+                self._in_string = True
+                self._string_is_key = self._stack[-1][0] == "{" and self._stack[-1][1]
+            elif char == ":":
+                self._stack[-1][1] = False
+            else:
+                self._in_scalar = True
+
+    def _closers(self) -> str:
+        return "".join("}" if bracket == "{" else "]" for bracket, _ in reversed(self._stack))
+
+    def _load(self, end: int, closers: str) -> Any:
+        key = f"{end}:{closers}"
+        if key not in self._cache:
+            text = "".join(self._out)[:end] + closers
+            try:
+                self._cache = {key: json.loads(text, strict=False)}
+            except json.JSONDecodeError as e:
+                raise StructuredOutputError(f"Unreadable JSON: {e}") from e
+        return self._cache[key]
+
+    def value(self) -> Any:
+        """
+        Everything received so far. Raises StructuredOutputError before the first
+        object or array starts.
+        """
+        if not self._root:
+            raise StructuredOutputError("No JSON object in the response.")
+        return self._load(self._safe, "" if self.complete else self._closers())
+
+    def members(self) -> Dict[str, Any]:
+        """
+        Members of a top-level object that have been received in full.
+        """
+        if self._root != "{":
+            return {}
+        return self._load(self._safe_members, "" if self.complete else "}")
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parses a complete or truncated model reply; see PartialJSONParser.
+    """
+    parser = PartialJSONParser()
+    parser.feed(text)
+    return parser.value()
+
+
+def _field_schema(annotation: Any) -> Dict[str, Any]:
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        (item,) = typing.get_args(annotation)
+        return {"type": "ARRAY", "items": _field_schema(item)}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return response_schema(annotation)
+    if annotation in _SCHEMA_TYPES:
+        return {"type": _SCHEMA_TYPES[annotation]}
+    raise TypeError(f"No response schema for {annotation!r}")
+
+
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Gemini response schema for the required fields of a pydantic model. Optional
+    fields are filled in by the server (errors, re-scoring details), not the model.
+    """
+    properties = {
+        name: _field_schema(field.annotation)
+        for name, field in model.model_fields.items()
+        if field.is_required()
+    }
+    return {"type": "OBJECT", "properties": properties, "required": list(properties)}
+
+
+def json_config(schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    config: Dict[str, Any] = {"response_mime_type": "application/json"}
+    if schema is not None and STRUCTURED_OUTPUT_SCHEMA:
+        config["response_schema"] = schema
+    return config
+
+
+def validate(content: str, model: Type[Model]) -> Model:
+    """
+    Parses a reply and validates it into `model`. Raises StructuredOutputError.
+    """
+    try:
+        return model.model_validate(parse_json(content))
+    except ValidationError as e:
+        problems = [f"{'.'.join(str(part) for part in error['loc']) or 'reply'}: {error['msg']}" for error in e.errors()]
+        raise StructuredOutputError("; ".join(problems[:MAX_REPAIR_ERRORS])) from e
+
+
+def _repair_prompt(content: str, schema: Dict[str, Any], error: StructuredOutputError) -> str:
+    return (
+        "Your previous reply could not be used: " + str(error) + "\n"
+        "Rewrite it as a single JSON object that matches this schema, keeping its content. "
+        "Complete anything that was cut off. Return ONLY the JSON.\n\n"
+        "Schema:\n" + json.dumps(schema) + "\n\n"
+        "Previous reply:\n" + content
+    )
+
+
+async def generate_structured(prompt: str, model: Type[Model], endpoint: str) -> Model:
+    """
+    Generates a reply constrained to the model's schema and validates it. A reply
+    that still does not parse or validate gets one repair request, which sends
+    back the reply and the errors rather than the whole prompt.
+    """
+    schema = response_schema(model)
+    content = await llm_router.generate(prompt, endpoint, generation_config=json_config(schema))
+    try:
+        with metrics.span("response_parsing"):
+            result = validate(content, model)
+        metrics.inc("structured_output_total", endpoint=endpoint, outcome="ok")
+        return result
+    except StructuredOutputError as e:
+        metrics.log_event("structured_output_repair", logging.WARNING, endpoint=endpoint, error=str(e))
+        error = e
+
+    content = await llm_router.generate(_repair_prompt(content, schema, error), endpoint, generation_config=json_config(schema))
+    try:
+        with metrics.span("response_parsing"):
+            result = validate(content, model)
+    except StructuredOutputError:
+        metrics.inc("structured_output_total", endpoint=endpoint, outcome="failed")
+        raise
+    metrics.inc("structured_output_total", endpoint=endpoint, outcome="repaired")
+    return result
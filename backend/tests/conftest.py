@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Tests import modules the way the app does ("from services.x import y"), and
+# keep every store and index in memory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.update(
+    CV_STORE_BACKEND="memory",
+    SEARCH_INDEX_PATH="",
+    TFIDF_MODEL_PATH="",
+    LLM_CACHE_DB="",
+    SKILL_EMBEDDINGS_PATH="",
+)
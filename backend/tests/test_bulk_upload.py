@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import docx
+import pytest
+
+from services import bulk_upload
+from services.cv_store import InMemoryCVStore
+from services.job_queue import JobQueue
+from utils.upload_stream import ReceivedFile
+
+
+def docx_bytes(text: str) -> bytes:
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def stage(staged: bulk_upload.StagedUpload, filename: str, data: bytes) -> None:
+    path = os.path.join(staged.directory, f"{len(staged.files)}{os.path.splitext(filename)[1]}")
+    with open(path, "wb") as f:
+        f.write(data)
+    upload = ReceivedFile("files", filename, path)
+    upload.size = len(data)
+    upload.content_hash = hashlib.sha256(data).hexdigest()
+    staged.add(upload)
+
+
+def ingest(staged: bulk_upload.StagedUpload, store):
+    payload = staged.payload(5000)
+    try:
+        return asyncio.run(bulk_upload.ingest(payload, store, JobQueue(workers=1)))
+    finally:
+        bulk_upload.discard_payload(payload)
+
+
+def outcomes(result):
+    return {f["filename"]: f["status"] for f in result["files"]}
+
+
+@pytest.fixture
+def staged():
+    staged = bulk_upload.StagedUpload()
+    yield staged
+    staged.discard()
+
+
+def test_outcomes_of_a_mixed_upload(staged):
+    python_cv = docx_bytes("Python developer with Django experience")
+    stage(staged, "python.docx", python_cv)
+    stage(staged, "copy.docx", python_cv)
+    stage(staged, "go.docx", docx_bytes("Go developer with Kubernetes experience"))
+    stage(staged, "notes.txt", b"plain text")
+    stage(staged, "broken.pdf", b"not a pdf")
+    store = InMemoryCVStore()
+
+    result = ingest(staged, store)
+
+    assert outcomes(result) == {
+        "python.docx": "stored",
+        "copy.docx": "duplicate",
+        "go.docx": "stored",
+        "notes.txt": "failed",
+        "broken.pdf": "failed",
+    }
+    assert {k: result[k] for k in ("total", "processed", "stored", "duplicates", "failed")} == {
+        "total": 5, "processed": 5, "stored": 2, "duplicates": 1, "failed": 2,
+    }
+    assert store.count() == 2
+    files = {f["filename"]: f for f in result["files"]}
+    assert files["copy.docx"]["duplicate_of"] == files["python.docx"]["cv_id"]
+    assert store.get(files["python.docx"]["cv_id"]).content_hash == hashlib.sha256(python_cv).hexdigest()
+
+
+def test_same_text_in_different_files_is_stored_once(staged):
+    stage(staged, "a.docx", docx_bytes("Data analyst, SQL and Tableau"))
+    # Different bytes, same text once whitespace and case are normalized
+    stage(staged, "b.docx", docx_bytes("data  analyst, SQL and   TABLEAU"))
+    store = InMemoryCVStore()
+
+    result = ingest(staged, store)
+
+    assert sorted(outcomes(result).values()) == ["duplicate", "stored"]
+    assert store.count() == 1
+
+
+def test_files_already_in_the_store_are_duplicates(staged):
+    data = docx_bytes("Frontend engineer, React and TypeScript")
+    store = InMemoryCVStore()
+    first = bulk_upload.StagedUpload()
+    stage(first, "first.docx", data)
+    stored_id = ingest(first, store)["files"][0]["cv_id"]
+
+    stage(staged, "again.docx", data)
+    result = ingest(staged, store)
+
+    assert result["files"] == [{"filename": "again.docx", "status": "duplicate", "cv_id": stored_id, "duplicate_of": stored_id}]
+    assert store.count() == 1
+
+
+def test_failed_batch_write_fails_its_files(staged):
+    class FullStore(InMemoryCVStore):
+        def put_many(self, cvs):
+            raise OSError("disk full")
+
+    sre_cv = docx_bytes("Site reliability engineer, Terraform and AWS")
+    stage(staged, "one.docx", sre_cv)
+    # A byte-identical copy is settled with the file it copies
+    stage(staged, "two.docx", sre_cv)
+    stage(staged, "three.docx", docx_bytes("Backend engineer, Java and Spring"))
+
+    result = ingest(staged, FullStore())
+
+    assert set(outcomes(result).values()) == {"failed"}
+    assert result["stored"] == 0
+    assert all("disk full" in f["error"] for f in result["files"])
+
+
+def test_bulk_jobs_holding_every_worker_do_not_pause_forever(monkeypatch):
+    monkeypatch.setattr(bulk_upload, "BULK_PAUSE_QUEUE_DEPTH", 0)
+    monkeypatch.setattr(bulk_upload, "BACKPRESSURE_POLL_SECONDS", 0.01)
+    queue = JobQueue(workers=2)
+
+    async def bulk(payload):
+        for _ in range(20):
+            await bulk_upload._wait_for_capacity(queue)
+            await asyncio.sleep(0.01)
+        return {}
+
+    async def quick(payload):
+        return {}
+
+    queue.register("bulk", bulk)
+    queue.register("quick", quick)
+
+    async def scenario():
+        await queue.start()
+        try:
+            for _ in range(2):
+                queue.submit("bulk", {}, priority=-1)
+            await asyncio.sleep(0.05)
+            quick_jobs = [queue.submit("quick", {})["id"] for _ in range(9)]
+            for job_id in quick_jobs:
+                await queue.wait(job_id, 3)
+            return [queue.get(job_id)["status"] for job_id in quick_jobs]
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(scenario()) == ["succeeded"] * 9
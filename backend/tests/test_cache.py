@@ -0,0 +1,47 @@
+from services import cache
+from services.cache import ResultCache, make_key
+
+
+def test_make_key_is_stable_and_separates_inputs():
+    assert make_key("rewrite", "model", "cv", "jd") == make_key("rewrite", "model", "cv", "jd")
+    assert make_key("rewrite", "model", "ab", "c") != make_key("rewrite", "model", "a", "bc")
+    assert make_key("rewrite", "model-a", "cv", "jd") != make_key("rewrite", "model-b", "cv", "jd")
+    assert make_key("rewrite", "model", "cv", "jd") != make_key("cover_letter", "model", "cv", "jd")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    results = ResultCache(ttl_seconds=60)
+    results.set("key", {"ats_score": 80})
+    now[0] += 59
+    assert results.get("key") == {"ats_score": 80}
+    now[0] += 2
+    assert results.get("key") is None
+    assert results.stats()["entries"] == 0
+
+
+def test_expired_entries_are_dropped_from_disk(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    db_path = str(tmp_path / "cache.db")
+    ResultCache(ttl_seconds=60, db_path=db_path).set("key", "value")
+
+    # A fresh process finds the entry on disk until it expires
+    assert ResultCache(ttl_seconds=60, db_path=db_path).get("key") == "value"
+    now[0] += 61
+    assert ResultCache(ttl_seconds=60, db_path=db_path).get("key") is None
+    now[0] -= 61
+    assert ResultCache(ttl_seconds=60, db_path=db_path).get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    results = ResultCache(max_entries=2)
+    results.set("a", 1)
+    results.set("b", 2)
+    results.get("a")
+    results.set("c", 3)
+    assert results.get("b") is None
+    assert results.get("a") == 1
+    assert results.get("c") == 3
+    assert results.stats()["evictions"] == 1
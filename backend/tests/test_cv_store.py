@@ -0,0 +1,31 @@
+from models.response_models import CV
+from services.cv_store import InMemoryCVStore, keyword_table
+
+
+def cv(cv_id, keywords):
+    return CV(id=cv_id, filename=f"{cv_id}.pdf", extracted_text="text", matched_keywords=keywords, missing_keywords=[])
+
+
+def test_keywords_are_released_with_their_records():
+    store = InMemoryCVStore()
+    before = len(keyword_table)
+    store.put(cv("a", ["kw-only-a", "kw-shared"]))
+    store.put(cv("b", ["kw-shared"]))
+    assert len(keyword_table) == before + 2
+
+    store.update("a", matched_keywords=["kw-shared"])
+    assert len(keyword_table) == before + 1
+    store.delete("b")
+    assert store.get("a").matched_keywords == ["kw-shared"]
+    store.delete("a")
+    assert len(keyword_table) == before
+
+
+def test_freed_ids_are_reused_without_corrupting_live_records():
+    store = InMemoryCVStore()
+    store.put(cv("a", ["kw-old"]))
+    store.delete("a")
+    store.put(cv("b", ["kw-new"]))
+    store.put(cv("c", ["kw-other", "kw-new"]))
+    assert store.get("b").matched_keywords == ["kw-new"]
+    assert store.get("c").matched_keywords == ["kw-other", "kw-new"]
@@ -0,0 +1,50 @@
+from services.dedup import NearDuplicateIndex, format_simhash, simhash, text_hash
+
+CV_TEXT = (
+    "Senior Python developer with eight years of experience building data platforms. "
+    "Led a team of five engineers migrating batch jobs to Spark on Kubernetes. "
+    "Designed PostgreSQL schemas, REST APIs in FastAPI and CI pipelines in GitHub Actions. "
+    "Mentored junior developers and ran the weekly architecture review."
+)
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def test_text_hash_ignores_case_and_whitespace():
+    assert text_hash("Python  Developer\n") == text_hash("python developer")
+    assert text_hash("python developer") != text_hash("go developer")
+
+
+def test_small_edits_keep_the_simhash_close():
+    edited = CV_TEXT.replace("eight years", "nine years")
+    unrelated = "Registered nurse with ICU experience, patient care plans and ward rota management."
+    assert distance(simhash(CV_TEXT), simhash(edited)) <= 3
+    assert distance(simhash(CV_TEXT), simhash(unrelated)) > 3
+
+
+def test_format_simhash_keeps_all_64_bits():
+    value = simhash(CV_TEXT)
+    assert len(format_simhash(value)) == 16
+    assert int(format_simhash(value), 16) == value
+
+
+def test_index_finds_hashes_within_max_distance():
+    index = NearDuplicateIndex(max_distance=3)
+    base = simhash(CV_TEXT)
+    index.add("near", base ^ 0b101)
+    index.add("far", base ^ 0xFFFF)
+    assert index.query(base) == [("near", 2)]
+
+    index.remove("near")
+    assert index.query(base) == []
+    assert index.keys() == {"far"}
+
+
+def test_re_adding_a_key_replaces_its_hash():
+    index = NearDuplicateIndex(max_distance=3)
+    base = simhash(CV_TEXT)
+    index.add("cv", base)
+    index.add("cv", base ^ (1 << 63) ^ 0xFFFF)
+    assert index.query(base) == []
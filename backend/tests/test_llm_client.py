@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from services import llm_client
+
+
+@pytest.fixture
+def backend():
+    state = {"in_flight": 0, "peak": 0, "calls": 0}
+
+    async def fake(prompt, model_name, generation_config):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+        return f"{model_name}: {prompt}"
+
+    llm_client.set_backend(fake)
+    llm_client.configure(max_concurrency=2)
+    yield state
+    llm_client.set_backend(None)
+    llm_client.configure()
+
+
+def test_calls_stay_under_the_concurrency_limit(backend):
+    async def run():
+        return await asyncio.gather(*(llm_client.generate(f"prompt {i}", "model") for i in range(6)))
+
+    replies = asyncio.run(run())
+    assert replies == [f"model: prompt {i}" for i in range(6)]
+    assert backend["calls"] == 6
+    assert backend["peak"] == 2
+    assert llm_client.get_concurrency().in_flight == 0
+
+
+def test_calls_use_the_default_model(backend):
+    assert asyncio.run(llm_client.generate("prompt")) == f"{llm_client.DEFAULT_MODEL}: prompt"
+
+
+def test_unconfigured_client_refuses_calls(monkeypatch):
+    llm_client.set_backend(None)
+    monkeypatch.setattr(llm_client, "_configured", False)
+    with pytest.raises(llm_client.LLMNotConfiguredError):
+        asyncio.run(llm_client.generate("prompt"))
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.resilience import start_stub
+from benchmarks.stub_gemini import Faults
+from services import llm_client, llm_router
+from services.llm_router import CircuitBreaker, LatencyTracker, UpstreamUnavailable
+
+
+class FirstCallSlow(Faults):
+    """
+    The first request takes `slow_latency`; every later one `latency`.
+    """
+
+    def __init__(self, **settings):
+        super().__init__(jitter=0.0, **settings)
+        self.calls = 0
+
+    def delay(self) -> float:
+        self.calls += 1
+        return self.slow_latency if self.calls == 1 else self.latency
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    servers = []
+
+    def start(faults: Faults) -> Faults:
+        url, server = start_stub(faults)
+        servers.append(server)
+        llm_client.set_backend(llm_client.rest_backend(url))
+        return faults
+
+    monkeypatch.setenv("LLM_DEADLINE_REWRITE", "5")
+    llm_router.reset()
+    yield start
+    llm_client.set_backend(None)
+    llm_router.reset()
+    for server in servers:
+        server.should_exit = True
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    assert not breaker.record(ok=False)
+    assert breaker.record(ok=False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(ok=True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failures=1, cooldown=0.05)
+    breaker.record(ok=False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(ok=False)
+    assert breaker.state == "open"
+
+
+def test_outage_opens_both_breakers(stub):
+    faults = stub(Faults(latency=0.0, jitter=0.0, error_rate=1.0))
+    models = llm_router.models_for("rewrite")
+
+    # One event loop for the whole scenario: the stub's HTTP client stays bound to it
+    async def scenario():
+        for _ in range(llm_router.BREAKER_FAILURES):
+            with pytest.raises(Exception) as raised:
+                await llm_router.generate("prompt", "rewrite")
+            assert not isinstance(raised.value, UpstreamUnavailable)
+
+        # Each call failed over to the other model, so both circuits are open now
+        assert all(llm_router.breaker(name).state == "open" for name in models)
+        with pytest.raises(UpstreamUnavailable):
+            await llm_router.generate("prompt", "rewrite")
+
+        faults.update({"error_rate": 0})
+        for name in models:
+            llm_router.breaker(name).opened_at -= llm_router.breaker(name).cooldown
+        assert (await llm_router.generate("prompt", "rewrite")).startswith("stub completion")
+
+    asyncio.run(scenario())
+    assert llm_router.breaker(models[0]).state == "closed"
+    assert faults.settings()["error_rate"] == 0
+
+
+def test_failed_model_fails_over_within_the_call(stub):
+    faults = stub(Faults(latency=0.0, jitter=0.0))
+    preferred, fallback = llm_router.models_for("rewrite")
+    calls = []
+    backend = llm_client._backend
+
+    async def failing_preferred(prompt, model_name, generation_config):
+        calls.append(model_name)
+        if model_name == preferred:
+            faults.update({"error_rate": 1})
+        try:
+            return await backend(prompt, model_name, generation_config)
+        finally:
+            faults.update({"error_rate": 0})
+
+    llm_client.set_backend(failing_preferred)
+    assert asyncio.run(llm_router.generate("prompt", "rewrite")).startswith("stub completion")
+    assert calls == [preferred, fallback]
+    assert llm_router.breaker(preferred).consecutive == 1
+
+
+def test_slow_call_is_hedged(stub):
+    faults = stub(FirstCallSlow(latency=0.05, slow_latency=3.0))
+    # Enough recent latencies for the endpoint to be hedged after about 0.1 s
+    tracker = LatencyTracker()
+    for _ in range(llm_router.HEDGE_MIN_SAMPLES):
+        tracker.observe(0.1)
+    llm_router._latencies[("rewrite", llm_router.model_for("rewrite"))] = tracker
+
+    started = time.monotonic()
+    reply = asyncio.run(llm_router.generate("prompt", "rewrite"))
+    assert reply.startswith("stub completion")
+    assert time.monotonic() - started < 1.5
+    assert faults.calls == 2
+
+
+def test_calls_are_not_hedged_without_latency_history(stub):
+    faults = stub(FirstCallSlow(latency=0.05, slow_latency=0.3))
+    asyncio.run(llm_router.generate("prompt", "rewrite"))
+    assert faults.calls == 1
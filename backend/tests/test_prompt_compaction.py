@@ -0,0 +1,22 @@
+from services.prompt_compaction import clean_text, compact_cv
+from utils.text_extractor import PAGE_BREAK
+
+PAGE = "ACME Ltd - Jane Doe\nRole {0}\nKey achievements:\n- Shipped release {0}\nTechnologies:\nPython, SQL\nConfidential\nPage {0} of 3\n"
+
+
+def test_headers_and_footers_are_dropped_at_page_breaks():
+    cleaned = clean_text(PAGE_BREAK.join(PAGE.format(i) for i in range(1, 4)))
+    assert cleaned.count("ACME Ltd - Jane Doe") == 1
+    assert cleaned.count("Confidential") == 1
+    assert "Page" not in cleaned
+    assert cleaned.count("Key achievements:") == 3
+
+
+def test_repeated_lines_without_page_breaks_are_kept():
+    cleaned = clean_text("\n".join(PAGE.format(i) for i in range(1, 4)))
+    assert cleaned.count("ACME Ltd - Jane Doe") == 3
+
+
+def test_keep_all_keeps_repeated_lines():
+    text = PAGE_BREAK.join(PAGE.format(i) for i in range(1, 4))
+    assert compact_cv(text, "Python developer", keep_all=True).count("Confidential") == 3
@@ -0,0 +1,69 @@
+import pytest
+
+from services.search_index import InvertedIndex, QuerySyntaxError
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    index.add("py", "Python developer with Django and PostgreSQL")
+    index.add("go", "Go developer with Kubernetes and PostgreSQL")
+    index.add("js", "JavaScript developer with React")
+    return index
+
+
+def keys(index, query):
+    found, total = index.search_boolean(query)
+    assert total == len(found)
+    return set(found)
+
+
+def test_boolean_operators(index):
+    assert keys(index, "postgresql") == {"py", "go"}
+    assert keys(index, "python AND postgresql") == {"py"}
+    assert keys(index, "python postgresql") == {"py"}
+    assert keys(index, "python OR react") == {"py", "js"}
+    assert keys(index, "developer NOT postgresql") == {"js"}
+    assert keys(index, "(python OR go) AND kubernetes") == {"go"}
+    assert keys(index, "NOT (python OR go)") == {"js"}
+
+
+@pytest.mark.parametrize("query", ["python AND", "(python OR go", "OR python", "python )"])
+def test_malformed_queries_are_rejected(index, query):
+    with pytest.raises(QuerySyntaxError):
+        index.search_boolean(query)
+
+
+def test_removed_documents_do_not_match(index):
+    assert index.remove("py")
+    assert keys(index, "postgresql") == {"go"}
+    assert keys(index, "NOT go") == {"js"}
+    assert index.search_bm25("python") == ([], 0)
+
+
+def test_bm25_prefers_rarer_terms_and_higher_frequency():
+    index = InvertedIndex()
+    index.add("both", "python kubernetes")
+    index.add("common", "python python python")
+    index.add("other", "python java")
+    ranked, total = index.search_bm25("kubernetes python")
+    assert total == 3
+    # "kubernetes" is in one document, so it outweighs repeats of "python"
+    assert ranked[0][0] == "both"
+    assert ranked[1][0] == "common"
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+
+def test_bm25_limit_and_stop_words(index):
+    ranked, total = index.search_bm25("the developer", limit=2)
+    assert len(ranked) == 2
+    assert total == 3
+    assert index.search_bm25("the and of") == ([], 0)
+
+
+def test_readding_documents_compacts_tombstones():
+    index = InvertedIndex()
+    for _ in range(10):
+        index.add("cv", "python developer")
+    assert len(index._doc_keys) < 5
+    assert keys(index, "python AND developer") == {"cv"}
@@ -0,0 +1,43 @@
+import pytest
+
+from services.structured_output import PartialJSONParser, StructuredOutputError, parse_json
+
+
+def test_members_appear_once_complete():
+    parser = PartialJSONParser()
+    parser.feed('{"rewritten_cv": "Senior engin')
+    assert parser.members() == {}
+    parser.feed('eer", "cover_letter": "Dear')
+    assert parser.members() == {"rewritten_cv": "Senior engineer"}
+    parser.feed(' team"}')
+    assert parser.complete
+    assert parser.members() == {"rewritten_cv": "Senior engineer", "cover_letter": "Dear team"}
+
+
+def test_value_closes_open_containers_and_drops_partial_items():
+    parser = PartialJSONParser()
+    parser.feed('{"tips": ["one", "tw')
+    assert parser.value() == {"tips": ["one"]}
+    parser.feed('o"], "score": 7')
+    # A number may still have digits to come
+    assert parser.value() == {"tips": ["one", "two"]}
+    parser.feed("5}")
+    assert parser.value() == {"tips": ["one", "two"], "score": 75}
+
+
+def test_state_carries_across_chunk_boundaries():
+    text = '{"a": "x\\"y", "b": [1, 2, {"c": null}], "d": true}'
+    parser = PartialJSONParser()
+    for char in text:
+        parser.feed(char)
+    assert parser.value() == {"a": 'x"y', "b": [1, 2, {"c": None}], "d": True}
+
+
+def test_prose_fences_and_trailing_commas_are_tolerated():
+    reply = 'Here you go:\n```json\n{"skills": ["python", "go",],}\n```\nAnything else?'
+    assert parse_json(reply) == {"skills": ["python", "go"]}
+
+
+def test_text_without_json_is_an_error():
+    with pytest.raises(StructuredOutputError):
+        parse_json("Sorry, I cannot help with that.")
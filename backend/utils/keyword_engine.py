@@ -0,0 +1,376 @@
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from utils.skill_index import SkillIndex
+from utils.skill_ontology import SKILL_ONTOLOGY
+
+# Keyword lists in results are capped for display; scores use every keyword
+MAX_KEYWORDS = 25
+# Recognised skills count this much more than other job description terms
+SKILL_WEIGHT = 2.0
+TERM_WEIGHT = 1.0
+# Terms outside the skill lexicon share this many hashed ids
+HASHED_TERM_IDS = 1 << 20
+# Shorter words are only matched to skills by exact spelling; "scale" is too close to "scala"
+FUZZY_MIN_LENGTH = 6
+
+# Spellings the plain [a-z0-9]+ tokenizer would split or drop, rewritten to one token
+_ALIASES = {
+    r"c\+\+": "cplusplus",
+    r"c#": "csharp",
+    r"f#": "fsharp",
+    r"\.net\b": " dotnet",
+    r"\bnode\.?js\b": "nodejs",
+    r"\breact\.?js\b": "react",
+    r"\bvue\.?js\b": "vue",
+    r"\bnext\.?js\b": "nextjs",
+    r"\bci\s*/\s*cd\b": "cicd",
+    r"\bk8s\b": "kubernetes",
+    r"\bjs\b": "javascript",
+    r"\bts\b": "typescript",
+    r"\bpostgres\b": "postgresql",
+    r"\bscikit-learn\b": "sklearn",
+    r"\bmachine-learning\b": "machine learning",
+    r"\bml\b": "machine learning",
+    r"\bnlp\b": "natural language processing",
+    r"\bgcp\b": "google cloud",
+}
+# The lookahead skips positions no alias can start at before trying every alternative
+_ALIAS_PATTERN = re.compile(r"(?=[cfn.rvktjpsmg])(?:" + "|".join(f"(?:{pattern})" for pattern in _ALIASES) + ")")
+_ALIAS_REGEXES = [(re.compile(pattern), replacement) for pattern, replacement in _ALIASES.items()]
+_TOKEN = re.compile(r"[a-z0-9]+")
+# How interned single-token aliases are shown in keyword lists
+_DISPLAY = {"cplusplus": "c++", "csharp": "c#", "fsharp": "f#", "dotnet": ".net", "nodejs": "node.js", "cicd": "ci/cd"}
+
+SKILL_TERMS = frozenset("""
+python java javascript typescript golang rust ruby php scala kotlin swift cplusplus csharp fsharp dotnet sql nosql
+html css sass react angular vue nextjs nodejs django flask fastapi spring graphql grpc
+docker kubernetes terraform ansible helm jenkins gitlab github git linux bash cicd devops sre
+aws azure gcp lambda s3 ec2 postgresql mysql mongodb redis cassandra elasticsearch kafka rabbitmq spark hadoop
+airflow dbt snowflake bigquery redshift databricks tableau excel pandas numpy sklearn pytorch tensorflow keras
+llm nlp opencv microservices serverless agile scrum jira figma selenium cypress pytest junit jest
+android ios flutter xamarin unity matlab sas spss etl oauth saml security networking
+""".split())
+
+SKILL_PHRASES = frozenset([
+    "machine learning", "deep learning", "data science", "data engineering", "data analysis", "data analytics",
+    "data modeling", "data warehouse", "data pipelines", "big data", "computer vision", "natural language processing",
+    "google cloud", "rest api", "restful api", "unit testing", "integration testing", "test automation",
+    "continuous integration", "continuous delivery", "continuous deployment", "infrastructure as code",
+    "system design", "distributed systems", "event driven", "object oriented", "functional programming",
+    "project management", "product management", "stakeholder management", "spring boot", "react native",
+    "sql server", "power bi", "time series", "reinforcement learning", "generative ai", "large language models",
+    "version control", "cloud computing", "site reliability", "user experience", "user interface",
+    "ruby on rails", "penetration testing", "incident response", "business intelligence", "a b testing",
+])
+
+_STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each etc few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not now
+of off on once only or other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what
+when where which while who whom why will with within would you your yours yourself yourselves
+""".split())
+
+# Job-posting filler that says nothing about the skills being asked for
+GENERIC_TERMS = frozenset("""
+years year experience experiences should must ability able good excellent great required requirement requirements
+preferred strong skill skills knowledge languages test tests unit units code coding development developing design
+defined product project projects quality qt manage managing maintain maintenance problem solving communication
+communications application applications bring bringing independently expertise team teams work working role
+responsibilities responsible candidate candidates company join looking including include includes new plus
+understanding opportunity environment across using use based well highly like make help within etc job
+senior junior mid level lead
+""".split())
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """
+    Light suffix-stripping stemmer: folds plurals and -ing/-ed forms so
+    "deploying", "deployed" and "deploys" all match "deploy".
+    """
+    if len(token) <= 4 or not token.isalpha() or token in SKILL_TERMS:
+        return token
+    for suffix, replacement in (("ies", "y"), ("ied", "y"), ("ing", ""), ("ed", ""), ("es", "e"), ("s", "")):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "s" and token.endswith(("ss", "us", "is")):
+                break
+            token = token[: -len(suffix)] + replacement
+            break
+    # "manage" and "managed" both end up as "manag"
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _ALIAS_PATTERN.sub(_replace_alias, text)
+
+
+def _replace_alias(match: "re.Match") -> str:
+    found = match.group(0)
+    for regex, replacement in _ALIAS_REGEXES:
+        if regex.fullmatch(found):
+            return replacement
+    return found
+
+
+class Vocabulary:
+    """
+    Maps terms to integer ids. The skill lexicon gets the ids below `skill_count`,
+    so `id < skill_count` identifies a skill without a lookup. Every other term is
+    hashed into a fixed range of HASHED_TERM_IDS ids above them, so the id space,
+    and the width of score_matrix, stay the same however much text the process
+    sees. Two such terms rarely share an id; when they do they count as one
+    keyword, which never involves a skill.
+    """
+
+    def __init__(self, skills: Sequence[str]):
+        self._ids: Dict[str, int] = {}
+        for term in skills:
+            self._ids.setdefault(term, len(self._ids))
+        self.skill_count = len(self._ids)
+
+    def __len__(self) -> int:
+        return self.skill_count + HASHED_TERM_IDS
+
+    def id(self, term: str) -> int:
+        term_id = self._ids.get(term)
+        if term_id is None:
+            # crc32 rather than hash(): ids must agree across worker processes
+            term_id = self.skill_count + zlib.crc32(term.encode("utf-8")) % HASHED_TERM_IDS
+        return term_id
+
+    def weights(self, term_ids: np.ndarray) -> np.ndarray:
+        return np.where(term_ids < self.skill_count, SKILL_WEIGHT, TERM_WEIGHT).astype(np.float32)
+
+    def ids(self, terms: Sequence[str]) -> np.ndarray:
+        return np.unique(np.fromiter((self.id(t) for t in terms), dtype=np.int32, count=len(terms)))
+
+
+def _spelling(text: str) -> str:
+    # How a phrase reads after normalization: lower-case tokens separated by single spaces
+    return " ".join(_TOKEN.findall(_normalize(text)))
+
+
+_ONTOLOGY_SPELLINGS = {_spelling(synonym): skill for skill, synonyms in SKILL_ONTOLOGY.items() for synonym in synonyms}
+# Ontology synonyms: single words are looked up by spelling, longer ones join the
+# phrases. Both resolve to the canonical skill's term.
+_SYNONYMS = {synonym: skill for synonym, skill in _ONTOLOGY_SPELLINGS.items() if " " not in synonym}
+# Phrases are matched on stemmed token tuples
+_PHRASES: Dict[Tuple[str, ...], str] = {
+    tuple(stem(t) for t in phrase.split()): skill
+    for phrase, skill in [*((phrase, phrase) for phrase in SKILL_PHRASES), *_ONTOLOGY_SPELLINGS.items()]
+    if " " in phrase
+}
+_MAX_PHRASE = max(len(key) for key in _PHRASES)
+_PHRASE_STARTS = frozenset(key[0] for key in _PHRASES)
+_EXCLUDED_STEMS = frozenset(stem(t) for t in _STOP_WORDS | GENERIC_TERMS)
+_SKILL_STEMS = frozenset(stem(t) for t in SKILL_TERMS)
+
+vocabulary = Vocabulary(sorted(SKILL_PHRASES) + sorted(stem(t) for t in SKILL_TERMS))
+
+# Every spelling of every skill, for matching variants and typos ("kubernets", "postgre")
+skill_index = SkillIndex({**{term: term for term in SKILL_TERMS | SKILL_PHRASES}, **_ONTOLOGY_SPELLINGS})
+
+
+class Document:
+    """
+    Analysed text: unique term ids in order of first appearance, the term behind
+    each id, and how each term was written the first time it appeared.
+    """
+
+    __slots__ = ("ids", "terms", "surfaces", "sorted_ids")
+
+    def __init__(self, ids: np.ndarray, terms: Dict[int, str], surfaces: Dict[int, str]):
+        self.ids = ids
+        self.terms = terms
+        self.surfaces = surfaces
+        self.sorted_ids = np.sort(ids)
+
+
+def _fuzzy_skills(tokens: Sequence[str], stems: Sequence[str]) -> Dict[str, str]:
+    # Words that are not skills as spelled, looked up in the skill index in one batch
+    candidates = {
+        token
+        for token, term in zip(tokens, stems)
+        if len(token) >= FUZZY_MIN_LENGTH
+        and term not in _SKILL_STEMS
+        and term not in _EXCLUDED_STEMS
+        and token not in _SYNONYMS
+        and not token.isnumeric()
+    }
+    if not candidates:
+        return {}
+    candidates = list(candidates)
+    return {token: skill for token, (skill, _) in zip(candidates, skill_index.lookup(candidates)) if skill is not None}
+
+
+def resolve_skills(phrases: Sequence[str]) -> List[Tuple[Optional[str], float]]:
+    """
+    Maps free-text phrases ("Postgres", "Amazon Web Services", "kubernets") to
+    canonical skills in one batch. Returns (skill or None, similarity) per phrase.
+    """
+    spellings = [_spelling(phrase) for phrase in phrases]
+    results: List[Optional[Tuple[Optional[str], float]]] = []
+    for spelling in spellings:
+        key = tuple(stem(t) for t in spelling.split())
+        # Phrases match on stems, as in analyze()
+        skill = _PHRASES.get(key) if len(key) > 1 else _SYNONYMS.get(spelling)
+        if skill is None and len(key) == 1 and key[0] in _SKILL_STEMS:
+            skill = key[0]
+        results.append((skill, 1.0) if skill is not None else None)
+    pending = [i for i, found in enumerate(results) if found is None and spellings[i]]
+    for i, found in zip(pending, skill_index.lookup([spellings[i] for i in pending])):
+        results[i] = found
+    return [found or (None, 0.0) for found in results]
+
+
+def canonical_terms(terms: Sequence[str]) -> List[str]:
+    """
+    Maps terms saved from an earlier analysis (see `Document.terms`) to the skills
+    they are synonyms or variants of now, so saved terms match fresh analyses.
+    """
+    fuzzy = _fuzzy_skills(terms, terms)
+    result = []
+    for term in terms:
+        words = term.split()
+        skill = _PHRASES.get(tuple(stem(w) for w in words)) if len(words) > 1 else _SYNONYMS.get(term) or fuzzy.get(term)
+        result.append(skill or term)
+    return result
+
+
+@lru_cache(maxsize=4096)
+def analyze(text: str) -> Document:
+    """
+    Tokenizes, stems and drops stop words, then folds known skill phrases
+    ("machine learning", "ci/cd") into single terms. Synonyms and close variants
+    of skills ("amazon web services", "kubernets") become the canonical skill.
+    """
+    tokens = _TOKEN.findall(_normalize(text))
+    stems = [stem(t) for t in tokens]
+    fuzzy = _fuzzy_skills(tokens, stems)
+    seen: Dict[int, str] = {}
+    terms: Dict[int, str] = {}
+
+    def add(term: str, surface: str) -> None:
+        term_id = vocabulary.id(term)
+        if term_id not in seen:
+            seen[term_id] = surface
+            terms[term_id] = term
+
+    position = 0
+    while position < len(tokens):
+        sizes = range(min(_MAX_PHRASE, len(tokens) - position), 1, -1) if stems[position] in _PHRASE_STARTS else ()
+        for size in sizes:
+            skill = _PHRASES.get(tuple(stems[position:position + size]))
+            if skill is not None:
+                add(skill, " ".join(tokens[position:position + size]))
+                position += size
+                break
+        else:
+            token, term = tokens[position], stems[position]
+            position += 1
+            skill = _SYNONYMS.get(token) or fuzzy.get(token)
+            if skill is not None:
+                add(skill, _DISPLAY.get(token, token))
+                continue
+            if term in _EXCLUDED_STEMS or token.isnumeric():
+                continue
+            if len(token) < 3 and term not in SKILL_TERMS:
+                continue
+            add(term, _DISPLAY.get(token, token))
+    ids = np.fromiter(seen, dtype=np.int32, count=len(seen))
+    ids.flags.writeable = False
+    return Document(ids, terms, seen)
+
+
+# Documents of stored job descriptions, kept out of analyze()'s LRU cache so a
+# stream of one-off CV texts cannot evict them
+_pinned: Dict[str, Document] = {}
+
+
+def pin(job_description: str) -> None:
+    _pinned[job_description] = analyze(job_description)
+
+
+def unpin(job_description: str) -> None:
+    _pinned.pop(job_description, None)
+
+
+def analyze_job(job_description: str) -> Document:
+    """
+    analyze() for job descriptions: pinned ones are never re-analysed.
+    """
+    document = _pinned.get(job_description)
+    return document if document is not None else analyze(job_description)
+
+
+def _binary_matrix(documents: Sequence[Document], width: int, weighted: bool = False) -> sp.csr_matrix:
+    lengths = np.fromiter((len(d.sorted_ids) for d in documents), dtype=np.int64, count=len(documents))
+    indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.concatenate([d.sorted_ids for d in documents]) if documents else np.zeros(0, dtype=np.int32)
+    data = vocabulary.weights(indices) if weighted else np.ones(len(indices), dtype=np.float32)
+    return sp.csr_matrix((data, indices, indptr), shape=(len(documents), width))
+
+
+def score_matrix(cv_texts: Sequence[str], job_descriptions: Sequence[str]) -> np.ndarray:
+    """
+    Scores N CVs against M job descriptions in one sparse product. Entry (i, j) is the
+    weighted share of JD j's keywords found in CV i, as a percentage.
+    """
+    cvs = [analyze(text) for text in cv_texts]
+    jds = [analyze_job(text) for text in job_descriptions]
+    width = len(vocabulary)
+    cv_matrix = _binary_matrix(cvs, width)
+    jd_matrix = _binary_matrix(jds, width, weighted=True)
+    matched = (cv_matrix @ jd_matrix.T).toarray().astype(np.float64)
+    totals = np.asarray(jd_matrix.sum(axis=1), dtype=np.float64).ravel()
+    totals[totals == 0] = 1.0
+    return np.round(matched / totals * 100, 2)
+
+
+def match(cv: Document, jd: Document, score: float) -> Dict[str, Any]:
+    found = np.isin(jd.ids, cv.sorted_ids, assume_unique=True)
+    return {
+        "ats_score": float(score),
+        "matched_keywords": [jd.surfaces[i] for i in jd.ids[found][:MAX_KEYWORDS]],
+        "missing_keywords": [jd.surfaces[i] for i in jd.ids[~found][:MAX_KEYWORDS]],
+    }
+
+
+def match_terms(cv_ids: np.ndarray, job_description: str) -> Dict[str, Any]:
+    """
+    Scores a CV given as its sorted, unique term ids instead of its text. Same result
+    as `match_many` on the text those ids came from.
+    """
+    jd = analyze_job(job_description)
+    weights = vocabulary.weights(jd.ids).astype(np.float64)
+    found = np.isin(jd.ids, cv_ids, assume_unique=True)
+    total = weights.sum() or 1.0
+    score = round(float(weights[found].sum() / total * 100), 2)
+    return {
+        "ats_score": score,
+        "matched_keywords": [jd.surfaces[i] for i in jd.ids[found][:MAX_KEYWORDS]],
+        "missing_keywords": [jd.surfaces[i] for i in jd.ids[~found][:MAX_KEYWORDS]],
+    }
+
+
+def match_many(cv_texts: Sequence[str], job_description: str) -> List[Dict[str, Any]]:
+    """
+    Scores many CVs against one job description, with matched and missing keywords
+    listed in the order they appear in the JD.
+    """
+    scores = score_matrix(cv_texts, [job_description])[:, 0]
+    jd = analyze_job(job_description)
+    return [match(analyze(text), jd, score) for text, score in zip(cv_texts, scores)]
@@ -0,0 +1,54 @@
+import importlib
+import logging
+import sys
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional, Tuple
+
+from services import metrics
+
+# Slow-to-import dependencies that are loaded when a route first needs them
+# instead of at startup; /ready can import them ahead of the first request
+HEAVY_MODULES = (
+    "google.generativeai",
+    "fitz",
+    "docx2txt",
+    "docx",
+    "joblib",
+    "sklearn.feature_extraction.text",
+    "sklearn.metrics.pairwise",
+)
+
+
+def load(name: str) -> ModuleType:
+    """
+    Returns the module, importing it on first use. The import system already
+    serialises concurrent first imports, so this is safe from any thread.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else importlib.import_module(name)
+
+
+def loaded(modules: Iterable[str] = HEAVY_MODULES) -> Tuple[str, ...]:
+    return tuple(name for name in modules if name in sys.modules)
+
+
+def warmup(modules: Iterable[str] = HEAVY_MODULES) -> Dict[str, Optional[float]]:
+    """
+    Imports every module that is not loaded yet. Returns the seconds each import
+    took (0 for ones already loaded) and None for modules that failed to import.
+    """
+    timings: Dict[str, Optional[float]] = {}
+    for name in modules:
+        if name in sys.modules:
+            timings[name] = 0.0
+            continue
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            metrics.log_event("warmup_import_failed", logging.WARNING, module=name, error=str(e))
+            timings[name] = None
+            continue
+        timings[name] = round(time.perf_counter() - started, 4)
+    return timings
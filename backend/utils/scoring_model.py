@@ -1,10 +1,227 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import logging
+import os
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from services import metrics
+from utils.lazy_import import load
+
+if TYPE_CHECKING:
+    # scikit-learn takes over a second to import, so it is loaded on first use
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+TFIDF_MODEL_PATH = os.getenv("TFIDF_MODEL_PATH", "tfidf_model.joblib")
+# Refit once this many documents were added since the last fit, or this fraction of the corpus
+REFIT_MIN_DOCUMENTS = int(os.getenv("TFIDF_REFIT_MIN_DOCUMENTS", "50"))
+REFIT_RATIO = float(os.getenv("TFIDF_REFIT_RATIO", "0.1"))
+# Recent job descriptions are part of the fitting corpus so JD-only terms get an IDF
+MAX_JOB_DESCRIPTIONS = 1000
+
+def _new_vectorizer() -> "TfidfVectorizer":
+    return load("sklearn.feature_extraction.text").TfidfVectorizer(sublinear_tf=True, stop_words="english", dtype=np.float32)
+
+
+class CorpusTfidfModel:
+    """
+    TF-IDF model fitted once over all stored CVs and recent job descriptions.
+    New CVs are transformed with the current vocabulary and appended to the CV
+    matrix; the model is refit in the background once enough of the corpus is new.
+    """
+
+    def __init__(self, path: Optional[str] = TFIDF_MODEL_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._vectorizer: Optional["TfidfVectorizer"] = None
+        self._matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._pending: List[sp.csr_matrix] = []
+        self._row_of: Dict[str, int] = {}
+        self._row_count = 0
+        self._job_descriptions: deque = deque(maxlen=MAX_JOB_DESCRIPTIONS)
+        self._added_since_fit = 0
+        self._cv_store: Any = None
+        self._refitting = False
+        # (cv_id, text or None for deletes) seen while a background refit was running
+        self._changes_during_refit: List[Tuple[str, Optional[str]]] = []
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._vectorizer is not None
+
+    def ensure_ready(self, cv_store) -> None:
+        """
+        Loads the saved model on first use and catches it up with `cv_store`,
+        or fits a new one over the whole store when nothing has been saved yet.
+        """
+        self._cv_store = cv_store
+        if self.is_fitted:
+            return
+        with self._lock:
+            if self.is_fitted:
+                return
+            if self.path and os.path.exists(self.path):
+                try:
+                    self._restore(load("joblib").load(self.path))
+                    self._sync(cv_store)
+                    return
+                except Exception as e:
+                    metrics.log_event("tfidf_load_failed", logging.WARNING, path=self.path, error=str(e))
+            self.fit(_corpus(cv_store))
+
+    def fit(self, cvs: Iterable[Tuple[str, str]]) -> None:
+        cv_ids, texts = [], []
+        for cv_id, text in cvs:
+            cv_ids.append(cv_id)
+            texts.append(text or "")
+        corpus = texts + list(self._job_descriptions)
+        vectorizer = _new_vectorizer()
+        try:
+            vectorizer.fit(corpus)
+        except ValueError:
+            # Empty corpus or only stop words: nothing to score against yet
+            return
+        matrix = vectorizer.transform(texts) if texts else sp.csr_matrix((0, len(vectorizer.vocabulary_)), dtype=np.float32)
+        with self._lock:
+            self._vectorizer = vectorizer
+            self._matrix = matrix.tocsr()
+            self._pending = []
+            self._row_of = {cv_id: row for row, cv_id in enumerate(cv_ids)}
+            self._row_count = len(cv_ids)
+            self._added_since_fit = 0
+            # Replay changes the corpus snapshot passed to this fit did not see
+            changes, self._changes_during_refit = self._changes_during_refit, []
+            for cv_id, text in changes:
+                if text is None:
+                    self._row_of.pop(cv_id, None)
+                else:
+                    self._append(cv_id, text)
+        self.save()
+
+    def add_document(self, cv_id: str, text: str) -> None:
+        with self._lock:
+            if not self.is_fitted:
+                return
+            self._append(cv_id, text)
+            self._added_since_fit += 1
+            if self._refitting:
+                self._changes_during_refit.append((cv_id, text))
+        self._maybe_refit()
+
+    def remove_document(self, cv_id: str) -> None:
+        # The row stays in the matrix until the next refit; it is just no longer addressable
+        with self._lock:
+            self._row_of.pop(cv_id, None)
+            if self._refitting:
+                self._changes_during_refit.append((cv_id, None))
+
+    def _append(self, cv_id: str, text: str) -> None:
+        self._pending.append(self._vectorizer.transform([text or ""]))
+        self._row_of[cv_id] = self._row_count
+        self._row_count += 1
+
+    def add_job_description(self, job_description: str) -> None:
+        if job_description and job_description.strip():
+            self._job_descriptions.append(job_description)
+
+    def similarity(self, job_description: str, cv_ids: Optional[Sequence[str]] = None) -> Dict[str, float]:
+        """
+        Cosine similarity (as a percentage) between one JD and many CVs, computed as
+        one sparse matrix-vector product. Unknown CV ids are left out of the result.
+        """
+        with self._lock:
+            if not self.is_fitted:
+                return {}
+            matrix = self._merged_matrix()
+            jd_vector = self._vectorizer.transform([job_description or ""])
+            if cv_ids is None:
+                ids = list(self._row_of)
+            else:
+                ids = [cv_id for cv_id in cv_ids if cv_id in self._row_of]
+            rows = np.fromiter((self._row_of[cv_id] for cv_id in ids), dtype=np.int64, count=len(ids))
+        if not ids:
+            return {}
+        # Rows are L2-normalised by the vectorizer, so the dot product is the cosine
+        scores = np.asarray(matrix[rows] @ jd_vector.T.toarray()).ravel()
+        return {cv_id: round(float(score) * 100, 2) for cv_id, score in zip(ids, scores)}
+
+    def transform(self, texts: List[str]):
+        with self._lock:
+            return self._vectorizer.transform(texts)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            state = {
+                "vectorizer": self._vectorizer,
+                "matrix": self._merged_matrix(),
+                "row_of": dict(self._row_of),
+                "job_descriptions": list(self._job_descriptions),
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        load("joblib").dump(state, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def _restore(self, state: dict) -> None:
+        self._vectorizer = state["vectorizer"]
+        self._matrix = state["matrix"].tocsr()
+        self._pending = []
+        self._row_of = state["row_of"]
+        self._row_count = self._matrix.shape[0]
+        self._job_descriptions.extend(state.get("job_descriptions", []))
+        self._added_since_fit = 0
+
+    def _sync(self, cv_store) -> None:
+        stored = set(cv_store.all_ids())
+        for cv_id in set(self._row_of) - stored:
+            del self._row_of[cv_id]
+        missing = list(stored - set(self._row_of))
+        for start in range(0, len(missing), 500):
+            for cv in cv_store.get_many(missing[start:start + 500]):
+                self._append(cv.id, cv.extracted_text)
+                self._added_since_fit += 1
+
+    def _merged_matrix(self) -> sp.csr_matrix:
+        if self._pending:
+            self._matrix = sp.vstack([self._matrix] + self._pending, format="csr")
+            self._pending = []
+        return self._matrix
+
+    def _maybe_refit(self) -> None:
+        with self._lock:
+            threshold = max(REFIT_MIN_DOCUMENTS, REFIT_RATIO * len(self._row_of))
+            if self._refitting or self._cv_store is None or self._added_since_fit < threshold:
+                return
+            self._refitting = True
+
+        def refit():
+            try:
+                self.fit(_corpus(self._cv_store))
+            except Exception as e:
+                metrics.log_event("tfidf_refit_failed", logging.WARNING, error=str(e))
+            finally:
+                self._refitting = False
+
+        threading.Thread(target=refit, daemon=True).start()
+
+
+def _corpus(cv_store) -> Iterable[Tuple[str, str]]:
+    return ((cv.id, cv.extracted_text) for cv in cv_store.iter_all())
+
+
+tfidf_model = CorpusTfidfModel()
+
 
 def calculate_similarity(cv_text: str, job_description: str) -> float:
     """
     Calculate the similarity score between CV text and job description using TF-IDF and cosine similarity.
 
+    Uses the corpus-level IDF weights when the shared model is fitted, and falls back
+    to fitting on just the two documents otherwise.
+
     Args:
         cv_text (str): The text of the CV.
         job_description (str): The text of the job description.
@@ -12,19 +229,22 @@ def calculate_similarity(cv_text: str, job_description: str) -> float:
     Returns:
         float: The similarity score as a percentage.
     """
-    # Combine the texts into a list
-    documents = [cv_text, job_description]
+    if tfidf_model.is_fitted:
+        tfidf_matrix = tfidf_model.transform([cv_text, job_description])
+    else:
+        # Combine the texts into a list
+        documents = [cv_text, job_description]
 
-    # Create a TF-IDF Vectorizer
-    vectorizer = TfidfVectorizer()
+        # Create a TF-IDF Vectorizer
+        vectorizer = load("sklearn.feature_extraction.text").TfidfVectorizer()
 
-    # Transform the documents into TF-IDF vectors
-    tfidf_matrix = vectorizer.fit_transform(documents)
+        # Transform the documents into TF-IDF vectors
+        tfidf_matrix = vectorizer.fit_transform(documents)
 
     # Calculate cosine similarity
-    similarity_matrix = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
+    similarity_matrix = load("sklearn.metrics.pairwise").cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
 
     # Extract the similarity score and convert it to a percentage
     similarity_score = similarity_matrix[0][0] * 100
 
-    return round(similarity_score, 2)
\ No newline at end of file
+    return round(similarity_score, 2)
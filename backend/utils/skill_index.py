@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from services import metrics
+
+SKILL_EMBEDDINGS_PATH = os.getenv("SKILL_EMBEDDINGS_PATH", "skill_embeddings.npz")
+# Cosine similarity from which a phrase counts as a spelling of a skill
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.75"))
+EMBEDDING_DIMENSIONS = 2048
+NGRAM_SIZES = (2, 3, 4)
+# Phrases looked up by similarity whose answer is remembered
+LOOKUP_CACHE_SIZE = 100000
+
+
+def _features(phrase: str) -> List[int]:
+    padded = f"<{phrase}>"
+    # crc32 rather than hash(): the saved matrix must mean the same in every process
+    return [
+        zlib.crc32(padded[i:i + n].encode("utf-8")) % EMBEDDING_DIMENSIONS
+        for n in NGRAM_SIZES
+        for i in range(len(padded) - n + 1)
+    ]
+
+
+def embed(phrases: Sequence[str]) -> sp.csr_matrix:
+    """
+    Hashed character n-gram vectors, L2-normalised so dot products are cosines.
+    Spelling variants and typos share most of their n-grams; unrelated words do not.
+    """
+    features = [_features(phrase) for phrase in phrases]
+    indptr = np.zeros(len(phrases) + 1, dtype=np.int64)
+    np.cumsum([len(f) for f in features], out=indptr[1:])
+    indices = np.fromiter((i for f in features for i in f), dtype=np.int32, count=int(indptr[-1]))
+    matrix = sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(phrases), EMBEDDING_DIMENSIONS),
+    )
+    # Repeated n-grams are summed here
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms).astype(np.float32) @ matrix)
+
+
+class SkillIndex:
+    """
+    Maps phrases to canonical skills. Every known spelling of a skill is embedded
+    once; a phrase resolves to the skill of its nearest spelling with the same
+    number of words, if that is at least `threshold` similar. Exact spellings skip
+    the embedding, and answers for other phrases are cached. The spelling matrix
+    is saved to `path` and reused while the spellings stay the same.
+    """
+
+    def __init__(self, spellings: Dict[str, str], path: Optional[str] = SKILL_EMBEDDINGS_PATH, threshold: float = SKILL_MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._spellings = dict(sorted(spellings.items()))
+        self._surfaces = list(self._spellings)
+        self._skills = [self._spellings[s] for s in self._surfaces]
+        self._word_counts = np.array([s.count(" ") + 1 for s in self._surfaces], dtype=np.int32)
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    @property
+    def fingerprint(self) -> str:
+        content = json.dumps([EMBEDDING_DIMENSIONS, NGRAM_SIZES, self._surfaces])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def load(self) -> None:
+        """
+        Loads the saved spelling matrix, or embeds the spellings and saves them when
+        nothing matching the current ontology has been saved yet.
+        """
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is not None:
+                return
+            if self.path and os.path.exists(self.path):
+                try:
+                    with np.load(self.path) as saved:
+                        if str(saved["fingerprint"]) == self.fingerprint:
+                            self._matrix = saved["matrix"]
+                            return
+                except Exception as e:
+                    metrics.log_event("skill_embeddings_load_failed", logging.WARNING, path=self.path, error=str(e))
+            matrix = embed(self._surfaces).T.toarray()
+            if self.path:
+                try:
+                    self._save(matrix)
+                except OSError as e:
+                    metrics.log_event("skill_embeddings_save_failed", logging.WARNING, path=self.path, error=str(e))
+            self._matrix = matrix
+
+    def _save(self, matrix: np.ndarray) -> None:
+        # Per-process temp file: workers may build the matrix at the same time
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, matrix=matrix, fingerprint=np.array(self.fingerprint))
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, phrases: Sequence[str]) -> List[Tuple[Optional[str], float]]:
+        """
+        Returns (canonical skill or None, similarity) for each phrase. Phrases are
+        expected lower-cased, with words separated by single spaces. Phrases not
+        answered by an exact spelling or the cache are embedded in one batch.
+        """
+        results: List[Optional[Tuple[Optional[str], float]]] = []
+        misses: Dict[str, List[int]] = {}
+        for position, phrase in enumerate(phrases):
+            skill = self._spellings.get(phrase)
+            found = (skill, 1.0) if skill is not None else self._cache.get(phrase)
+            if found is None:
+                misses.setdefault(phrase, []).append(position)
+            results.append(found)
+        if misses:
+            self.load()
+            queries = list(misses)
+            similarities = embed(queries) @ self._matrix
+            # Phrases are only compared with spellings of as many words
+            word_counts = np.array([q.count(" ") + 1 for q in queries], dtype=np.int32)
+            similarities[word_counts[:, None] != self._word_counts[None, :]] = -1.0
+            nearest = similarities.argmax(axis=1)
+            if len(self._cache) + len(queries) > LOOKUP_CACHE_SIZE:
+                self._cache.clear()
+            for row, query in enumerate(queries):
+                similarity = round(float(similarities[row, nearest[row]]), 4)
+                found = (self._skills[nearest[row]] if similarity >= self.threshold else None, similarity)
+                self._cache[query] = found
+                for position in misses[query]:
+                    results[position] = found
+        return results
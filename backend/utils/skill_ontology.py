@@ -0,0 +1,77 @@
+"""
+Curated skill ontology: canonical skill -> other ways CVs and job descriptions
+write it. Canonical names are terms of the keyword engine's skill lexicon.
+Spellings the keyword engine already rewrites (c++, node.js, k8s, postgres, ...)
+are not repeated here. Add a synonym only when it means the same skill in any
+context: "node" or "go" alone would match too much ordinary text.
+"""
+from typing import Dict, Tuple
+
+SKILL_ONTOLOGY: Dict[str, Tuple[str, ...]] = {
+    # Languages
+    "python": ("python3", "cpython"),
+    "javascript": ("ecmascript", "es6", "es2015", "vanilla javascript"),
+    "golang": ("go lang", "go language"),
+    "cplusplus": ("cpp",),
+    "bash": ("shell scripting", "shell scripts", "bash scripting"),
+    # Frameworks
+    "angular": ("angularjs", "angular2"),
+    "dotnet": ("asp dotnet", "dotnet core", "dotnet framework"),
+    "spring boot": ("springboot",),
+    "ruby on rails": ("rails", "ror"),
+    "sklearn": ("scikit", "scikit learn"),
+    "pytorch": ("torch",),
+    "tensorflow": ("tensorflow2", "tf2"),
+    "selenium": ("webdriver", "selenium webdriver"),
+    # Data stores
+    "postgresql": ("psql", "pgsql", "postgre"),
+    "mongodb": ("mongo",),
+    "sql server": ("mssql", "ms sql", "microsoft sql server"),
+    "elasticsearch": ("elastic search",),
+    "rabbitmq": ("rabbit mq",),
+    "bigquery": ("big query",),
+    "hadoop": ("hdfs", "mapreduce"),
+    "spark": ("pyspark", "apache spark"),
+    "kafka": ("apache kafka",),
+    "airflow": ("apache airflow",),
+    "dbt": ("data build tool",),
+    # Cloud and operations
+    "aws": ("amazon web services",),
+    "azure": ("microsoft azure",),
+    "google cloud": ("google cloud platform",),
+    "kubernetes": ("kube",),
+    "devops": ("dev ops",),
+    "site reliability": ("sre", "site reliability engineering"),
+    "infrastructure as code": ("iac",),
+    "linux": ("ubuntu", "debian", "centos", "rhel", "red hat linux"),
+    "microservices": ("microservice", "micro services", "microservice architecture"),
+    "rest api": ("restful api", "restful apis", "rest apis", "restful services", "rest services"),
+    "oauth": ("oauth2",),
+    "security": ("cybersecurity", "cyber security", "infosec", "information security"),
+    "penetration testing": ("pentesting", "pentest", "pen testing"),
+    # Data and machine learning
+    "machine learning": ("statistical learning",),
+    "deep learning": ("neural networks", "neural network"),
+    "natural language processing": ("computational linguistics",),
+    "large language models": ("llm", "llms", "large language model"),
+    "generative ai": ("genai", "gen ai"),
+    "data science": ("data scientist",),
+    "data engineering": ("data engineer",),
+    "data analysis": ("data analytics", "data analyst"),
+    "data modeling": ("data modelling",),
+    "data warehouse": ("data warehousing", "dwh"),
+    "etl": ("elt", "extract transform load"),
+    "time series": ("timeseries",),
+    "business intelligence": ("bi tools",),
+    "power bi": ("powerbi",),
+    "excel": ("ms excel", "microsoft excel", "spreadsheets"),
+    # Practices
+    "test automation": ("automated testing", "automation testing"),
+    "object oriented": ("oop", "ood", "object oriented programming"),
+    "version control": ("source control",),
+    "a b testing": ("ab testing", "split testing"),
+    "project management": ("project manager",),
+    "product management": ("product manager",),
+    "user experience": ("ux",),
+    "user interface": ("ui",),
+}
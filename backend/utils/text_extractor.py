@@ -1,30 +1,152 @@
-import fitz  # PyMuPDF
-import docx2txt
 import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, List, Optional
 
-def extract_text_from_docx(file_path):
+from utils.lazy_import import load
+
+# Uploads larger than this are rejected while they are being copied
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# PDFs with at least this many pages are split across the process pool
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "32"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+PAGES_PER_TASK = 8
+# Joins PDF pages, so later cleaning can tell running headers and footers from body text
+PAGE_BREAK = "\f"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def save_upload(source: BinaryIO, destination: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES, hasher=None) -> int:
+    """
+    Copies an upload to disk in fixed-size chunks and stops as soon as it passes `max_bytes`.
+    Each chunk is also fed to `hasher` (a hashlib object) when one is given.
+    Returns the number of bytes written.
+    """
+    written = 0
+    while True:
+        chunk = source.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return written
+        written += len(chunk)
+        if written > max_bytes:
+            raise UploadTooLargeError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+        if hasher is not None:
+            hasher.update(chunk)
+        destination.write(chunk)
+
+
+def extract_text_from_docx(file_path, max_chars: Optional[int] = None):
     # First try docx2txt (handles embedded text, headers/footers sometimes)
     try:
-        text = docx2txt.process(file_path) or ""
+        text = load("docx2txt").process(file_path) or ""
         if text.strip():
-            return text
+            return text[:max_chars] if max_chars else text
     except Exception:
         # Fallback below
         pass
 
     # Fallback to python-docx for better compatibility in some environments
     try:
-        from docx import Document
-        document = Document(file_path)
-        paragraphs = [p.text for p in document.paragraphs if p.text]
-        return "\n".join(paragraphs)
+        document = load("docx").Document(file_path)
+        paragraphs: List[str] = []
+        length = 0
+        for p in document.paragraphs:
+            if p.text:
+                paragraphs.append(p.text)
+                length += len(p.text) + 1
+                if max_chars and length >= max_chars:
+                    break
+        text = "\n".join(paragraphs)
+        return text[:max_chars] if max_chars else text
     except Exception as e:
         # Re-raise to be handled by caller
         raise e
 
-def extract_text_from_pdf(file_path):
-    text = ""
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+
+def _extract_pages(file_path: str, start: int, stop: int, max_chars: Optional[int]) -> List[str]:
+    # MuPDF reads pages from the file on demand, so only the pages we touch are parsed
+    pages: List[str] = []
+    length = 0
+    # PyMuPDF is imported on first use; pool workers import it themselves
+    with load("fitz").open(file_path) as doc:
+        for number in range(start, min(stop, doc.page_count)):
+            text = doc[number].get_text()
+            pages.append(text)
+            length += len(text)
+            if max_chars and length >= max_chars:
+                break
+    return pages
+
+
+def extract_file(file_path: str, max_chars: Optional[int] = None) -> str:
+    """
+    Extracts a PDF or DOCX entirely in the calling process. Bulk uploads run it in
+    the process pool, one file per task, so PDFs are not split into page ranges.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pdf":
+        text = PAGE_BREAK.join(_extract_pages(file_path, 0, sys.maxsize, max_chars))
+        return text[:max_chars] if max_chars else text
+    if extension == ".docx":
+        return extract_text_from_docx(file_path, max_chars=max_chars)
+    raise ValueError(f"Unsupported file type: {extension or 'none'}")
+
+
+def extract_text_from_pdf(file_path, max_chars: Optional[int] = None):
+    """
+    Extracts PDF text page by page, stopping once `max_chars` characters are collected.
+    Large documents are extracted in page ranges across the process pool.
+    """
+    with load("fitz").open(file_path) as doc:
+        page_count = doc.page_count
+    if page_count < PARALLEL_PAGE_THRESHOLD or EXTRACTION_WORKERS < 2:
+        text = PAGE_BREAK.join(_extract_pages(file_path, 0, page_count, max_chars))
+        return text[:max_chars] if max_chars else text
+
+    pool = get_process_pool()
+    starts = iter(range(0, page_count, PAGES_PER_TASK))
+    # Keep one range per worker in flight so an early stop does not waste the whole pool
+    in_flight = deque(
+        pool.submit(_extract_pages, file_path, start, start + PAGES_PER_TASK, max_chars)
+        for start in islice(starts, EXTRACTION_WORKERS)
+    )
+    pages: List[str] = []
+    length = 0
+    try:
+        while in_flight:
+            # Ranges are collected in page order
+            for text in in_flight.popleft().result():
+                pages.append(text)
+                length += len(text)
+            if max_chars and length >= max_chars:
+                break
+            start = next(starts, None)
+            if start is not None:
+                in_flight.append(pool.submit(_extract_pages, file_path, start, start + PAGES_PER_TASK, max_chars))
+    finally:
+        for future in in_flight:
+            future.cancel()
+    text = PAGE_BREAK.join(pages)
+    return text[:max_chars] if max_chars else text
@@ -0,0 +1,14 @@
+"""
+Plain word tokenizer shared by the search index and near-duplicate detection:
+lower-cased runs of letters and digits, with no stemming or skill rewriting
+(utils/keyword_engine does that for scoring).
+"""
+import re
+from typing import List
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset({"the", "and", "is", "in", "at", "of", "a", "to", "for", "on", "with", "by", "an", "as", "be"})
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
@@ -0,0 +1,175 @@
+"""
+Receives multipart/form-data uploads straight to disk. A route that declares
+File(...) parameters gets the whole body parsed and spooled by Starlette before it
+runs; routes that call receive_files() instead read the request stream as it
+arrives, write each file part to its own file once, and stop reading as soon as
+the body passes the size limit.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Any, BinaryIO, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+from utils.text_extractor import UploadTooLargeError
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:
+    # python-multipart before 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+
+class MalformedUploadError(ValueError):
+    pass
+
+
+class ReceivedFile:
+    __slots__ = ("field", "filename", "path", "size", "content_hash")
+
+    def __init__(self, field: str, filename: str, path: str):
+        self.field = field
+        self.filename = filename
+        self.path = path
+        self.size = 0
+        self.content_hash = ""
+
+
+class _Receiver:
+    """
+    Parser callbacks only record what happened; the file writes run in the
+    threadpool once per chunk so the event loop never waits on the disk.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+        self.files: List[ReceivedFile] = []
+        self._events: List[Tuple[str, Any]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self._handle: Optional[BinaryIO] = None
+        self._hasher = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._events)
+
+    @property
+    def open(self) -> bool:
+        return self._handle is not None
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._add_header_bytes("_header_name", data[start:end]),
+            "on_header_value": lambda data, start, end: self._add_header_bytes("_header_value", data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _add_header_bytes(self, name: str, data: bytes) -> None:
+        setattr(self, name, getattr(self, name) + data)
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._in_file = False
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"filename" not in options:
+            # Plain form fields are not used by the upload routes
+            return
+        self._in_file = True
+        field = options.get(b"name", b"").decode("utf-8", "replace")
+        self._events.append(("open", (field, options[b"filename"].decode("utf-8", "replace"))))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._events.append(("close", None))
+            self._in_file = False
+
+    def apply(self) -> None:
+        events, self._events = self._events, []
+        for kind, value in events:
+            if kind == "open":
+                field, filename = value
+                fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1].lower(), dir=self.directory)
+                self.files.append(ReceivedFile(field, filename, path))
+                self._handle = os.fdopen(fd, "wb")
+                self._hasher = hashlib.sha256()
+            elif kind == "data":
+                self._handle.write(value)
+                self._hasher.update(value)
+                self.files[-1].size += len(value)
+            else:
+                self._handle.close()
+                self._handle = None
+                self.files[-1].content_hash = self._hasher.hexdigest()
+
+    def discard(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        for received in self.files:
+            try:
+                os.remove(received.path)
+            except FileNotFoundError:
+                pass
+
+
+async def receive_files(request: Request, max_bytes: int, directory: Optional[str] = None) -> List[ReceivedFile]:
+    """
+    Writes every file part of a multipart request to its own file in `directory`
+    (the system temp directory by default), hashing it on the way. Raises
+    UploadTooLargeError once more than `max_bytes` of body arrived (or the client
+    declares more) and MalformedUploadError for bodies that are not multipart;
+    files received so far are removed in both cases.
+    """
+    content_type = request.headers.get("content-type", "")
+    kind, params = parse_options_header(content_type)
+    if kind != b"multipart/form-data" or b"boundary" not in params:
+        raise MalformedUploadError("Send the files as multipart/form-data.")
+    too_large = UploadTooLargeError(f"Upload is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+
+    receiver = _Receiver(directory)
+    parser = multipart.MultipartParser(params[b"boundary"], receiver.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise too_large
+            parser.write(chunk)
+            if receiver.pending:
+                await run_in_threadpool(receiver.apply)
+        parser.finalize()
+    except BaseException as e:
+        # Also on cancellation, when the client goes away mid-upload
+        receiver.discard()
+        if isinstance(e, multipart.exceptions.ParseError):
+            raise MalformedUploadError(f"Malformed multipart body: {e}")
+        raise
+    if receiver.open:
+        # The body ended in the middle of a file
+        receiver.discard()
+        raise MalformedUploadError("Malformed multipart body: the upload was cut off.")
+    return receiver.files
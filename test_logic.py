@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from dotenv import load_dotenv
@@ -7,6 +8,7 @@ sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
 from services.ats_score import calculate_ats_score
 from services.rewrite_cv import rewrite_cv
+from services import llm_client
 
 load_dotenv(os.path.join('backend', '.env'))
 
@@ -27,6 +29,8 @@ def test_logic():
         print("STILL NO API KEY. Exiting.")
         return
 
+    llm_client.configure()
+
     job_description = """
     We are looking for a Senior Python Developer with experience in FastAPI, Docker, and Kubernetes.
     Must have strong knowledge of PostgreSQL and Redis.
@@ -41,7 +45,7 @@ def test_logic():
 
     print("\n--- Testing ATS Score ---")
     try:
-        score_result = calculate_ats_score(cv_text, job_description)
+        score_result = asyncio.run(calculate_ats_score(cv_text, job_description))
         print(f"Score: {score_result['ats_score']}")
         print(f"Matched: {score_result['matched_keywords']}")
         print(f"Missing: {score_result['missing_keywords']}")
@@ -52,7 +56,7 @@ def test_logic():
 
     print("\n--- Testing CV Rewrite ---")
     try:
-        rewritten = rewrite_cv(cv_text, job_description)
+        rewritten = asyncio.run(rewrite_cv(cv_text, job_description))
         print(f"Rewritten CV Length: {len(rewritten)}")
         print("Snippet:", rewritten[:200] + "...")
     except Exception as e: